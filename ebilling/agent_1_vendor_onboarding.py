@@ -8,16 +8,30 @@
 # structured vendor database.
 #
 # RUN: python3 agent_1_vendor_onboarding.py
+#      python3 agent_1_vendor_onboarding.py --incremental
+#      (apply law_firms.csv to the existing database as a diff)
 # ============================================================
 
 from crewai import Agent, Task, Crew
 from crewai.tools import tool
-from langchain_anthropic import ChatAnthropic
 import json
-import csv
 import os
+import sys
+from itertools import islice
 
-llm = ChatAnthropic(model="claude-sonnet-4-20250514")
+from llm_cache import cached_tool, make_llm
+from metrics import export_from_env, timed_tool
+from storage import get_storage
+from tool_output import decode_file_cursor, dump, iter_csv_from, page_info, records
+from vendor_ingest import CHUNK_SIZE, ingest_vendors, iter_vendor_csv
+import vendor_rules
+from vendor_rules import check_vendor, check_vendors
+from vendor_sync import change_counts, change_report, sync_vendors
+
+# Completions are cached in llm_cache.db (see llm_cache.py)
+llm = make_llm()
+# Tool timings are exported if EBILLING_METRICS_PORT/FILE is set (see metrics.py)
+export_from_env()
 
 
 # ============================================================
@@ -27,28 +41,35 @@ llm = ChatAnthropic(model="claude-sonnet-4-20250514")
 # The agent will use this to "see" the vendor data.
 
 @tool
-def read_vendor_csv(file_path: str) -> str:
+@timed_tool
+def read_vendor_csv(file_path: str, cursor: str = "", limit: int = 100) -> str:
     """
-    Read law firm vendor data from a CSV file.
-    Use this to load vendor information for onboarding.
+    Read law firm vendor data from a CSV file, one page at a time.
+    Use this to load vendor information for onboarding. Call again with
+    next_cursor until has_more is false.
     
     Args:
         file_path: Path to the CSV file containing vendor data
+        cursor: next_cursor from the previous page ("" for the first page)
+        limit: Maximum number of vendors to return
     
     Returns:
-        JSON string with list of vendors and their details
+        JSON string with a page of vendors and their details
     """
     try:
-        vendors = []
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                vendors.append(row)
+        # Resume where the previous page ended instead of re-reading the file
+        offset, position = decode_file_cursor(cursor, "read_vendor_csv", file_path)
+        rows = iter_csv_from(file_path, position)
+        page = list(islice(rows, limit))
+        has_more = next(rows, None) is not None
+        vendors = [row for row, _ in page]
+        end = page[-1][1] if page else position
         
-        return json.dumps({
+        return dump({
             "vendor_count": len(vendors),
+            **page_info("read_vendor_csv", offset, len(vendors), has_more, file_path, end),
             "vendors": vendors
-        }, indent=2)
+        })
     
     except FileNotFoundError:
         return json.dumps({"error": f"File not found: {file_path}"})
@@ -59,13 +80,14 @@ def read_vendor_csv(file_path: str) -> str:
 # ============================================================
 # TOOL 2: Save Vendor to Database
 # ============================================================
-# This tool saves validated vendors to our "database" (JSON file).
-# In production, this would write to a real database.
+# This tool saves validated vendors to our "database".
+# Storage is vendor_database.json by default, or SQLite when
+# EBILLING_STORAGE=sqlite (see storage.py).
 
-# Our simple "database" - a JSON file
-VENDOR_DB_PATH = "vendor_database.json"
+storage = get_storage()
 
 @tool
+@timed_tool
 def save_vendor_to_database(vendor_json: str) -> str:
     """
     Save a validated vendor to the e-billing database.
@@ -80,25 +102,10 @@ def save_vendor_to_database(vendor_json: str) -> str:
         Confirmation message with vendor ID
     """
     try:
-        vendor = json.loads(vendor_json)
-        
-        # Load existing database or create new
-        if os.path.exists(VENDOR_DB_PATH):
-            with open(VENDOR_DB_PATH, 'r') as f:
-                db = json.load(f)
-        else:
-            db = {"vendors": [], "next_id": 1001}
+        vendor = records(json.loads(vendor_json))
         
-        # Assign vendor ID
-        vendor["vendor_id"] = f"VND-{db['next_id']}"
-        db["next_id"] += 1
-        
-        # Add to database
-        db["vendors"].append(vendor)
-        
-        # Save database
-        with open(VENDOR_DB_PATH, 'w') as f:
-            json.dump(db, f, indent=2)
+        # Assign vendor ID and save (a batch of one)
+        storage.save_vendors([vendor])
         
         return json.dumps({
             "status": "success",
@@ -115,9 +122,14 @@ def save_vendor_to_database(vendor_json: str) -> str:
 # ============================================================
 # TOOL 3: Validate Vendor Data
 # ============================================================
-# Checks if vendor data meets our requirements.
+# Checks if vendor data meets our requirements. The rules
+# (required fields, rate floors/caps, allowed status and
+# payment terms) are declared once in vendor_rules.py and
+# checked over whole lists at a time as NumPy columns.
 
 @tool
+@timed_tool
+@cached_tool(depends=[vendor_rules])
 def validate_vendor(vendor_json: str) -> str:
     """
     Validate vendor data against e-billing requirements.
@@ -130,53 +142,223 @@ def validate_vendor(vendor_json: str) -> str:
         Validation result with any errors found
     """
     try:
-        vendor = json.loads(vendor_json)
-        errors = []
-        warnings = []
+        vendor = records(json.loads(vendor_json))
+        return dump(validation_result(vendor))
+    
+    except json.JSONDecodeError:
+        return json.dumps({"is_valid": False, "errors": ["Invalid JSON format"]})
+
+
+def validation_result(vendor, checked=None):
+    """validate_vendor's result for one vendor record (checked: its check_vendor result, if known)."""
+    errors, warnings = checked or check_vendor(vendor)
+    return {
+        "is_valid": len(errors) == 0,
+        "firm_name": vendor.get("firm_name", "Unknown"),
+        "errors": errors,
+        "warnings": warnings
+    }
+
+
+@tool
+@timed_tool
+@cached_tool(depends=[vendor_rules])
+def validate_vendors_batch(vendors_json: str) -> str:
+    """
+    Validate a list of vendors in one call, without saving them.
+    Prefer this over calling validate_vendor once per vendor.
+    
+    Args:
+        vendors_json: JSON array of vendor objects (or {"vendors": [...]})
+    
+    Returns:
+        JSON with one result per vendor (in input order, with its index),
+        plus any items that could not be checked under "errors"
+    """
+    try:
+        vendors = records(json.loads(vendors_json))
+        if isinstance(vendors, dict):
+            vendors = vendors.get("vendors", [])
         
-        # Required fields
-        required = ["firm_name", "partner_rate", "associate_rate", "status", "payment_terms"]
-        for field in required:
-            if field not in vendor or not vendor[field]:
-                errors.append(f"Missing required field: {field}")
+        item_errors = []
+        indexed = []
+        for index, vendor in enumerate(vendors):
+            if not isinstance(vendor, dict):
+                item_errors.append({"index": index, "error": "Vendor must be a JSON object"})
+                continue
+            indexed.append((index, vendor))
         
-        # Rate validations
-        try:
-            partner_rate = float(vendor.get("partner_rate", 0))
-            if partner_rate > 800:
-                warnings.append(f"Partner rate ${partner_rate}/hr exceeds preferred cap of $800/hr")
-            if partner_rate < 200:
-                errors.append(f"Partner rate ${partner_rate}/hr seems too low - please verify")
-        except ValueError:
-            errors.append("Partner rate must be a number")
+        # One pass of the rules over the whole list
+        checked = check_vendors([vendor for _, vendor in indexed])
+        results = [dict(validation_result(vendor, c), index=index) for (index, vendor), c in zip(indexed, checked)]
         
-        try:
-            associate_rate = float(vendor.get("associate_rate", 0))
-            if associate_rate > 500:
-                warnings.append(f"Associate rate ${associate_rate}/hr exceeds preferred cap of $500/hr")
-        except ValueError:
-            errors.append("Associate rate must be a number")
+        return dump({
+            "count": len(vendors),
+            "valid_count": sum(1 for r in results if r["is_valid"]),
+            "invalid_count": sum(1 for r in results if not r["is_valid"]),
+            "results": results,
+            "errors": item_errors
+        })
+    
+    except json.JSONDecodeError:
+        return json.dumps({"status": "error", "message": "Invalid JSON format"})
+
+
+# ============================================================
+# TOOL 4: Validate and Save Vendors in Bulk
+# ============================================================
+# Validates a whole list and saves every valid vendor with ONE
+# database write, instead of one read + rewrite per vendor.
+
+@tool
+@timed_tool
+def save_vendors_batch(vendors_json: str) -> str:
+    """
+    Validate and save a list of vendors to the e-billing database in one step.
+    Prefer this over calling validate_vendor and save_vendor_to_database
+    for each vendor. Valid vendors (even with warnings) are saved together;
+    invalid vendors are skipped and reported with their errors.
+    
+    Args:
+        vendors_json: JSON array of vendor objects (e.g. the "vendors"
+                      list returned by read_vendor_csv)
+    
+    Returns:
+        JSON with saved vendors (with IDs), rejected vendors and warnings
+    """
+    try:
+        vendors = records(json.loads(vendors_json))
+        if isinstance(vendors, dict):
+            vendors = vendors.get("vendors", [])
         
-        # Status validation
-        if vendor.get("status") not in ["active", "inactive"]:
-            errors.append("Status must be 'active' or 'inactive'")
+        valid = []
+        saved_warnings = []
+        rejected = []
+        for vendor, (errors, warnings) in zip(vendors, check_vendors(vendors)):
+            if errors:
+                rejected.append({"firm_name": vendor.get("firm_name", "Unknown"), "errors": errors})
+            else:
+                valid.append(vendor)
+                saved_warnings.append(warnings)
         
-        # Payment terms validation
-        valid_terms = ["net_30", "net_45", "net_60"]
-        if vendor.get("payment_terms") not in valid_terms:
-            errors.append(f"Payment terms must be one of: {valid_terms}")
+        # Single transaction: all valid vendors are written together
+        storage.save_vendors(valid)
         
-        # Return result
-        is_valid = len(errors) == 0
-        return json.dumps({
-            "is_valid": is_valid,
-            "firm_name": vendor.get("firm_name", "Unknown"),
-            "errors": errors,
-            "warnings": warnings
-        }, indent=2)
+        return dump({
+            "status": "success",
+            "saved_count": len(valid),
+            "rejected_count": len(rejected),
+            "saved": [
+                {"vendor_id": v["vendor_id"], "firm_name": v["firm_name"], "warnings": w}
+                for v, w in zip(valid, saved_warnings)
+            ],
+            "rejected": rejected
+        })
     
     except json.JSONDecodeError:
-        return json.dumps({"is_valid": False, "errors": ["Invalid JSON format"]})
+        return json.dumps({"status": "error", "message": "Invalid JSON format"})
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)})
+
+
+# ============================================================
+# TOOL 5: Onboard a Whole CSV (streaming)
+# ============================================================
+# For large vendor master files: the CSV is read, validated and
+# saved chunk by chunk without passing through the agent's
+# context; only counts and a sample of problems come back.
+
+SAMPLE_SIZE = 20
+
+
+@tool
+@timed_tool
+def ingest_vendor_csv(file_path: str, chunk_size: int = CHUNK_SIZE, fresh: bool = True) -> str:
+    """
+    Validate and save every vendor in a CSV file in one call, streaming it
+    chunk by chunk. Prefer this over paging through read_vendor_csv when
+    the file is large. Invalid vendors are skipped.
+    
+    Args:
+        file_path: Path to the CSV file containing vendor data
+        chunk_size: Rows validated and saved at a time
+        fresh: Replace the vendor database (true) or add to it (false)
+    
+    Returns:
+        JSON with counts (read, onboarded, rejected, warnings) and the
+        first rejected vendors and warnings as samples
+    """
+    rejected_sample = []
+    warning_sample = []
+    
+    def sample(saved, rejected):
+        for vendor, errors in rejected[:SAMPLE_SIZE - len(rejected_sample)]:
+            rejected_sample.append({"firm_name": vendor.get("firm_name", "Unknown"), "errors": errors})
+        for vendor, warnings in saved:
+            if warnings and len(warning_sample) < SAMPLE_SIZE:
+                warning_sample.append({"vendor_id": vendor["vendor_id"], "firm_name": vendor["firm_name"], "warnings": warnings})
+    
+    try:
+        counts = ingest_vendors(storage, iter_vendor_csv(file_path), check_vendors, max(1, chunk_size),
+                                fresh=fresh, on_chunk=sample)
+        return dump({
+            "status": "success",
+            **counts,
+            "rejected_sample": rejected_sample,
+            "warning_sample": warning_sample
+        })
+    
+    except FileNotFoundError:
+        return json.dumps({"status": "error", "message": f"File not found: {file_path}"})
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)})
+
+
+# ============================================================
+# TOOL 6: Apply a Vendor Feed to the Existing Database
+# ============================================================
+# For the recurring vendor-master feed: the CSV is diffed
+# against the stored vendors by firm name, and only new,
+# changed and missing (deactivated) firms are written.
+# Existing vendors keep their VND- IDs.
+
+@tool
+@timed_tool
+def sync_vendor_csv(file_path: str, dry_run: bool = False, effective_from: str = "") -> str:
+    """
+    Update the vendor database from a CSV with only what changed: new firms
+    are added, firms whose details changed are updated under their existing
+    vendor ID, and firms no longer in the CSV are set to inactive. Use this
+    instead of onboarding again when the database already has vendors.
+    Changed rates are recorded as rate cards, so older invoices are still
+    verified against the rates in force when they were issued.
+    
+    Args:
+        file_path: Path to the CSV file containing vendor data
+        dry_run: Report the changes without writing them
+        effective_from: Date changed rates take effect (YYYY-MM-DD,
+                        default today)
+    
+    Returns:
+        JSON with counts (inserted, updated, deactivated, unchanged,
+        rejected, rate_cards) and the changes (the first few of each kind)
+    """
+    try:
+        changes = sync_vendors(storage, iter_vendor_csv(file_path), check_vendors, dry_run=dry_run,
+                               effective_from=effective_from or None)
+        report = change_report(changes)
+        return dump({
+            "status": "success",
+            "dry_run": dry_run,
+            "counts": change_counts(changes),
+            "changes": {kind: entries[:SAMPLE_SIZE] for kind, entries in report.items()},
+            "truncated": any(len(entries) > SAMPLE_SIZE for entries in report.values())
+        })
+    
+    except FileNotFoundError:
+        return json.dumps({"status": "error", "message": f"File not found: {file_path}"})
+    except Exception as e:
+        return json.dumps({"status": "error", "message": str(e)})
 
 
 # ============================================================
@@ -195,7 +377,7 @@ vendor_onboarding_agent = Agent(
     information is present. You flag any concerns but still process 
     vendors that meet minimum requirements.""",
     
-    tools=[read_vendor_csv, validate_vendor, save_vendor_to_database],
+    tools=[read_vendor_csv, validate_vendor, validate_vendors_batch, save_vendor_to_database, save_vendors_batch, ingest_vendor_csv, sync_vendor_csv],
     
     llm=llm,
     verbose=True
@@ -211,11 +393,18 @@ onboarding_task = Task(
     Onboard law firm vendors from the CSV file: law_firms.csv
     
     Steps:
-    1. Use read_vendor_csv tool to load the vendor data
-    2. For EACH vendor:
-       a. Use validate_vendor tool to check their data
-       b. If valid (even with warnings), use save_vendor_to_database
-       c. If invalid, note the errors but don't save
+    1. Use read_vendor_csv to load the vendor data one page at a time,
+       passing next_cursor back in until has_more is false
+    2. Pass each page's "vendors" to save_vendors_batch in ONE call.
+       It validates every vendor, saves the valid ones (even with
+       warnings) together, and reports the invalid ones with errors.
+       (To re-check vendors without saving, pass them all to
+       validate_vendors_batch in one call. validate_vendor and
+       save_vendor_to_database remain available for a single
+       corrected vendor.)
+       For a very large file, call ingest_vendor_csv on it once instead
+       of paging through it - it validates and saves every row itself
+       and returns counts plus sample problems.
     3. Provide a summary report showing:
        - Total vendors processed
        - Successfully onboarded (with vendor IDs)
@@ -233,6 +422,30 @@ onboarding_task = Task(
 )
 
 
+sync_task = Task(
+    description="""
+    Apply the vendor feed law_firms.csv to the existing vendor database.
+    
+    Steps:
+    1. Call sync_vendor_csv on law_firms.csv once. It validates every
+       row, adds new firms, updates changed firms under their existing
+       vendor IDs and deactivates firms that are no longer listed.
+    2. Provide a change report showing:
+       - Vendors added (with their new IDs)
+       - Vendors updated (which fields changed, old and new values)
+       - Vendors deactivated
+       - Rows that failed validation (with reasons)
+    """,
+    
+    expected_output="""A change report with:
+    - Counts of added, updated, deactivated and unchanged vendors
+    - The changed vendors with their IDs and what changed
+    - Any rows that failed validation""",
+    
+    agent=vendor_onboarding_agent
+)
+
+
 # ============================================================
 # CREW
 # ============================================================
@@ -243,6 +456,13 @@ crew = Crew(
     verbose=True
 )
 
+# Re-onboarding: keeps the database and applies only the changes
+sync_crew = Crew(
+    agents=[vendor_onboarding_agent],
+    tasks=[sync_task],
+    verbose=True
+)
+
 
 # ============================================================
 # RUN
@@ -259,12 +479,17 @@ if __name__ == "__main__":
     print("4. Generate summary report")
     print("="*60 + "\n")
     
-    # Clean up any existing database for fresh demo
-    if os.path.exists(VENDOR_DB_PATH):
-        os.remove(VENDOR_DB_PATH)
-        print("(Cleared existing database for fresh demo)\n")
-    
-    result = crew.kickoff()
+    if "--incremental" in sys.argv and storage.vendor_count():
+        # Keep the database (and its vendor IDs); apply only the changes
+        print("(Applying law_firms.csv to the existing database)\n")
+        result = sync_crew.kickoff()
+    else:
+        # Clean up any existing database for fresh demo
+        if storage.vendor_count():
+            storage.clear_vendors()
+            print("(Cleared existing database for fresh demo)\n")
+        
+        result = crew.kickoff()
     
     print("\n" + "="*60)
     print("ONBOARDING COMPLETE")
@@ -275,33 +500,36 @@ if __name__ == "__main__":
     print("\n" + "="*60)
     print("VENDOR DATABASE CONTENTS:")
     print("="*60)
-    if os.path.exists(VENDOR_DB_PATH):
-        with open(VENDOR_DB_PATH, 'r') as f:
-            db = json.load(f)
-            print(f"Total vendors in database: {len(db['vendors'])}")
-            for v in db['vendors']:
-                print(f"  - {v['vendor_id']}: {v['firm_name']} ({v['status']})")
+    vendors = storage.list_vendors()
+    if vendors:
+        print(f"Total vendors in database: {len(vendors)}")
+        for v in vendors:
+            print(f"  - {v['vendor_id']}: {v['firm_name']} ({v['status']})")
 
 
 # ============================================================
 # KEY CONCEPTS IN THIS LESSON:
 # ============================================================
 #
-# 1. MULTIPLE TOOLS: Agent has 3 tools it can call:
+# 1. MULTIPLE TOOLS: Agent has several tools it can call:
 #    - read_vendor_csv: Load data from file
 #    - validate_vendor: Check data quality
 #    - save_vendor_to_database: Persist to storage
+#    - save_vendors_batch: Validate + persist a whole list at once
+#    - ingest_vendor_csv: Stream a whole CSV through validate + save
+#    - sync_vendor_csv: Apply a CSV to the existing vendors as a diff
 #
 # 2. TOOL CHAINING: Agent decides the order:
-#    read → validate → save (for each vendor)
+#    read → validate → save (batched: one write per list)
 #
-# 3. DATA PERSISTENCE: Simple JSON "database"
-#    (In production, use real database)
+# 3. DATA PERSISTENCE: Pluggable storage layer
+#    (JSON files by default, SQLite with EBILLING_STORAGE=sqlite)
 #
 # 4. VALIDATION LOGIC: Business rules in tools
 #    - Rate caps
 #    - Required fields
 #    - Valid status values
+#    (declared once in vendor_rules.py; the web app uses the same rules)
 #
 # NEXT: Agent 2 - Invoice Processing
 # ============================================================
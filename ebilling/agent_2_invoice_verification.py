@@ -9,12 +9,20 @@
 # WORKFLOW:
 # 1. Read invoices from inbox (simulated email)
 # 2. Look up vendor in database (from Agent 1)
-# 3. Verify rates match contracted rates
+# 3. Verify rates match the contracted rates in force on the
+#    invoice date (rate cards, see rate_cards.py)
 # 4. Check for any red flags (excessive hours, etc.)
-# 5. Approve or reject with reasons
-# 6. Notify Accounts Payable
+# 5. Check for duplicates of earlier invoices (duplicate_index.py)
+# 6. Approve or reject with reasons
+# 7. Notify Accounts Payable
 #
 # RUN: python3 agent_2_invoice_verification.py
+#      python3 agent_2_invoice_verification.py --fast-path
+#        (rule-only invoices skip the LLM; only ambiguous ones
+#         are escalated to the agent)
+#      python3 agent_2_invoice_verification.py --full
+#        (re-verify every invoice; by default only new invoices and
+#         invoices whose vendor rates changed since the last run are)
 #
 # PREREQUISITE: Run agent_1_vendor_onboarding.py first to 
 #               create the vendor database!
@@ -22,22 +30,45 @@
 
 from crewai import Agent, Task, Crew
 from crewai.tools import tool
-from langchain_anthropic import ChatAnthropic
+import atexit
 import json
 import os
 from datetime import datetime
+import sys
+from collections import deque
+from itertools import islice
 
-llm = ChatAnthropic(model="claude-sonnet-4-20250514")
+from inbox_reader import iter_invoices, iter_invoices_from
+from llm_cache import cached_tool, make_llm
+from metrics import export_from_env, timed_tool
+from storage import get_storage
+from tool_output import decode_file_cursor, dump, page_info, records
+from verification_state import IncrementalRun
+
+# Completions are cached in llm_cache.db (see llm_cache.py)
+llm = make_llm()
+# Tool timings are exported if EBILLING_METRICS_PORT/FILE is set (see metrics.py)
+export_from_env()
 
 
 # ============================================================
 # PATHS
 # ============================================================
 
-VENDOR_DB_PATH = "vendor_database.json"
 INBOX_PATH = "inbox/invoices.json"
 PROCESSED_PATH = "processed_invoices.json"
-AP_NOTIFICATIONS_PATH = "ap_notifications.json"
+ESCALATED_PATH = "escalated_invoices.jsonl"
+PENDING_PATH = "pending_invoices.jsonl"
+
+# Vendors and AP notifications go through the storage layer
+# (JSON files by default, SQLite with EBILLING_STORAGE=sqlite).
+# Buffered notification appends are flushed on exit.
+storage = get_storage()
+atexit.register(storage.close)
+
+# Set by an incremental run: re-verified invoices keep their
+# notification_id, and every notification sent is recorded
+incremental_run = None
 
 
 # ============================================================
@@ -45,25 +76,41 @@ AP_NOTIFICATIONS_PATH = "ap_notifications.json"
 # ============================================================
 
 @tool
-def read_invoices_from_inbox() -> str:
+@timed_tool
+def read_invoices_from_inbox(cursor: str = "", limit: int = 25, inbox_path: str = "") -> str:
     """
     Read pending invoices from the Accounts Payable inbox.
     These are invoices submitted by law firms awaiting verification.
+    The inbox is read one page at a time - call again with next_cursor
+    until has_more is false.
+    
+    Args:
+        cursor: next_cursor from the previous page ("" for the first page)
+        limit: Maximum number of invoices to return
+        inbox_path: Inbox file to read ("" for the default inbox)
     
     Returns:
-        JSON with list of invoices to process
+        JSON with a page of invoices to process
     """
     try:
-        if not os.path.exists(INBOX_PATH):
+        path = inbox_path or INBOX_PATH
+        if not os.path.exists(path):
             return json.dumps({"error": "No invoices in inbox", "invoices": []})
         
-        with open(INBOX_PATH, 'r') as f:
-            invoices = json.load(f)
+        # Stream the inbox from where the previous page ended, so only this
+        # page is ever read or held in memory
+        offset, position = decode_file_cursor(cursor, "read_invoices_from_inbox", path)
+        stream = iter_invoices_from(path, position)
+        page = list(islice(stream, limit))
+        has_more = next(stream, None) is not None
+        invoices = [invoice for invoice, _ in page]
+        end = page[-1][1] if page else position
         
-        return json.dumps({
+        return dump({
             "invoice_count": len(invoices),
+            **page_info("read_invoices_from_inbox", offset, len(invoices), has_more, path, end),
             "invoices": invoices
-        }, indent=2)
+        })
     
     except Exception as e:
         return json.dumps({"error": str(e)})
@@ -73,49 +120,63 @@ def read_invoices_from_inbox() -> str:
 # TOOL 2: Look Up Vendor Rates
 # ============================================================
 
+def find_vendor_rates(firm_name, as_of=None):
+    """
+    Look up a firm's contracted rates; returns the lookup_vendor_rates result as a dict.
+    
+    With as_of (an invoice date) the rates are the ones in force on that
+    date: the vendor's rate cards where they apply, else its record's rates.
+    """
+    if not storage.vendor_count():
+        return {
+            "error": "Vendor database not found. Run Agent 1 first.",
+            "found": False
+        }
+    
+    # Search for vendor (case-insensitive partial match, first wins)
+    vendor = storage.find_vendor(firm_name)
+    if vendor:
+        rates = {
+            "partner": float(vendor["partner_rate"]),
+            "associate": float(vendor["associate_rate"]),
+            "paralegal": float(vendor["paralegal_rate"])
+        }
+        found = {
+            "found": True,
+            "vendor_id": vendor["vendor_id"],
+            "firm_name": vendor["firm_name"],
+            "status": vendor["status"],
+            "contracted_rates": rates,
+            "payment_terms": vendor["payment_terms"]
+        }
+        if as_of:
+            found["contracted_rates"] = storage.rate_card_index().rates_in_force(vendor["vendor_id"], as_of, rates)
+            found["rates_as_of"] = as_of
+        return found
+    
+    return {
+        "found": False,
+        "error": f"Vendor '{firm_name}' not found in database"
+    }
+
+
 @tool
-def lookup_vendor_rates(firm_name: str) -> str:
+@timed_tool
+def lookup_vendor_rates(firm_name: str, as_of: str = "") -> str:
     """
     Look up contracted rates for a law firm from the vendor database.
     Use this to compare invoice rates against what we agreed to pay.
     
     Args:
         firm_name: The name of the law firm (e.g., "Baker & Sterling LLP")
+        as_of: The invoice's invoice_date (YYYY-MM-DD) - rates change over
+               time, so pass it to get the rates in force on that date
     
     Returns:
         JSON with vendor details including contracted rates and status
     """
     try:
-        if not os.path.exists(VENDOR_DB_PATH):
-            return json.dumps({
-                "error": "Vendor database not found. Run Agent 1 first.",
-                "found": False
-            })
-        
-        with open(VENDOR_DB_PATH, 'r') as f:
-            db = json.load(f)
-        
-        # Search for vendor (case-insensitive partial match)
-        firm_lower = firm_name.lower()
-        for vendor in db["vendors"]:
-            if firm_lower in vendor["firm_name"].lower():
-                return json.dumps({
-                    "found": True,
-                    "vendor_id": vendor["vendor_id"],
-                    "firm_name": vendor["firm_name"],
-                    "status": vendor["status"],
-                    "contracted_rates": {
-                        "partner": float(vendor["partner_rate"]),
-                        "associate": float(vendor["associate_rate"]),
-                        "paralegal": float(vendor["paralegal_rate"])
-                    },
-                    "payment_terms": vendor["payment_terms"]
-                }, indent=2)
-        
-        return json.dumps({
-            "found": False,
-            "error": f"Vendor '{firm_name}' not found in database"
-        })
+        return dump(find_vendor_rates(firm_name, as_of or None))
     
     except Exception as e:
         return json.dumps({"error": str(e), "found": False})
@@ -125,7 +186,95 @@ def lookup_vendor_rates(firm_name: str) -> str:
 # TOOL 3: Verify Invoice
 # ============================================================
 
+def check_invoice(invoice, vendor):
+    """
+    Apply the rate rules to one invoice.
+    
+    Args:
+        invoice: Invoice dict from the inbox
+        vendor: Result of find_vendor_rates for the invoice's firm
+    
+    Returns:
+        The verify_invoice result as a dict
+    """
+    if not vendor.get("found"):
+        return {
+            "invoice_id": invoice.get("invoice_id"),
+            "status": "REJECTED",
+            "reason": "Vendor not found in database"
+        }
+    
+    # Check if vendor is active
+    if vendor.get("status") == "inactive":
+        return {
+            "invoice_id": invoice.get("invoice_id"),
+            "firm_name": invoice.get("firm_name"),
+            "status": "REJECTED",
+            "reason": f"Vendor '{invoice.get('firm_name')}' is INACTIVE. Cannot process invoices from inactive vendors."
+        }
+    
+    discrepancies = []
+    warnings = []
+    total_overcharge = 0
+    
+    contracted = vendor.get("contracted_rates", {})
+    
+    for item in invoice.get("line_items", []):
+        level = item.get("level", "").lower()
+        billed_rate = float(item.get("rate", 0))
+        contracted_rate = contracted.get(level, 0)
+        
+        # Check rate
+        if billed_rate > contracted_rate:
+            overcharge = (billed_rate - contracted_rate) * item.get("hours", 0)
+            total_overcharge += overcharge
+            discrepancies.append({
+                "timekeeper": item.get("timekeeper"),
+                "level": level,
+                "issue": "RATE EXCEEDS CONTRACT",
+                "billed_rate": billed_rate,
+                "contracted_rate": contracted_rate,
+                "hours": item.get("hours"),
+                "overcharge_amount": overcharge
+            })
+        
+        # Check for excessive hours (warning only)
+        hours = item.get("hours", 0)
+        if hours > 10 and level == "partner":
+            warnings.append({
+                "timekeeper": item.get("timekeeper"),
+                "issue": f"High partner hours ({hours}hrs) - consider reviewing"
+            })
+        if hours > 20:
+            warnings.append({
+                "timekeeper": item.get("timekeeper"),
+                "issue": f"Excessive hours ({hours}hrs) on single invoice - consider reviewing"
+            })
+    
+    # Determine status
+    if discrepancies:
+        status = "FLAGGED"
+        recommendation = f"Invoice has rate discrepancies totaling ${total_overcharge:.2f}. Request corrected invoice or approve adjusted amount."
+    else:
+        status = "APPROVED"
+        recommendation = "Invoice verified. Rates match contract. Clear for payment."
+    
+    return {
+        "invoice_id": invoice.get("invoice_id"),
+        "firm_name": invoice.get("firm_name"),
+        "matter": invoice.get("matter"),
+        "invoice_amount": invoice.get("total_amount"),
+        "status": status,
+        "discrepancies": discrepancies,
+        "total_overcharge": total_overcharge,
+        "warnings": warnings,
+        "recommendation": recommendation
+    }
+
+
 @tool
+@timed_tool
+@cached_tool
 def verify_invoice(invoice_json: str, vendor_rates_json: str) -> str:
     """
     Verify an invoice against contracted vendor rates.
@@ -133,98 +282,160 @@ def verify_invoice(invoice_json: str, vendor_rates_json: str) -> str:
     
     Args:
         invoice_json: JSON string of the invoice to verify
-        vendor_rates_json: JSON string of vendor's contracted rates
+        vendor_rates_json: JSON string of vendor's contracted rates (from
+                           lookup_vendor_rates with as_of=invoice_date)
     
     Returns:
         Verification result with any discrepancies found
     """
     try:
-        invoice = json.loads(invoice_json)
-        vendor = json.loads(vendor_rates_json)
-        
-        if not vendor.get("found"):
-            return json.dumps({
-                "invoice_id": invoice.get("invoice_id"),
-                "status": "REJECTED",
-                "reason": "Vendor not found in database"
-            })
-        
-        # Check if vendor is active
-        if vendor.get("status") == "inactive":
-            return json.dumps({
-                "invoice_id": invoice.get("invoice_id"),
-                "firm_name": invoice.get("firm_name"),
-                "status": "REJECTED",
-                "reason": f"Vendor '{invoice.get('firm_name')}' is INACTIVE. Cannot process invoices from inactive vendors."
-            })
-        
-        discrepancies = []
-        warnings = []
-        total_overcharge = 0
-        
-        contracted = vendor.get("contracted_rates", {})
+        invoice = records(json.loads(invoice_json))
+        vendor = records(json.loads(vendor_rates_json))
+        return dump(check_invoice(invoice, vendor))
+    
+    except Exception as e:
+        return json.dumps({"error": str(e), "status": "ERROR"})
+
+
+# ============================================================
+# DUPLICATE CHECK
+# ============================================================
+# prepare_pending checks every pending invoice against the duplicate
+# index (duplicate_index.py); a duplicate is written to the pending inbox
+# with the earlier invoice under "duplicate_of"
+
+def flag_duplicate(result, match):
+    """
+    Apply an invoice's duplicate_of match to its check_invoice result.
+    
+    An exact duplicate is rejected; a near duplicate of an otherwise
+    approved invoice is flagged for review.
+    """
+    if not match:
+        return result
+    from duplicate_index import duplicate_reason
+    reason = duplicate_reason(match)
+    field = "recommendation" if "recommendation" in result else "reason"
+    if match["match"] == "exact" and result.get("status") != "REJECTED":
+        result["status"] = "REJECTED"
+    elif result.get("status") == "APPROVED":
+        result["status"] = "FLAGGED"
+    else:
+        reason = f"{result.get(field)}; {reason}"
+    result[field] = reason
+    result["duplicate_of"] = match
+    return result
+
+
+# ============================================================
+# TOOL 3b: Verify a Page of Invoices at Once
+# ============================================================
+
+@tool
+@timed_tool
+def verify_invoices_batch(invoices_json: str) -> str:
+    """
+    Look up vendor rates for and verify many invoices in one call.
+    Prefer this over lookup_vendor_rates + verify_invoice per invoice:
+    pass the "invoices" list of a read_invoices_from_inbox page.
+    
+    Args:
+        invoices_json: JSON array of invoices (or {"invoices": [...]})
+    
+    Returns:
+        JSON with one verification result per invoice (in input order,
+        with its index), plus invoices that could not be verified under
+        "errors". Invoices with "duplicate_of" (duplicates of earlier
+        invoices) are rejected (exact) or flagged (near).
+    """
+    try:
+        invoices = records(json.loads(invoices_json))
+        if isinstance(invoices, dict):
+            invoices = invoices.get("invoices", [])
         
-        for item in invoice.get("line_items", []):
-            level = item.get("level", "").lower()
-            billed_rate = float(item.get("rate", 0))
-            contracted_rate = contracted.get(level, 0)
-            
-            # Check rate
-            if billed_rate > contracted_rate:
-                overcharge = (billed_rate - contracted_rate) * item.get("hours", 0)
-                total_overcharge += overcharge
-                discrepancies.append({
-                    "timekeeper": item.get("timekeeper"),
-                    "level": level,
-                    "issue": "RATE EXCEEDS CONTRACT",
-                    "billed_rate": billed_rate,
-                    "contracted_rate": contracted_rate,
-                    "hours": item.get("hours"),
-                    "overcharge_amount": overcharge
-                })
-            
-            # Check for excessive hours (warning only)
-            hours = item.get("hours", 0)
-            if hours > 10 and level == "partner":
-                warnings.append({
-                    "timekeeper": item.get("timekeeper"),
-                    "issue": f"High partner hours ({hours}hrs) - consider reviewing"
-                })
-            if hours > 20:
-                warnings.append({
-                    "timekeeper": item.get("timekeeper"),
-                    "issue": f"Excessive hours ({hours}hrs) on single invoice - consider reviewing"
-                })
+        results = []
+        item_errors = []
+        rates_by_firm = {}
+        for index, invoice in enumerate(invoices):
+            try:
+                key = (invoice.get("firm_name", ""), invoice.get("invoice_date"))
+                if key not in rates_by_firm:
+                    rates_by_firm[key] = find_vendor_rates(*key)
+                result = flag_duplicate(check_invoice(invoice, rates_by_firm[key]), invoice.get("duplicate_of"))
+                results.append(dict(result, index=index))
+            except Exception as e:
+                invoice_id = invoice.get("invoice_id") if isinstance(invoice, dict) else None
+                item_errors.append({"index": index, "invoice_id": invoice_id, "error": str(e)})
         
-        # Determine status
-        if discrepancies:
-            status = "FLAGGED"
-            recommendation = f"Invoice has rate discrepancies totaling ${total_overcharge:.2f}. Request corrected invoice or approve adjusted amount."
-        else:
-            status = "APPROVED"
-            recommendation = "Invoice verified. Rates match contract. Clear for payment."
+        by_status = {}
+        for r in results:
+            by_status[r["status"]] = by_status.get(r["status"], 0) + 1
         
-        return json.dumps({
-            "invoice_id": invoice.get("invoice_id"),
-            "firm_name": invoice.get("firm_name"),
-            "matter": invoice.get("matter"),
-            "invoice_amount": invoice.get("total_amount"),
-            "status": status,
-            "discrepancies": discrepancies,
-            "total_overcharge": total_overcharge,
-            "warnings": warnings,
-            "recommendation": recommendation
-        }, indent=2)
+        return dump({
+            "count": len(invoices),
+            "by_status": by_status,
+            "results": results,
+            "errors": item_errors
+        })
     
-    except Exception as e:
-        return json.dumps({"error": str(e), "status": "ERROR"})
+    except json.JSONDecodeError:
+        return json.dumps({"error": "Invalid JSON format", "results": []})
 
 
 # ============================================================
 # TOOL 4: Send AP Notification
 # ============================================================
 
+def notify_ap(result):
+    """Record an AP notification for a verification result; returns the send_ap_notification result."""
+    # Create notification (a re-verified invoice replaces its previous one)
+    notification = {
+        "notification_id": None,
+        "timestamp": datetime.now().isoformat(),
+        "invoice_id": result.get("invoice_id"),
+        "firm_name": result.get("firm_name"),
+        "amount": result.get("invoice_amount"),
+        "status": result.get("status"),
+        "action_required": "RELEASE_PAYMENT" if result.get("status") == "APPROVED" else "HOLD_PAYMENT",
+        "details": result.get("recommendation"),
+        "discrepancies": result.get("discrepancies", []),
+        "total_overcharge": result.get("total_overcharge", 0)
+    }
+    if result.get("duplicate_of"):
+        notification["duplicate_of"] = result["duplicate_of"]
+    
+    # Append to the notification log (no full-file rewrite). The lock keeps
+    # numbering unique when several crews notify at once, and covers the
+    # shared incremental run from lookup to record, so two crews never
+    # take the same pending record's notification_id
+    with storage.locked():
+        if incremental_run:
+            notification["notification_id"] = incremental_run.previous_notification_id(result.get("invoice_id"))
+        if not notification["notification_id"]:
+            notification["notification_id"] = storage.next_notification_id()
+        storage.append_notification(notification)
+        if incremental_run:
+            incremental_run.record(result.get("invoice_id"), notification["notification_id"])
+    
+    # Format message based on status
+    if result.get("status") == "APPROVED":
+        message = f"✅ APPROVED: Invoice {result.get('invoice_id')} from {result.get('firm_name')} for ${result.get('invoice_amount'):,.2f} - RELEASE PAYMENT"
+    elif result.get("status") == "FLAGGED" and result.get("duplicate_of"):
+        message = f"⚠️ FLAGGED: Invoice {result.get('invoice_id')} from {result.get('firm_name')} - HOLD PAYMENT - {result.get('recommendation')}"
+    elif result.get("status") == "FLAGGED":
+        message = f"⚠️ FLAGGED: Invoice {result.get('invoice_id')} from {result.get('firm_name')} - HOLD PAYMENT - Overcharge of ${result.get('total_overcharge'):,.2f} detected"
+    else:
+        message = f"❌ REJECTED: Invoice {result.get('invoice_id')} from {result.get('firm_name')} - {result.get('recommendation')}"
+    
+    return {
+        "notification_sent": True,
+        "notification_id": notification["notification_id"],
+        "message": message
+    }
+
+
 @tool
+@timed_tool
 def send_ap_notification(verification_result_json: str) -> str:
     """
     Send notification to Accounts Payable with invoice decision.
@@ -237,53 +448,174 @@ def send_ap_notification(verification_result_json: str) -> str:
         Confirmation that AP was notified
     """
     try:
-        result = json.loads(verification_result_json)
-        
-        # Load existing notifications or create new
-        if os.path.exists(AP_NOTIFICATIONS_PATH):
-            with open(AP_NOTIFICATIONS_PATH, 'r') as f:
-                notifications = json.load(f)
-        else:
-            notifications = {"notifications": []}
-        
-        # Create notification
-        notification = {
-            "notification_id": f"AP-{len(notifications['notifications']) + 1:04d}",
-            "timestamp": datetime.now().isoformat(),
-            "invoice_id": result.get("invoice_id"),
-            "firm_name": result.get("firm_name"),
-            "amount": result.get("invoice_amount"),
-            "status": result.get("status"),
-            "action_required": "RELEASE_PAYMENT" if result.get("status") == "APPROVED" else "HOLD_PAYMENT",
-            "details": result.get("recommendation"),
-            "discrepancies": result.get("discrepancies", []),
-            "total_overcharge": result.get("total_overcharge", 0)
-        }
-        
-        notifications["notifications"].append(notification)
-        
-        # Save notifications
-        with open(AP_NOTIFICATIONS_PATH, 'w') as f:
-            json.dump(notifications, f, indent=2)
-        
-        # Format message based on status
-        if result.get("status") == "APPROVED":
-            message = f"✅ APPROVED: Invoice {result.get('invoice_id')} from {result.get('firm_name')} for ${result.get('invoice_amount'):,.2f} - RELEASE PAYMENT"
-        elif result.get("status") == "FLAGGED":
-            message = f"⚠️ FLAGGED: Invoice {result.get('invoice_id')} from {result.get('firm_name')} - HOLD PAYMENT - Overcharge of ${result.get('total_overcharge'):,.2f} detected"
-        else:
-            message = f"❌ REJECTED: Invoice {result.get('invoice_id')} from {result.get('firm_name')} - {result.get('recommendation')}"
-        
-        return json.dumps({
-            "notification_sent": True,
-            "notification_id": notification["notification_id"],
-            "message": message
-        }, indent=2)
+        result = records(json.loads(verification_result_json))
+        return dump(notify_ap(result))
     
     except Exception as e:
         return json.dumps({"notification_sent": False, "error": str(e)})
 
 
+# ============================================================
+# TOOL 4b: Send Many AP Notifications at Once
+# ============================================================
+
+@tool
+@timed_tool
+def send_ap_notifications_batch(verification_results_json: str) -> str:
+    """
+    Notify Accounts Payable of many invoice decisions in one call.
+    Pass the "results" list returned by verify_invoices_batch.
+    
+    Args:
+        verification_results_json: JSON array of verification results
+                                   (or {"results": [...]})
+    
+    Returns:
+        JSON with one confirmation per result (in input order, with its
+        index), plus results that could not be sent under "errors"
+    """
+    try:
+        results = records(json.loads(verification_results_json))
+        if isinstance(results, dict):
+            results = results.get("results", [])
+        
+        sent = []
+        item_errors = []
+        # One storage batch: notifications are synced once at the end
+        with storage.batch():
+            for index, result in enumerate(results):
+                try:
+                    sent.append(dict(notify_ap(result), index=index))
+                except Exception as e:
+                    invoice_id = result.get("invoice_id") if isinstance(result, dict) else None
+                    item_errors.append({"index": index, "invoice_id": invoice_id, "error": str(e)})
+        
+        return dump({
+            "notifications_sent": len(sent),
+            "sent": sent,
+            "errors": item_errors
+        })
+    
+    except json.JSONDecodeError:
+        return json.dumps({"notifications_sent": 0, "error": "Invalid JSON format"})
+
+
+# ============================================================
+# FAST PATH: Rule-Only Decisions Without the LLM
+# ============================================================
+# Most invoices are decided purely by check_invoice's rules. Those are
+# processed directly (lookup -> verify -> notify) with no model calls;
+# only invoices that need judgement are escalated to the agent:
+#   - vendor not found (possible name variant / typo)
+#   - timekeeper level with no contracted rate
+#   - hours warnings that call for review
+#   - a near duplicate of an earlier invoice (an exact one is rejected)
+
+KNOWN_LEVELS = ("partner", "associate", "paralegal")
+
+
+def escalation_reason(invoice, vendor, result, match=None):
+    """Why an invoice needs the agent, or None if the rules fully decide it."""
+    if result.get("status") == "ERROR":
+        return "verification error"
+    if match and match["match"] == "near":
+        return "possible duplicate"
+    if not vendor.get("found"):
+        return "vendor not found"
+    if vendor.get("status") == "inactive":
+        return None
+    contracted = vendor.get("contracted_rates", {})
+    for item in invoice.get("line_items", []):
+        level = item.get("level", "").lower()
+        if level not in KNOWN_LEVELS or level not in contracted:
+            return f"unknown timekeeper level '{item.get('level')}'"
+    if result.get("warnings"):
+        return "hours warnings need review"
+    return None
+
+
+def run_fast_path(invoices, escalated_path=ESCALATED_PATH):
+    """
+    Decide every rule-only invoice directly and queue the rest for the agent.
+    
+    Args:
+        invoices: Iterable of invoice dicts (e.g. iter_invoices(INBOX_PATH))
+        escalated_path: JSON Lines file the escalated invoices are written to
+    
+    Returns:
+        Report dict with per-path counts, decisions and escalated invoice IDs
+    """
+    report = {
+        "total": 0,
+        "fast_path": 0,
+        "escalated": 0,
+        "by_status": {"APPROVED": 0, "FLAGGED": 0, "REJECTED": 0},
+        "escalation_reasons": {},
+        "escalated_ids": []
+    }
+    with storage.batch(), open(escalated_path, 'w') as escalated:
+        for invoice in invoices:
+            report["total"] += 1
+            try:
+                vendor = find_vendor_rates(invoice.get("firm_name", ""), invoice.get("invoice_date"))
+                result = check_invoice(invoice, vendor)
+            except Exception as e:
+                vendor, result = {}, {"error": str(e), "status": "ERROR"}
+            
+            match = invoice.get("duplicate_of")
+            reason = escalation_reason(invoice, vendor, result, match)
+            if reason:
+                report["escalated"] += 1
+                report["escalation_reasons"][reason] = report["escalation_reasons"].get(reason, 0) + 1
+                report["escalated_ids"].append(invoice.get("invoice_id"))
+                escalated.write(json.dumps(invoice) + "\n")
+                continue
+            
+            notify_ap(flag_duplicate(result, match))
+            report["fast_path"] += 1
+            report["by_status"][result["status"]] += 1
+    return report
+
+
+# ============================================================
+# INCREMENTAL RUNS
+# ============================================================
+
+def prepare_pending(full=False):
+    """
+    Start a verification run: write the invoices that need verifying to PENDING_PATH.
+    
+    Invoices whose content and vendor rates are unchanged since the last
+    run are skipped. The rest are checked for duplicates of earlier
+    invoices and added to the duplicate index. The run's state is saved on
+    exit, so what was notified is recorded even if the run stops part-way.
+    
+    Args:
+        full: Re-verify every invoice (previous notifications are cleared)
+    
+    Returns:
+        The IncrementalRun (also set as incremental_run)
+    """
+    global incremental_run
+    if full:
+        storage.clear_notifications()
+    run = incremental_run = IncrementalRun(storage.load_verification_state(), storage.find_vendor, storage.rate_card_index())
+    # Runs before storage.close, which was registered first
+    atexit.register(lambda: storage.save_verification_state(run.verified))
+    # NumPy comes in with the index - only load it for a verification run
+    from duplicate_index import DuplicateIndex
+    duplicates = DuplicateIndex(storage.load_invoice_index())
+    records, matches = deque(), deque()
+    with open(PENDING_PATH, 'w') as pending:
+        for invoice in duplicates.screen(run.changed(iter_invoices(INBOX_PATH), records), matches, records):
+            match = matches.popleft()
+            if match:
+                invoice = dict(invoice, duplicate_of=match)
+            pending.write(json.dumps(invoice) + "\n")
+    storage.append_invoice_index(duplicates.new_columns())
+    return run
+
+
 # ============================================================
 # AGENT: Invoice Verification Specialist
 # ============================================================
@@ -306,7 +638,9 @@ invoice_verification_agent = Agent(
         read_invoices_from_inbox,
         lookup_vendor_rates,
         verify_invoice,
-        send_ap_notification
+        verify_invoices_batch,
+        send_ap_notification,
+        send_ap_notifications_batch
     ],
     
     llm=llm,
@@ -322,17 +656,30 @@ verification_task = Task(
     description="""
     Process all invoices in the AP inbox.
     
-    For EACH invoice:
-    1. Read the invoice details
-    2. Use lookup_vendor_rates to get the firm's contracted rates
-    3. Use verify_invoice to compare billed rates vs contracted rates
-    4. Use send_ap_notification to notify AP of the decision
+    Use read_invoices_from_inbox with inbox_path "{inbox_path}" to read
+    the inbox one page at a time, passing next_cursor back in until
+    has_more is false.
+    
+    For EACH page of invoices:
+    1. Pass the page's "invoices" list, unchanged (including any
+       "duplicate_of"), to verify_invoices_batch in ONE call - it looks
+       up each firm's contracted rates and compares billed rates vs
+       contracted rates for every invoice
+    2. Pass the returned "results" list to send_ap_notifications_batch
+       in ONE call to notify AP of every decision (results with
+       "duplicate_of" repeat an earlier invoice: keep their status and
+       mention them in the summary)
+    (lookup_vendor_rates, verify_invoice and send_ap_notification remain
+    available for re-checking a single invoice - pass the invoice's
+    invoice_date to lookup_vendor_rates as as_of, since contracted rates
+    change over time.)
     
     After processing all invoices, provide a summary:
     - Total invoices processed
     - Approved (ready for payment)
     - Flagged (need review/correction)
     - Rejected (cannot process)
+    - Duplicates of earlier invoices
     - Total dollar amount approved
     - Total overcharges detected
     """,
@@ -368,7 +715,7 @@ if __name__ == "__main__":
     print("="*60)
     
     # Check prerequisites
-    if not os.path.exists(VENDOR_DB_PATH):
+    if not storage.vendor_count():
         print("\n❌ ERROR: Vendor database not found!")
         print("   Please run agent_1_vendor_onboarding.py first.")
         print("="*60)
@@ -384,14 +731,41 @@ if __name__ == "__main__":
     print("1. Read invoices from AP inbox")
     print("2. Look up vendor contracted rates")
     print("3. Verify each invoice")
-    print("4. Notify AP of decisions")
+    print("4. Check for duplicates of earlier invoices")
+    print("5. Notify AP of decisions")
     print("="*60 + "\n")
     
-    # Clean up previous notifications for fresh demo
-    if os.path.exists(AP_NOTIFICATIONS_PATH):
-        os.remove(AP_NOTIFICATIONS_PATH)
+    # Skip invoices whose content and vendor rates are unchanged since the
+    # last run; only the rest are read by the agent / fast path
+    # (--full clears previous notifications and re-verifies everything)
+    prepare_pending(full="--full" in sys.argv)
+    INBOX_PATH = PENDING_PATH
+    if incremental_run.unchanged:
+        print(f"Skipping {len(incremental_run.unchanged)} invoice(s) unchanged since the last run\n")
     
-    result = crew.kickoff()
+    if not incremental_run.pending:
+        result = "No new or changed invoices - nothing to verify."
+    elif "--fast-path" in sys.argv:
+        # Decide rule-only invoices directly; the agent only sees escalations
+        report = run_fast_path(iter_invoices(INBOX_PATH))
+        
+        print("FAST PATH REPORT:")
+        print(f"   Invoices read: {report['total']}")
+        print(f"   Decided without the LLM: {report['fast_path']}")
+        for status, n in report["by_status"].items():
+            print(f"      {status}: {n}")
+        print(f"   Escalated to agent: {report['escalated']}")
+        for reason, n in report["escalation_reasons"].items():
+            print(f"      {reason}: {n}")
+        print("="*60 + "\n")
+        
+        if not report["escalated"]:
+            result = "All invoices decided by the fast path - no agent run needed."
+        else:
+            INBOX_PATH = ESCALATED_PATH
+            result = crew.kickoff(inputs={"inbox_path": INBOX_PATH})
+    else:
+        result = crew.kickoff(inputs={"inbox_path": INBOX_PATH})
     
     print("\n" + "="*60)
     print("VERIFICATION COMPLETE")
@@ -402,17 +776,14 @@ if __name__ == "__main__":
     print("\n" + "="*60)
     print("AP NOTIFICATIONS SENT:")
     print("="*60)
-    if os.path.exists(AP_NOTIFICATIONS_PATH):
-        with open(AP_NOTIFICATIONS_PATH, 'r') as f:
-            notifications = json.load(f)
-            for n in notifications["notifications"]:
-                status_icon = "✅" if n["action_required"] == "RELEASE_PAYMENT" else "⚠️" if n["status"] == "FLAGGED" else "❌"
-                print(f"\n{status_icon} {n['notification_id']}")
-                print(f"   Invoice: {n['invoice_id']} | {n['firm_name']}")
-                print(f"   Amount: ${n['amount']:,.2f}")
-                print(f"   Action: {n['action_required']}")
-                if n.get("total_overcharge", 0) > 0:
-                    print(f"   Overcharge: ${n['total_overcharge']:,.2f}")
+    for n in storage.iter_notifications():
+        status_icon = "✅" if n["action_required"] == "RELEASE_PAYMENT" else "⚠️" if n["status"] == "FLAGGED" else "❌"
+        print(f"\n{status_icon} {n['notification_id']}")
+        print(f"   Invoice: {n['invoice_id']} | {n['firm_name']}")
+        print(f"   Amount: ${n['amount']:,.2f}")
+        print(f"   Action: {n['action_required']}")
+        if n.get("total_overcharge", 0) > 0:
+            print(f"   Overcharge: ${n['total_overcharge']:,.2f}")
 
 
 # ============================================================
@@ -448,7 +819,7 @@ if __name__ == "__main__":
 #    - Overcharge calculation
 #
 # 4. OUTPUT FOR NEXT STEP:
-#    Creates ap_notifications.json for AP team
+#    Appends to the ap_notifications/ log for AP team
 #
 # NEXT: Agent 3 - Payment Processing or Reporting
 # ============================================================
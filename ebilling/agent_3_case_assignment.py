@@ -20,13 +20,22 @@
 
 from crewai import Agent, Task, Crew
 from crewai.tools import tool
-from langchain_anthropic import ChatAnthropic
 import json
 import csv
 import os
+from itertools import islice
 from datetime import datetime
 
-llm = ChatAnthropic(model="claude-sonnet-4-20250514")
+from assignment_solver import assign_matters
+from llm_cache import make_llm
+from metrics import export_from_env, timed_tool
+from storage import get_storage
+from tool_output import decode_cursor, decode_file_cursor, dump, iter_csv_from, page_info, records
+
+# Completions are cached in llm_cache.db (see llm_cache.py)
+llm = make_llm()
+# Tool timings are exported if EBILLING_METRICS_PORT/FILE is set (see metrics.py)
+export_from_env()
 
 
 # ============================================================
@@ -35,7 +44,10 @@ llm = ChatAnthropic(model="claude-sonnet-4-20250514")
 
 MATTERS_CSV_PATH = "matters.csv"
 LAWYERS_DB_PATH = "internal_lawyers.json"
-ASSIGNMENTS_DB_PATH = "matter_assignments.json"
+
+# Lawyers and assignments go through the storage layer
+# (JSON files by default, SQLite with EBILLING_STORAGE=sqlite)
+storage = get_storage()
 
 
 # ============================================================
@@ -43,34 +55,46 @@ ASSIGNMENTS_DB_PATH = "matter_assignments.json"
 # ============================================================
 
 @tool
-def read_matters_csv(file_path: str) -> str:
+@timed_tool
+def read_matters_csv(file_path: str, cursor: str = "", limit: int = 100) -> str:
     """
-    Read cases/matters from a CSV file for assignment.
+    Read cases/matters from a CSV file for assignment, one page at a time.
+    Call again with next_cursor until has_more is false.
     
     Args:
         file_path: Path to the CSV file containing matter data
+        cursor: next_cursor from the previous page ("" for the first page)
+        limit: Maximum number of matters to return
     
     Returns:
-        JSON with list of matters and their details
+        JSON with a page of matters and their details (the first page
+        also has the matter count by case type for the whole file)
     """
     try:
-        matters = []
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                matters.append(row)
+        # Resume where the previous page ended instead of re-reading the file
+        offset, position = decode_file_cursor(cursor, "read_matters_csv", file_path)
+        rows = iter_csv_from(file_path, position)
+        page = list(islice(rows, limit))
+        has_more = next(rows, None) is not None
+        matters = [row for row, _ in page]
+        end = page[-1][1] if page else position
         
-        # Group by case type for summary
-        case_types = {}
-        for m in matters:
-            ct = m.get("case_type", "other")
-            case_types[ct] = case_types.get(ct, 0) + 1
+        result = {"matter_count": len(matters)}
+        if offset == 0:
+            # Group by case type for summary (whole file)
+            case_types = {}
+            with open(file_path, 'r', encoding='utf-8') as f:
+                for m in csv.DictReader(f):
+                    ct = m.get("case_type", "other")
+                    case_types[ct] = case_types.get(ct, 0) + 1
+            result["total_matters"] = sum(case_types.values())
+            result["case_type_summary"] = case_types
         
-        return json.dumps({
-            "matter_count": len(matters),
-            "case_type_summary": case_types,
+        return dump({
+            **result,
+            **page_info("read_matters_csv", offset, len(matters), has_more, file_path, end),
             "matters": matters
-        }, indent=2)
+        })
     
     except FileNotFoundError:
         return json.dumps({"error": f"File not found: {file_path}"})
@@ -83,23 +107,32 @@ def read_matters_csv(file_path: str) -> str:
 # ============================================================
 
 @tool
-def get_internal_lawyers() -> str:
+@timed_tool
+def get_internal_lawyers(cursor: str = "", limit: int = 50) -> str:
     """
     Get list of internal lawyers with their practice areas and availability.
     Use this to find lawyers who can handle specific case types.
+    Lawyers are returned one page at a time - call again with
+    next_cursor until has_more is false.
+    
+    Args:
+        cursor: next_cursor from the previous page ("" for the first page)
+        limit: Maximum number of lawyers to return
     
     Returns:
-        JSON with lawyers, their practice areas, and current caseload
+        JSON with a page of lawyers, their practice areas, and current
+        caseload, plus a practice area index of the page's available lawyers
     """
     try:
-        if not os.path.exists(LAWYERS_DB_PATH):
+        all_lawyers = storage.list_lawyers()
+        if not all_lawyers:
             return json.dumps({"error": "Lawyers database not found"})
         
-        with open(LAWYERS_DB_PATH, 'r') as f:
-            data = json.load(f)
+        offset = decode_cursor(cursor, "get_internal_lawyers")
+        lawyers = all_lawyers[offset:offset + limit]
         
         # Add availability info
-        for lawyer in data["lawyers"]:
+        for lawyer in lawyers:
             available_capacity = lawyer["max_caseload"] - lawyer["current_caseload"]
             lawyer["available_capacity"] = available_capacity
             lawyer["is_available"] = (
@@ -109,7 +142,7 @@ def get_internal_lawyers() -> str:
         
         # Create practice area index
         practice_area_index = {}
-        for lawyer in data["lawyers"]:
+        for lawyer in lawyers:
             if lawyer["is_available"]:
                 for area in lawyer["practice_areas"]:
                     if area not in practice_area_index:
@@ -120,12 +153,13 @@ def get_internal_lawyers() -> str:
                         "available_capacity": lawyer["available_capacity"]
                     })
         
-        return json.dumps({
-            "total_lawyers": len(data["lawyers"]),
-            "available_lawyers": sum(1 for l in data["lawyers"] if l["is_available"]),
+        return dump({
+            "total_lawyers": len(all_lawyers),
+            "available_lawyers": sum(1 for l in all_lawyers if l["status"] == "active" and l["max_caseload"] > l["current_caseload"]),
+            **page_info("get_internal_lawyers", offset, len(lawyers), offset + len(lawyers) < len(all_lawyers)),
             "practice_area_index": practice_area_index,
-            "lawyers": data["lawyers"]
-        }, indent=2)
+            "lawyers": lawyers
+        })
     
     except Exception as e:
         return json.dumps({"error": str(e)})
@@ -136,6 +170,7 @@ def get_internal_lawyers() -> str:
 # ============================================================
 
 @tool
+@timed_tool
 def find_best_lawyer(case_type: str, priority: str) -> str:
     """
     Find the best available lawyer for a specific case type.
@@ -149,67 +184,162 @@ def find_best_lawyer(case_type: str, priority: str) -> str:
         JSON with recommended lawyer or explanation if none available
     """
     try:
-        if not os.path.exists(LAWYERS_DB_PATH):
-            return json.dumps({"error": "Lawyers database not found"})
-        
-        with open(LAWYERS_DB_PATH, 'r') as f:
-            data = json.load(f)
-        
-        # Normalize case type
-        case_type_lower = case_type.lower().strip()
+        return dump(best_lawyer(case_type, priority))
+    
+    except Exception as e:
+        return json.dumps({"error": str(e), "found": False})
+
+
+def best_lawyer(case_type, priority):
+    """find_best_lawyer's result for one case type and priority."""
+    # Shared practice-area index, kept current as matters are assigned
+    index = storage.lawyer_index()
+    if not len(index):
+        return {"error": "Lawyers database not found"}
+    
+    # Normalize case type
+    case_type_lower = case_type.lower().strip()
+    
+    # Top available lawyers for this practice area: most capacity
+    # first for high priority, lowest caseload first otherwise
+    candidates = []
+    for lawyer in index.ranked([case_type_lower], priority, limit=3):
+        candidates.append({
+            "lawyer_id": lawyer["lawyer_id"],
+            "name": lawyer["name"],
+            "title": lawyer["title"],
+            "email": lawyer["email"],
+            "available_capacity": lawyer["max_caseload"] - lawyer["current_caseload"],
+            "current_caseload": lawyer["current_caseload"],
+            "practice_areas": lawyer["practice_areas"]
+        })
+    
+    if not candidates:
+        # No exact match - suggest general counsel review
+        return {
+            "found": False,
+            "case_type": case_type,
+            "message": f"No available lawyer with '{case_type}' expertise. Recommend manual assignment or General Counsel review.",
+            "suggestion": "Assign to General Counsel for triage"
+        }
+    
+    best = candidates[0]
+    
+    return {
+        "found": True,
+        "case_type": case_type,
+        "recommended_lawyer": best,
+        "other_options": candidates[1:3] if len(candidates) > 1 else []
+    }
+
+
+@tool
+@timed_tool
+def find_best_lawyers_batch(matters_json: str) -> str:
+    """
+    Find the best available lawyer for many matters in one call.
+    Each lookup sees current caseloads; nothing is assigned, so matters
+    looked up together may get the same recommendation - use
+    plan_matter_assignments for a balanced plan of a whole CSV.
+    
+    Args:
+        matters_json: JSON array of objects with case_type and priority
+                      (e.g. matters from read_matters_csv)
+    
+    Returns:
+        JSON with one recommendation per matter (in input order, with its
+        index and matter_id), plus matters that could not be looked up
+        under "errors"
+    """
+    try:
+        matters = records(json.loads(matters_json))
+        if isinstance(matters, dict):
+            matters = matters.get("matters", [])
         
-        # Find matching lawyers
-        candidates = []
-        for lawyer in data["lawyers"]:
-            # Skip inactive or on leave
-            if lawyer["status"] != "active":
-                continue
-            
-            # Check capacity
-            available = lawyer["max_caseload"] - lawyer["current_caseload"]
-            if available <= 0:
-                continue
-            
-            # Check practice area match
-            if case_type_lower in [pa.lower() for pa in lawyer["practice_areas"]]:
-                candidates.append({
-                    "lawyer_id": lawyer["lawyer_id"],
-                    "name": lawyer["name"],
-                    "title": lawyer["title"],
-                    "email": lawyer["email"],
-                    "available_capacity": available,
-                    "current_caseload": lawyer["current_caseload"],
-                    "practice_areas": lawyer["practice_areas"]
-                })
+        results = []
+        item_errors = []
+        for index, matter in enumerate(matters):
+            try:
+                if not matter.get("case_type"):
+                    raise ValueError("Missing case_type")
+                result = best_lawyer(matter["case_type"], matter.get("priority", "medium"))
+                if "error" in result:
+                    raise ValueError(result["error"])
+                results.append(dict(result, index=index, matter_id=matter.get("matter_id")))
+            except Exception as e:
+                matter_id = matter.get("matter_id") if isinstance(matter, dict) else None
+                item_errors.append({"index": index, "matter_id": matter_id, "error": str(e)})
         
-        if not candidates:
-            # No exact match - suggest general counsel review
-            return json.dumps({
-                "found": False,
-                "case_type": case_type,
-                "message": f"No available lawyer with '{case_type}' expertise. Recommend manual assignment or General Counsel review.",
-                "suggestion": "Assign to General Counsel for triage"
-            })
+        return dump({
+            "count": len(matters),
+            "found": sum(1 for r in results if r["found"]),
+            "results": results,
+            "errors": item_errors
+        })
+    
+    except json.JSONDecodeError:
+        return json.dumps({"error": "Invalid JSON format", "results": []})
+
+
+# ============================================================
+# TOOL 3b: Plan All Assignments at Once
+# ============================================================
+
+@tool
+@timed_tool
+def plan_matter_assignments(file_path: str, method: str = "flow") -> str:
+    """
+    Propose an assignee for every matter in a CSV in one pass.
+    "flow" solves all matters against lawyer capacity together (best
+    workload balance, high priority matters served first); "greedy"
+    picks one matter at a time in file order. Nothing is saved - use
+    assign_matter_to_lawyer to apply the plan.
+    
+    Args:
+        file_path: Path to the CSV file containing matter data
+        method: "flow" (default) or "greedy"
+    
+    Returns:
+        JSON with the proposed lawyer (or none) for each matter
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            matters = list(csv.DictReader(f))
         
-        # Sort by available capacity (prefer less loaded lawyers for high priority)
-        if priority == "high":
-            # For high priority, prefer lawyers with MORE capacity
-            candidates.sort(key=lambda x: x["available_capacity"], reverse=True)
-        else:
-            # For normal priority, balance the load
-            candidates.sort(key=lambda x: x["current_caseload"])
+        # Plan against a copy so caseloads are only changed by assignments
+        lawyers = storage.list_lawyers()
+        decisions = assign_matters(matters, lawyers, method)
         
-        best = candidates[0]
+        plan = []
+        for d in decisions:
+            entry = {
+                "matter_id": d["matter"].get("matter_id"),
+                "matter_name": d["matter"].get("matter_name"),
+                "client": d["matter"].get("client"),
+                "outside_counsel": d["matter"].get("outside_counsel", "None"),
+                "case_type": d["case_type"],
+                "priority": d["priority"]
+            }
+            if d["lawyer"]:
+                entry["lawyer_id"] = d["lawyer"]["lawyer_id"]
+                entry["lawyer_name"] = d["lawyer"]["name"]
+                entry["reason"] = d["selection_reason"]
+            else:
+                entry["lawyer_id"] = None
+                entry["reason"] = "No available lawyer with matching expertise - General Counsel review"
+            plan.append(entry)
         
-        return json.dumps({
-            "found": True,
-            "case_type": case_type,
-            "recommended_lawyer": best,
-            "other_options": candidates[1:3] if len(candidates) > 1 else []
-        }, indent=2)
+        return dump({
+            "method": method,
+            "matter_count": len(plan),
+            "assigned": sum(1 for p in plan if p["lawyer_id"]),
+            "plan": plan
+        })
     
+    except FileNotFoundError:
+        return json.dumps({"error": f"File not found: {file_path}"})
     except Exception as e:
-        return json.dumps({"error": str(e), "found": False})
+        return json.dumps({"error": str(e)})
 
 
 # ============================================================
@@ -217,6 +347,7 @@ def find_best_lawyer(case_type: str, priority: str) -> str:
 # ============================================================
 
 @tool
+@timed_tool
 def assign_matter_to_lawyer(matter_json: str, lawyer_id: str) -> str:
     """
     Assign a matter to an internal lawyer and update records.
@@ -229,74 +360,108 @@ def assign_matter_to_lawyer(matter_json: str, lawyer_id: str) -> str:
         Confirmation of assignment with details
     """
     try:
-        matter = json.loads(matter_json)
-        
-        # Load lawyers DB
-        with open(LAWYERS_DB_PATH, 'r') as f:
-            lawyers_db = json.load(f)
-        
-        # Find the lawyer
-        lawyer = None
-        lawyer_index = None
-        for i, l in enumerate(lawyers_db["lawyers"]):
-            if l["lawyer_id"] == lawyer_id:
-                lawyer = l
-                lawyer_index = i
-                break
-        
-        if not lawyer:
-            return json.dumps({
-                "success": False,
-                "error": f"Lawyer {lawyer_id} not found"
-            })
-        
-        # Load or create assignments DB
-        if os.path.exists(ASSIGNMENTS_DB_PATH):
-            with open(ASSIGNMENTS_DB_PATH, 'r') as f:
-                assignments_db = json.load(f)
-        else:
-            assignments_db = {"assignments": []}
-        
-        # Create assignment record
-        assignment = {
-            "assignment_id": f"ASN-{len(assignments_db['assignments']) + 1:04d}",
-            "matter_id": matter.get("matter_id"),
-            "matter_name": matter.get("matter_name"),
-            "case_type": matter.get("case_type"),
-            "priority": matter.get("priority"),
-            "client": matter.get("client"),
-            "assigned_to": {
-                "lawyer_id": lawyer["lawyer_id"],
-                "name": lawyer["name"],
-                "email": lawyer["email"]
-            },
-            "outside_counsel": matter.get("outside_counsel", "None"),
-            "assigned_date": datetime.now().isoformat(),
-            "status": "active"
+        matter = records(json.loads(matter_json))
+        return dump(assign_matter(matter, lawyer_id))
+    
+    except Exception as e:
+        return json.dumps({"success": False, "error": str(e)})
+
+
+def assign_matter(matter, lawyer_id):
+    """Record one assignment; returns assign_matter_to_lawyer's result."""
+    # Find the lawyer
+    lawyer = storage.get_lawyer(lawyer_id)
+    
+    if not lawyer:
+        return {
+            "success": False,
+            "error": f"Lawyer {lawyer_id} not found"
         }
+    
+    # Create assignment record
+    assignment = {
+        "assignment_id": storage.next_assignment_id(),
+        "matter_id": matter.get("matter_id"),
+        "matter_name": matter.get("matter_name"),
+        "case_type": matter.get("case_type"),
+        "priority": matter.get("priority"),
+        "client": matter.get("client"),
+        "assigned_to": {
+            "lawyer_id": lawyer["lawyer_id"],
+            "name": lawyer["name"],
+            "email": lawyer["email"]
+        },
+        "outside_counsel": matter.get("outside_counsel", "None"),
+        "assigned_date": datetime.now().isoformat(),
+        "status": "active"
+    }
+    
+    # Save assignment and update lawyer caseload
+    with storage.batch():
+        storage.add_assignment(assignment)
+        storage.increment_caseload(lawyer_id)
+    
+    return {
+        "success": True,
+        "assignment_id": assignment["assignment_id"],
+        "matter_id": matter.get("matter_id"),
+        "matter_name": matter.get("matter_name"),
+        "assigned_to": lawyer["name"],
+        "lawyer_email": lawyer["email"],
+        "message": f"Matter '{matter.get('matter_name')}' assigned to {lawyer['name']}"
+    }
+
+
+@tool
+@timed_tool
+def assign_matters_batch(assignments_json: str) -> str:
+    """
+    Assign many matters to internal lawyers in one call.
+    Pass the plan from plan_matter_assignments (entries without a
+    lawyer_id are skipped and reported for manual review), or a list of
+    {"matter": {...}, "lawyer_id": "..."} objects.
+    
+    Args:
+        assignments_json: JSON array of assignments (or {"plan": [...]})
+    
+    Returns:
+        JSON with one result per assignment (in input order, with its
+        index), skipped matters, and failures under "errors"
+    """
+    try:
+        assignments = records(json.loads(assignments_json))
+        if isinstance(assignments, dict):
+            assignments = assignments.get("plan", assignments.get("assignments", []))
         
-        # Save assignment
-        assignments_db["assignments"].append(assignment)
-        with open(ASSIGNMENTS_DB_PATH, 'w') as f:
-            json.dump(assignments_db, f, indent=2)
-        
-        # Update lawyer caseload
-        lawyers_db["lawyers"][lawyer_index]["current_caseload"] += 1
-        with open(LAWYERS_DB_PATH, 'w') as f:
-            json.dump(lawyers_db, f, indent=2)
+        results = []
+        skipped = []
+        item_errors = []
+        # One storage batch for every assignment and caseload update
+        with storage.batch():
+            for index, item in enumerate(assignments):
+                try:
+                    matter = item.get("matter") or {k: v for k, v in item.items() if k not in ("lawyer_id", "lawyer_name", "reason")}
+                    if not item.get("lawyer_id"):
+                        skipped.append({"index": index, "matter_id": matter.get("matter_id"), "reason": item.get("reason", "No lawyer proposed")})
+                        continue
+                    result = assign_matter(matter, item["lawyer_id"])
+                    if not result["success"]:
+                        raise ValueError(result["error"])
+                    results.append(dict(result, index=index))
+                except Exception as e:
+                    matter_id = item.get("matter_id") if isinstance(item, dict) else None
+                    item_errors.append({"index": index, "matter_id": matter_id, "error": str(e)})
         
-        return json.dumps({
-            "success": True,
-            "assignment_id": assignment["assignment_id"],
-            "matter_id": matter.get("matter_id"),
-            "matter_name": matter.get("matter_name"),
-            "assigned_to": lawyer["name"],
-            "lawyer_email": lawyer["email"],
-            "message": f"Matter '{matter.get('matter_name')}' assigned to {lawyer['name']}"
-        }, indent=2)
+        return dump({
+            "assigned_count": len(results),
+            "skipped_count": len(skipped),
+            "assigned": results,
+            "skipped": skipped,
+            "errors": item_errors
+        })
     
-    except Exception as e:
-        return json.dumps({"success": False, "error": str(e)})
+    except json.JSONDecodeError:
+        return json.dumps({"success": False, "error": "Invalid JSON format"})
 
 
 # ============================================================
@@ -304,6 +469,7 @@ def assign_matter_to_lawyer(matter_json: str, lawyer_id: str) -> str:
 # ============================================================
 
 @tool
+@timed_tool
 def generate_assignment_report() -> str:
     """
     Generate a summary report of all matter assignments.
@@ -313,12 +479,10 @@ def generate_assignment_report() -> str:
         Formatted report of assignments by lawyer
     """
     try:
-        if not os.path.exists(ASSIGNMENTS_DB_PATH):
+        data = storage.load_assignments()
+        if not data:
             return json.dumps({"error": "No assignments found"})
         
-        with open(ASSIGNMENTS_DB_PATH, 'r') as f:
-            data = json.load(f)
-        
         # Group by lawyer
         by_lawyer = {}
         for a in data["assignments"]:
@@ -347,13 +511,13 @@ def generate_assignment_report() -> str:
             p = a["priority"]
             by_priority[p] = by_priority.get(p, 0) + 1
         
-        return json.dumps({
+        return dump({
             "report_date": datetime.now().isoformat(),
             "total_assignments": len(data["assignments"]),
             "by_case_type": by_type,
             "by_priority": by_priority,
             "by_lawyer": by_lawyer
-        }, indent=2)
+        })
     
     except Exception as e:
         return json.dumps({"error": str(e)})
@@ -383,7 +547,10 @@ matter_assignment_agent = Agent(
         read_matters_csv,
         get_internal_lawyers,
         find_best_lawyer,
+        find_best_lawyers_batch,
+        plan_matter_assignments,
         assign_matter_to_lawyer,
+        assign_matters_batch,
         generate_assignment_report
     ],
     
@@ -401,13 +568,19 @@ assignment_task = Task(
     Process all matters from matters.csv and assign them to internal lawyers.
     
     Steps:
-    1. Use read_matters_csv to load all matters from "matters.csv"
-    2. Use get_internal_lawyers to see available lawyers and their practice areas
-    3. For EACH matter:
-       a. Use find_best_lawyer with the case_type and priority
-       b. If a lawyer is found, use assign_matter_to_lawyer
-       c. If no lawyer found, note it for manual review
-    4. After all assignments, use generate_assignment_report
+    1. Use read_matters_csv to review the matters in "matters.csv" (one
+       page at a time - pass next_cursor back in until has_more is false)
+    2. Use get_internal_lawyers to see available lawyers and their
+       practice areas (paged the same way)
+    3. Use plan_matter_assignments on "matters.csv" to get a balanced
+       assignee for every matter in one call
+    4. Pass the whole plan to assign_matters_batch in ONE call. It
+       assigns every matter that has a proposed lawyer and reports the
+       ones without one as skipped - note those for manual review.
+       (find_best_lawyers_batch, find_best_lawyer and
+       assign_matter_to_lawyer remain available to re-check or assign
+       individual matters.)
+    5. After all assignments, use generate_assignment_report
     
     Important matching rules:
     - litigation → lawyers with "litigation" practice area
@@ -476,28 +649,20 @@ if __name__ == "__main__":
     # Show internal lawyers
     print("\nINTERNAL LAWYERS:")
     print("-"*60)
-    with open(LAWYERS_DB_PATH, 'r') as f:
-        lawyers = json.load(f)
-        for l in lawyers["lawyers"]:
-            status = "🟢" if l["status"] == "active" else "🔴"
-            capacity = f"{l['current_caseload']}/{l['max_caseload']}"
-            areas = ", ".join(l["practice_areas"])
-            print(f"{status} {l['name']} ({l['title']})")
-            print(f"   Practice: {areas}")
-            print(f"   Caseload: {capacity}")
+    for l in storage.list_lawyers():
+        status = "🟢" if l["status"] == "active" else "🔴"
+        capacity = f"{l['current_caseload']}/{l['max_caseload']}"
+        areas = ", ".join(l["practice_areas"])
+        print(f"{status} {l['name']} ({l['title']})")
+        print(f"   Practice: {areas}")
+        print(f"   Caseload: {capacity}")
     print("="*60 + "\n")
     
     # Clean up previous assignments for fresh demo
-    if os.path.exists(ASSIGNMENTS_DB_PATH):
-        os.remove(ASSIGNMENTS_DB_PATH)
+    storage.clear_assignments()
     
     # Reset lawyer caseloads for demo
-    with open(LAWYERS_DB_PATH, 'r') as f:
-        lawyers = json.load(f)
-    for l in lawyers["lawyers"]:
-        l["current_caseload"] = 0  # Reset for demo
-    with open(LAWYERS_DB_PATH, 'w') as f:
-        json.dump(lawyers, f, indent=2)
+    storage.reset_caseloads()
     
     result = crew.kickoff()
     
@@ -510,10 +675,8 @@ if __name__ == "__main__":
     print("\n" + "="*60)
     print("FINAL ASSIGNMENTS:")
     print("="*60)
-    if os.path.exists(ASSIGNMENTS_DB_PATH):
-        with open(ASSIGNMENTS_DB_PATH, 'r') as f:
-            assignments = json.load(f)
-        
+    assignments = storage.load_assignments()
+    if assignments:
         # Group by lawyer
         by_lawyer = {}
         for a in assignments["assignments"]:
@@ -580,7 +743,7 @@ if __name__ == "__main__":
 # 3. MULTIPLE DATA SOURCES:
 #    - matters.csv (input)
 #    - internal_lawyers.json (reference)
-#    - matter_assignments.json (output)
+#    - matter_assignments.json (output, via storage.py)
 #
 # 4. STATE UPDATES:
 #    Agent updates lawyer caseload after each assignment
@@ -6,10 +6,16 @@ import streamlit as st
 import pandas as pd
 import json
 import os
-import csv
-from datetime import datetime
+from datetime import date
 from pathlib import Path
 
+import engine
+from assignment_solver import DEFAULT_METHOD, METHODS
+from data_cache import file_version, shared_cache
+from inbox_reader import iter_invoices_from
+from metrics import export_from_env, registry
+from storage import get_storage
+
 SCRIPT_DIR = Path(__file__).parent.resolve()
 
 st.set_page_config(
@@ -53,252 +59,123 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-VENDOR_DB_PATH = SCRIPT_DIR / "vendor_database.json"
-LAWYERS_DB_PATH = SCRIPT_DIR / "internal_lawyers.json"
-ASSIGNMENTS_DB_PATH = SCRIPT_DIR / "matter_assignments.json"
-AP_NOTIFICATIONS_PATH = SCRIPT_DIR / "ap_notifications.json"
 INBOX_PATH = SCRIPT_DIR / "inbox" / "invoices.json"
 LAW_FIRMS_CSV = SCRIPT_DIR / "law_firms.csv"
 MATTERS_CSV = SCRIPT_DIR / "matters.csv"
 
-def load_json(path):
-    if os.path.exists(path):
-        with open(path, 'r') as f:
-            return json.load(f)
-    return None
+INVOICE_STATUSES = ["APPROVED", "FLAGGED", "REJECTED", "PENDING"]
+PAGE_SIZES = [10, 25, 50, 100]
+
+# Vendors, AP notifications, assignments and lawyers live behind the
+# storage layer (JSON files by default, SQLite with EBILLING_STORAGE=sqlite)
+storage = get_storage(SCRIPT_DIR)
+
+# Engine, tool and storage timings: Performance panel in the sidebar, and
+# Prometheus export if EBILLING_METRICS_PORT/FILE is set (see metrics.py)
+export_from_env()
+
+# ============================================================
+# CACHED READS (each file parsed at most once per change)
+# ============================================================
+# Every click reruns this script; reads go through shared_cache, keyed
+# on the data's version, so unchanged data is not re-parsed. Writes made
+# through storage bump its data_version, which invalidates the entry.
+# Cached values are shared between reruns - copy before mutating.
+
+def cached(kind, loader):
+    key = (storage.name, str(storage.root), kind, loader.__name__)
+    return shared_cache.get(key, storage.data_version(kind), loader)
+
+def load_vendor_db():
+    return cached("vendors", storage.load_vendor_db)
+
+def load_notifications():
+    return cached("notifications", storage.load_notifications)
+
+def load_assignments():
+    return cached("assignments", storage.load_assignments)
+
+def load_lawyers():
+    return cached("lawyers", storage.load_lawyers)
+
+def read_csv(path):
+    return shared_cache.get(("csv", str(path)), file_version(path), lambda: pd.read_csv(path))
+
+def _notifications_by_invoice():
+    lookup = {}
+    for n in storage.iter_notifications():
+        # The latest notification for an invoice wins, as in find_notification
+        lookup[n["invoice_id"]] = n
+    return lookup
+
+def notifications_by_invoice():
+    """invoice_id -> AP notification, so each invoice's verification is one dict lookup."""
+    return cached("notifications", _notifications_by_invoice)
 
-def save_json(path, data):
-    with open(path, 'w') as f:
-        json.dump(data, f, indent=2)
+def _invoice_date(value):
+    """An invoice_date as a date, or None if it is missing or not an ISO date."""
+    try:
+        return date.fromisoformat(value) if isinstance(value, str) and value else None
+    except ValueError:
+        return None
+
+def _inbox_summary():
+    if not os.path.exists(INBOX_PATH):
+        return []
+    summary = []
+    start = 0
+    for pos, (inv, end) in enumerate(iter_invoices_from(INBOX_PATH)):
+        summary.append((pos, inv["invoice_id"], inv.get("firm_name", ""), _invoice_date(inv.get("invoice_date")),
+                        inv.get("total_amount", 0), start))
+        start = end
+    return summary
+
+def inbox_summary():
+    """
+    (position, invoice_id, firm_name, invoice date or None, total_amount,
+    byte offset to resume reading at) for every inbox invoice.
+    """
+    return shared_cache.get(("inbox", str(INBOX_PATH)), file_version(INBOX_PATH), _inbox_summary)
+
+def read_inbox_rows(rows):
+    """The invoices of the given inbox_summary() rows; each run of consecutive rows is one seek and read."""
+    invoices = []
+    stream = None
+    expected = None
+    try:
+        for row in rows:
+            if row[0] != expected:
+                if stream is not None:
+                    stream.close()
+                stream = iter_invoices_from(INBOX_PATH, row[5])
+            invoices.append(next(stream)[0])
+            expected = row[0] + 1
+    finally:
+        if stream is not None:
+            stream.close()
+    return invoices
 
 def reset_demo_data():
-    for path in [VENDOR_DB_PATH, ASSIGNMENTS_DB_PATH, AP_NOTIFICATIONS_PATH]:
-        if os.path.exists(path):
-            os.remove(path)
-    if os.path.exists(LAWYERS_DB_PATH):
-        with open(LAWYERS_DB_PATH, 'r') as f:
-            lawyers = json.load(f)
-        for l in lawyers["lawyers"]:
-            l["current_caseload"] = 0
-        save_json(LAWYERS_DB_PATH, lawyers)
+    storage.clear_vendors()
+    storage.clear_assignments()
+    storage.clear_notifications()
+    storage.clear_invoice_index()
+    storage.reset_caseloads()
     st.success("✅ Demo data reset!")
 
-def run_vendor_onboarding():
-    vendors = []
-    with open(LAW_FIRMS_CSV, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            vendors.append(row)
-    db = {"vendors": [], "next_id": 1001}
-    results = {"onboarded": [], "warnings": []}
-    for vendor in vendors:
-        errors = []
-        warnings = []
-        partner_rate = float(vendor.get("partner_rate", 0))
-        if partner_rate > 800:
-            warnings.append(f"Partner rate ${partner_rate}/hr exceeds $800 cap")
-        if vendor.get("status") not in ["active", "inactive"]:
-            errors.append("Invalid status")
-        if not errors:
-            vendor["vendor_id"] = f"VND-{db['next_id']}"
-            db["next_id"] += 1
-            db["vendors"].append(vendor)
-            results["onboarded"].append({"vendor_id": vendor["vendor_id"], "firm_name": vendor["firm_name"], "status": vendor["status"], "warnings": warnings})
-            if warnings:
-                results["warnings"].extend(warnings)
-    save_json(VENDOR_DB_PATH, db)
-    return results
-
-def run_invoice_verification():
-    with open(INBOX_PATH, 'r') as f:
-        invoices = json.load(f)
-    vendor_db = load_json(VENDOR_DB_PATH)
-    if not vendor_db:
-        return {"error": "Run Agent 1 first"}
-    results = {"approved": [], "flagged": [], "rejected": []}
-    notifications = {"notifications": []}
-    for invoice in invoices:
-        firm_name = invoice.get("firm_name", "")
-        vendor = None
-        for v in vendor_db["vendors"]:
-            if firm_name.lower() in v["firm_name"].lower():
-                vendor = v
-                break
-        if not vendor:
-            results["rejected"].append({"invoice_id": invoice["invoice_id"], "firm_name": firm_name, "reason": "Vendor not in database", "amount": invoice.get("total_amount", 0)})
-            notification = {"notification_id": f"AP-{len(notifications['notifications']) + 1:04d}", "invoice_id": invoice["invoice_id"], "firm_name": firm_name, "amount": invoice.get("total_amount", 0), "timestamp": datetime.now().isoformat(), "status": "REJECTED", "action": "DO_NOT_PAY", "reason": "Vendor not in database"}
-            notifications["notifications"].append(notification)
-            continue
-        if vendor.get("status") == "inactive":
-            results["rejected"].append({"invoice_id": invoice["invoice_id"], "firm_name": firm_name, "reason": "Vendor is INACTIVE", "amount": invoice.get("total_amount", 0)})
-            notification = {"notification_id": f"AP-{len(notifications['notifications']) + 1:04d}", "invoice_id": invoice["invoice_id"], "firm_name": firm_name, "amount": invoice.get("total_amount", 0), "timestamp": datetime.now().isoformat(), "status": "REJECTED", "action": "DO_NOT_PAY", "reason": "Vendor is INACTIVE - cannot process invoices from inactive vendors"}
-            notifications["notifications"].append(notification)
-            continue
-        discrepancies = []
-        total_overcharge = 0
-        contracted_rates = {"partner": float(vendor.get("partner_rate", 0)), "associate": float(vendor.get("associate_rate", 0)), "paralegal": float(vendor.get("paralegal_rate", 0))}
-        line_item_details = []
-        for item in invoice.get("line_items", []):
-            level = item.get("level", "").lower()
-            billed_rate = float(item.get("rate", 0))
-            contracted_rate = contracted_rates.get(level, 0)
-            hours = item.get("hours", 0)
-            item_detail = {
-                "timekeeper": item.get("timekeeper"),
-                "level": level,
-                "description": item.get("description", ""),
-                "hours": hours,
-                "billed_rate": billed_rate,
-                "contracted_rate": contracted_rate,
-                "billed_amount": item.get("amount", 0),
-                "status": "OK"
-            }
-            if billed_rate > contracted_rate:
-                overcharge = (billed_rate - contracted_rate) * hours
-                total_overcharge += overcharge
-                item_detail["status"] = "OVERCHARGE"
-                item_detail["overcharge"] = overcharge
-                discrepancies.append({"timekeeper": item.get("timekeeper"), "level": level, "billed": billed_rate, "contracted": contracted_rate, "overcharge": overcharge})
-            line_item_details.append(item_detail)
-        notification = {"notification_id": f"AP-{len(notifications['notifications']) + 1:04d}", "invoice_id": invoice["invoice_id"], "firm_name": firm_name, "amount": invoice.get("total_amount"), "matter": invoice.get("matter"), "matter_id": invoice.get("matter_id"), "invoice_date": invoice.get("invoice_date"), "total_hours": invoice.get("total_hours"), "timestamp": datetime.now().isoformat(), "line_items": line_item_details, "contracted_rates": contracted_rates}
-        if discrepancies:
-            notification["status"] = "FLAGGED"
-            notification["action"] = "HOLD_PAYMENT"
-            notification["overcharge"] = total_overcharge
-            notification["discrepancies"] = discrepancies
-            notification["reason"] = f"Rate discrepancies detected - ${total_overcharge:,.2f} overcharge"
-            results["flagged"].append({"invoice_id": invoice["invoice_id"], "firm_name": firm_name, "amount": invoice.get("total_amount"), "overcharge": total_overcharge, "discrepancies": discrepancies})
-        else:
-            notification["status"] = "APPROVED"
-            notification["action"] = "RELEASE_PAYMENT"
-            notification["reason"] = "All rates match contracted amounts"
-            results["approved"].append({"invoice_id": invoice["invoice_id"], "firm_name": firm_name, "amount": invoice.get("total_amount")})
-        notifications["notifications"].append(notification)
-    save_json(AP_NOTIFICATIONS_PATH, notifications)
-    return results
-
-def run_case_assignment():
-    matters = []
-    with open(MATTERS_CSV, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            matters.append(row)
-    with open(LAWYERS_DB_PATH, 'r') as f:
-        lawyers_db = json.load(f)
-    
-    for l in lawyers_db["lawyers"]:
-        l["current_caseload"] = 0
-    
-    results = {"assigned": [], "unassigned": []}
-    assignments = {"assignments": []}
-    
-    area_mapping = {
-        "litigation": ["litigation"], 
-        "patent_infringement": ["patent_infringement", "ip_trademark"], 
-        "ip_trademark": ["ip_trademark", "patent_infringement"], 
-        "m&a": ["m&a"], 
-        "employment": ["employment"], 
-        "regulatory": ["regulatory"], 
-        "contract_review": ["contract_review"], 
-        "real_estate": ["real_estate"]
-    }
-    
-    for matter in matters:
-        case_type = matter.get("case_type", "").lower()
-        priority = matter.get("priority", "medium")
-        search_areas = area_mapping.get(case_type, [case_type])
-        
-        candidates = []
-        reasoning_steps = []
-        
-        reasoning_steps.append(f"🔍 **Step 1: Identify case type** → '{case_type}'")
-        reasoning_steps.append(f"🔍 **Step 2: Find lawyers with matching practice areas** → Looking for: {', '.join(search_areas)}")
-        
-        for lawyer in lawyers_db["lawyers"]:
-            if lawyer["status"] != "active":
-                reasoning_steps.append(f"   ❌ {lawyer['name']} - Skipped (Status: {lawyer['status']})")
-                continue
-            
-            available = lawyer["max_caseload"] - lawyer["current_caseload"]
-            if available <= 0:
-                reasoning_steps.append(f"   ❌ {lawyer['name']} - Skipped (No capacity: {lawyer['current_caseload']}/{lawyer['max_caseload']})")
-                continue
-            
-            matched_area = None
-            for area in search_areas:
-                if area in [pa.lower() for pa in lawyer["practice_areas"]]:
-                    matched_area = area
-                    break
-            
-            if matched_area:
-                candidates.append({
-                    "lawyer": lawyer,
-                    "available_capacity": available,
-                    "matched_area": matched_area
-                })
-                reasoning_steps.append(f"   ✅ {lawyer['name']} - Match! (Practice: {matched_area}, Capacity: {available} slots available)")
-            else:
-                reasoning_steps.append(f"   ❌ {lawyer['name']} - No practice area match (Has: {', '.join(lawyer['practice_areas'])})")
-        
-        best_lawyer = None
-        selection_reason = ""
-        
-        if candidates:
-            if priority == "high":
-                candidates.sort(key=lambda x: x["available_capacity"], reverse=True)
-                selection_reason = f"High priority case → Selected lawyer with most available capacity ({candidates[0]['available_capacity']} slots)"
-            else:
-                candidates.sort(key=lambda x: x["lawyer"]["current_caseload"])
-                selection_reason = f"Standard priority → Selected to balance workload (current load: {candidates[0]['lawyer']['current_caseload']} cases)"
-            
-            best_lawyer = candidates[0]["lawyer"]
-            reasoning_steps.append(f"🎯 **Step 3: Select best candidate** → {selection_reason}")
-            reasoning_steps.append(f"✅ **Decision: Assign to {best_lawyer['name']}** ({best_lawyer.get('title', 'Counsel')})")
-        
-        if best_lawyer:
-            assignment = {
-                "assignment_id": f"ASN-{len(assignments['assignments']) + 1:04d}", 
-                "matter_id": matter["matter_id"], 
-                "matter_name": matter["matter_name"], 
-                "case_type": case_type, 
-                "priority": priority, 
-                "assigned_to": {
-                    "lawyer_id": best_lawyer["lawyer_id"], 
-                    "name": best_lawyer["name"],
-                    "title": best_lawyer.get("title", "Counsel"),
-                    "email": best_lawyer["email"]
-                }, 
-                "outside_counsel": matter.get("outside_counsel", ""),
-                "reasoning": reasoning_steps,
-                "selection_reason": selection_reason
-            }
-            assignments["assignments"].append(assignment)
-            
-            for l in lawyers_db["lawyers"]:
-                if l["lawyer_id"] == best_lawyer["lawyer_id"]:
-                    l["current_caseload"] += 1
-                    break
-            
-            results["assigned"].append({
-                "matter_id": matter["matter_id"], 
-                "matter_name": matter["matter_name"], 
-                "case_type": case_type, 
-                "assigned_to": best_lawyer["name"],
-                "reasoning": reasoning_steps
-            })
-        else:
-            reasoning_steps.append("❌ **Decision: Cannot assign** - No available lawyer with matching expertise")
-            results["unassigned"].append({
-                "matter_id": matter["matter_id"], 
-                "matter_name": matter["matter_name"], 
-                "case_type": case_type, 
-                "reason": "No available lawyer with matching expertise",
-                "reasoning": reasoning_steps
-            })
-            
-    save_json(ASSIGNMENTS_DB_PATH, assignments)
-    save_json(LAWYERS_DB_PATH, lawyers_db)
-    return results
+# The engines live in engine.py (no UI imports), so they also run as
+# batch jobs; here they are pointed at the app's own files.
+
+def run_vendor_onboarding(incremental=False):
+    if incremental:
+        return engine.run_vendor_sync(storage, LAW_FIRMS_CSV)
+    return engine.run_vendor_onboarding(storage, LAW_FIRMS_CSV)
+
+def run_invoice_verification(workers=1, incremental=True):
+    return engine.run_invoice_verification(storage, INBOX_PATH, workers, incremental)
+
+def run_case_assignment(method=DEFAULT_METHOD):
+    return engine.run_case_assignment(storage, MATTERS_CSV, method)
 
 # ============================================================
 # UI HEADER
@@ -319,14 +196,13 @@ with st.sidebar:
     
     st.markdown("---")
     st.markdown("### 📊 Agent Status")
-    vendor_db = load_json(VENDOR_DB_PATH)
-    assignments_db = load_json(ASSIGNMENTS_DB_PATH)
-    ap_notifications = load_json(AP_NOTIFICATIONS_PATH)
-    
     col1, col2 = st.columns(2)
-    col1.metric("Vendors", len(vendor_db['vendors']) if vendor_db else 0)
-    col2.metric("Invoices", len(ap_notifications['notifications']) if ap_notifications else 0)
-    st.metric("Matters Assigned", len(assignments_db['assignments']) if assignments_db else 0)
+    col1.metric("Vendors", cached("vendors", storage.vendor_count))
+    col2.metric("Invoices", cached("notifications", storage.notification_count))
+    st.metric("Matters Assigned", cached("assignments", storage.assignment_count))
+    
+    cache_stats = shared_cache.stats()
+    st.caption(f"Data cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
     
     st.markdown("---")
     st.markdown("### ℹ️ Info")
@@ -347,15 +223,30 @@ with tab1:
     col1, col2 = st.columns(2)
     with col1:
         st.subheader("📁 Input: law_firms.csv")
-        df = pd.read_csv(LAW_FIRMS_CSV)
+        df = read_csv(LAW_FIRMS_CSV)
         st.dataframe(df, use_container_width=True)
     with col2:
         st.subheader("🤖 Run Agent")
+        incremental = st.checkbox("Only apply changes", key="onboard_incremental",
+                                  help="Update the existing vendors from the CSV (new, changed and missing firms) and keep their VND- IDs, instead of rebuilding the database")
         if st.button("▶️ Run Vendor Onboarding", type="primary", key="run_agent1"):
             with st.spinner("Processing..."):
-                results = run_vendor_onboarding()
-            st.success(f"✅ Onboarded {len(results['onboarded'])} vendors")
-        vendor_db = load_json(VENDOR_DB_PATH)
+                results = run_vendor_onboarding(incremental)
+            if incremental:
+                counts = results["counts"]
+                st.success(f"✅ Inserted {counts['inserted']}, updated {counts['updated']}, deactivated {counts['deactivated']}")
+                if counts["unchanged"]:
+                    st.info(f"⏭️ Unchanged: {counts['unchanged']}")
+                if counts["rate_cards"]:
+                    st.info(f"📅 Recorded {counts['rate_cards']} rate card entries - changed rates apply to invoices dated from today")
+                for change in results["updated"]:
+                    st.markdown(f"✏️ **{change['vendor_id']}** {change['firm_name']}: " +
+                                ", ".join(f"{field} {old} → {new}" for field, (old, new) in change["changes"].items()))
+            else:
+                st.success(f"✅ Onboarded {len(results['onboarded'])} vendors")
+            if results["rejected"]:
+                st.error(f"❌ Rejected: {len(results['rejected'])}")
+        vendor_db = load_vendor_db()
         if vendor_db:
             st.subheader("📦 Vendor Database")
             for v in vendor_db["vendors"]:
@@ -368,19 +259,46 @@ with tab2:
     st.header("Agent 2: Invoice Verification")
     st.markdown("Verifies billed rates against contracted rates. Approves, flags, or rejects invoices.")
     
-    ap_notifications = load_json(AP_NOTIFICATIONS_PATH)
+    verifications = notifications_by_invoice()
     
     st.subheader("📥 Invoices")
-    invoices = load_json(INBOX_PATH)
-    
-    if invoices:
-        for inv in invoices:
-            verification = None
-            if ap_notifications:
-                for n in ap_notifications["notifications"]:
-                    if n["invoice_id"] == inv["invoice_id"]:
-                        verification = n
-                        break
+    summary = inbox_summary()
+    
+    if summary:
+        # Filter on the cached summary; only the visible page is read and rendered
+        fcol1, fcol2, fcol3, fcol4 = st.columns([2, 3, 3, 1])
+        status_filter = fcol1.multiselect("Status", INVOICE_STATUSES, key="inv_status")
+        firm_filter = fcol2.multiselect("Firm", sorted({row[2] for row in summary}), key="inv_firm")
+        dates = sorted(row[3] for row in summary if row[3])
+        date_range = fcol3.date_input("Invoice date", value=(dates[0], dates[-1]), key="inv_dates") if dates else ()
+        page_size = fcol4.selectbox("Per page", PAGE_SIZES, key="inv_page_size")
+        
+        def invoice_status(invoice_id):
+            verification = verifications.get(invoice_id)
+            return verification["status"] if verification else "PENDING"
+        
+        date_from = date_range[0] if len(date_range) > 0 else date.min
+        date_to = date_range[-1] if len(date_range) > 1 else date.max
+        filtered = [
+            row for row in summary
+            if (not status_filter or invoice_status(row[1]) in status_filter)
+            and (not firm_filter or row[2] in firm_filter)
+            # Invoices without a (readable) date are never filtered out by the date range
+            and (not date_range or not row[3] or date_from <= row[3] <= date_to)
+        ]
+        
+        pages = max(1, -(-len(filtered) // page_size))
+        if st.session_state.get("inv_page", 1) > pages:
+            st.session_state["inv_page"] = 1
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key="inv_page")
+        page_rows = filtered[(page - 1) * page_size:page * page_size]
+        if page_rows:
+            st.caption(f"Showing {(page - 1) * page_size + 1}-{(page - 1) * page_size + len(page_rows)} of {len(filtered)} matching invoices ({len(summary)} in inbox)")
+        else:
+            st.caption(f"No invoices match the filters ({len(summary)} in inbox)")
+        
+        for inv in read_inbox_rows(page_rows):
+            verification = verifications.get(inv["invoice_id"])
             
             if verification:
                 if verification["status"] == "APPROVED":
@@ -406,7 +324,7 @@ with tab2:
                 with col2:
                     st.markdown("**INVOICE DETAILS:**")
                     st.markdown(f"**Invoice #:** {inv['invoice_id']}")
-                    st.markdown(f"**Date:** {inv['invoice_date']}")
+                    st.markdown(f"**Date:** {inv.get('invoice_date', '—')}")
                 
                 st.markdown("---")
                 st.markdown(f"**Matter:** {inv['matter']}")
@@ -464,7 +382,7 @@ with tab2:
     col1, col2 = st.columns(2)
     with col1:
         st.subheader("📋 Contracted Rates (Reference)")
-        vendor_db = load_json(VENDOR_DB_PATH)
+        vendor_db = load_vendor_db()
         if vendor_db:
             for v in vendor_db["vendors"][:5]:
                 status = "🟢" if v["status"] == "active" else "🔴"
@@ -478,14 +396,22 @@ with tab2:
         if not vendor_db:
             st.warning("⚠️ Run Agent 1 first to create vendor database")
         else:
+            workers = st.number_input("Worker processes", min_value=1, max_value=os.cpu_count() or 1, value=1, key="verify_workers",
+                                      help="Shard the inbox across processes for large inboxes; results are identical to one process")
+            full = st.checkbox("Re-verify every invoice", key="verify_full",
+                               help="By default only new invoices, and invoices whose vendor rates changed, are verified")
             if st.button("▶️ Run Invoice Verification", type="primary", key="run_agent2"):
                 with st.spinner("Verifying invoices against contracted rates..."):
-                    results = run_invoice_verification()
+                    results = run_invoice_verification(int(workers), incremental=not full)
                 st.success(f"✅ Approved: {len(results['approved'])}")
                 if results["flagged"]:
                     st.warning(f"⚠️ Flagged: {len(results['flagged'])}")
                 if results["rejected"]:
                     st.error(f"❌ Rejected: {len(results['rejected'])}")
+                if results["duplicates"]:
+                    st.warning(f"🔁 Duplicates of earlier invoices: {len(results['duplicates'])}")
+                if results["unchanged"]:
+                    st.info(f"⏭️ Unchanged since last run: {len(results['unchanged'])}")
                 st.rerun()
 
 # ============================================================
@@ -495,7 +421,7 @@ with tab3:
     st.header("Agent 3: Case/Matter Assignment")
     st.markdown("Auto-assigns matters to internal lawyers based on practice area, expertise, and workload.")
     
-    assignments_db = load_json(ASSIGNMENTS_DB_PATH)
+    assignments_db = load_assignments()
     
     assignment_lookup = {}
     if assignments_db:
@@ -506,7 +432,7 @@ with tab3:
     
     with col1:
         st.subheader("📁 Matters")
-        df = pd.read_csv(MATTERS_CSV)
+        df = read_csv(MATTERS_CSV).copy()
         
         assignees = []
         for _, row in df.iterrows():
@@ -522,9 +448,11 @@ with tab3:
     
     with col2:
         st.subheader("🤖 Run Agent")
+        method = st.radio("Assignment method", METHODS, horizontal=True, key="assignment_method",
+                          format_func=lambda m: "Optimal (all matters at once)" if m == "flow" else "Greedy (one at a time)")
         if st.button("▶️ Run Case Assignment", type="primary", key="run_agent3"):
             with st.spinner("Analyzing matters and assigning to lawyers..."):
-                results = run_case_assignment()
+                results = run_case_assignment(method)
             st.success(f"✅ Assigned: {len(results['assigned'])} matters")
             if results["unassigned"]:
                 st.warning(f"⚠️ Unassigned: {len(results['unassigned'])}")
@@ -532,7 +460,7 @@ with tab3:
     
     st.markdown("---")
     st.subheader("👥 In-House Legal Team")
-    lawyers_db = load_json(LAWYERS_DB_PATH)
+    lawyers_db = load_lawyers()
     if lawyers_db:
         cols = st.columns(4)
         for idx, l in enumerate(lawyers_db["lawyers"]):
@@ -588,9 +516,9 @@ with tab4:
     st.header("📊 ROI Dashboard")
     st.markdown("**Business Impact & Return on Investment**")
     
-    vendor_db = load_json(VENDOR_DB_PATH)
-    ap_notifications = load_json(AP_NOTIFICATIONS_PATH)
-    assignments_db = load_json(ASSIGNMENTS_DB_PATH)
+    vendor_db = load_vendor_db()
+    ap_notifications = load_notifications()
+    assignments_db = load_assignments()
     
     # Calculate metrics
     if ap_notifications:
@@ -654,7 +582,7 @@ with tab4:
     if assignments_db:
         st.markdown("---")
         st.subheader("👥 Lawyer Workload Distribution")
-        lawyers_db = load_json(LAWYERS_DB_PATH)
+        lawyers_db = load_lawyers()
         if lawyers_db:
             workload_data = []
             for l in lawyers_db["lawyers"]:
@@ -839,6 +767,33 @@ with tab5:
     - 📝 **Contract Analysis** - Extract rates from engagement letters
     """)
 
+# ============================================================
+# SIDEBAR: PERFORMANCE (rendered last, so it includes this run's work)
+# ============================================================
+with st.sidebar:
+    st.markdown("---")
+    st.markdown("### ⏱️ Performance")
+    spans = registry.snapshot()
+    if spans:
+        perf_df = pd.DataFrame([{
+            "Span": s["span"],
+            "Calls": s["count"],
+            "Errors": s["errors"],
+            "Total (s)": round(s["total_seconds"], 3),
+            "p50 (ms)": round(s["p50_seconds"] * 1000, 2),
+            "p95 (ms)": round(s["p95_seconds"] * 1000, 2),
+            "p99 (ms)": round(s["p99_seconds"] * 1000, 2),
+            "Read (KB)": round(s["bytes_read"] / 1024, 1),
+            "Written (KB)": round(s["bytes_written"] / 1024, 1)
+        } for s in spans])
+        st.dataframe(perf_df, use_container_width=True, hide_index=True)
+        st.download_button("⬇️ Prometheus metrics", registry.prometheus(), file_name="ebilling_metrics.prom", mime="text/plain", use_container_width=True)
+        if st.button("Reset timings", use_container_width=True):
+            registry.reset()
+            st.rerun()
+    else:
+        st.caption("No timed work yet - run an agent.")
+
 # ============================================================
 # FOOTER
 # ============================================================
@@ -0,0 +1,268 @@
+"""
+E-Billing System - Matter Assignment Solver
+
+Assigns a whole batch of pending matters to internal lawyers at once.
+
+Two methods are available:
+
+- "flow"   (default) all matters vs. lawyer capacity solved together as a
+           min-cost flow. Matters with the same (case_type, priority) are
+           interchangeable, so they are grouped into one supply node;
+           each free caseload slot of a lawyer is a unit arc whose cost
+           rises with the lawyer's load, which spreads work evenly.
+           Leaving a matter unassigned costs more for higher priorities,
+           so when capacity runs out the high-priority matters keep it.
+- "greedy" the original one-matter-at-a-time selection in CSV order
+           (most free capacity for high priority, lowest caseload
+           otherwise), kept as a fallback.
+
+Both return one decision per matter (in input order) and update each
+lawyer's current_caseload in place.
+"""
+
+import heapq
+
+from lawyer_index import LawyerIndex
+
+
+AREA_MAPPING = {
+    "litigation": ["litigation"],
+    "patent_infringement": ["patent_infringement", "ip_trademark"],
+    "ip_trademark": ["ip_trademark", "patent_infringement"],
+    "m&a": ["m&a"],
+    "employment": ["employment"],
+    "regulatory": ["regulatory"],
+    "contract_review": ["contract_review"],
+    "real_estate": ["real_estate"]
+}
+
+METHODS = ("flow", "greedy")
+DEFAULT_METHOD = "flow"
+
+# Flow costs (integers). Any assignment is cheaper than leaving a matter
+# unassigned, so the solver always assigns as many matters as it can.
+SECONDARY_AREA_COST = 50
+SLOT_COST_SCALE = 100
+UNASSIGNED_COST = {"high": 10000, "medium": 5000, "low": 2000}
+
+
+def search_areas(case_type):
+    """Practice areas that can handle a case type, best match first."""
+    return AREA_MAPPING.get(case_type, [case_type])
+
+
+def assign_matters(matters, lawyers, method=DEFAULT_METHOD):
+    """
+    Decide an assignee for every matter.
+
+    Args:
+        matters: List of matter dicts (rows of matters.csv)
+        lawyers: List of lawyer dicts; current_caseload is updated in place
+        method: "flow" or "greedy"
+
+    Returns:
+        One decision per matter: matter, case_type, priority, lawyer
+        (None if unassigned), selection_reason and reasoning steps
+    """
+    if method == "flow":
+        return flow_assign(matters, lawyers)
+    if method == "greedy":
+        return greedy_assign(matters, lawyers)
+    raise ValueError(f"Unknown assignment method '{method}' - expected one of {METHODS}")
+
+
+def _decision(matter, case_type, priority, areas):
+    return {
+        "matter": matter,
+        "case_type": case_type,
+        "priority": priority,
+        "lawyer": None,
+        "selection_reason": "",
+        "reasoning": [
+            f"🔍 **Step 1: Identify case type** → '{case_type}'",
+            f"🔍 **Step 2: Find lawyers with matching practice areas** → Looking for: {', '.join(areas)}"
+        ]
+    }
+
+
+def _assign(decision, lawyer, selection_reason, step):
+    decision["lawyer"] = lawyer
+    decision["selection_reason"] = selection_reason
+    decision["reasoning"].append(f"🎯 **Step 3: {step}** → {selection_reason}")
+    decision["reasoning"].append(f"✅ **Decision: Assign to {lawyer['name']}** ({lawyer.get('title', 'Counsel')})")
+
+
+def _unassigned(decision):
+    decision["reasoning"].append("❌ **Decision: Cannot assign** - No available lawyer with matching expertise")
+
+
+# ============================================================
+# GREEDY (one matter at a time, CSV order)
+# ============================================================
+
+def greedy_assign(matters, lawyers):
+    index = LawyerIndex(lawyers)
+    decisions = []
+    for matter in matters:
+        case_type = matter.get("case_type", "").lower()
+        priority = matter.get("priority", "medium")
+        areas = search_areas(case_type)
+        decision = _decision(matter, case_type, priority, areas)
+        reasoning_steps = decision["reasoning"]
+
+        # Every lawyer is explained, including the ones ruled out; the index
+        # only speeds up the choice itself
+        for lawyer in index.lawyers:
+            if lawyer["status"] != "active":
+                reasoning_steps.append(f"   ❌ {lawyer['name']} - Skipped (Status: {lawyer['status']})")
+                continue
+
+            available = lawyer["max_caseload"] - lawyer["current_caseload"]
+            if available <= 0:
+                reasoning_steps.append(f"   ❌ {lawyer['name']} - Skipped (No capacity: {lawyer['current_caseload']}/{lawyer['max_caseload']})")
+                continue
+
+            area = index.matched_area(lawyer, areas)
+            if area:
+                reasoning_steps.append(f"   ✅ {lawyer['name']} - Match! (Practice: {area}, Capacity: {available} slots available)")
+            else:
+                reasoning_steps.append(f"   ❌ {lawyer['name']} - No practice area match (Has: {', '.join(lawyer['practice_areas'])})")
+
+        best_lawyer = index.best(areas, priority)
+        if best_lawyer:
+            if priority == "high":
+                available = best_lawyer["max_caseload"] - best_lawyer["current_caseload"]
+                selection_reason = f"High priority case → Selected lawyer with most available capacity ({available} slots)"
+            else:
+                selection_reason = f"Standard priority → Selected to balance workload (current load: {best_lawyer['current_caseload']} cases)"
+
+            _assign(decision, best_lawyer, selection_reason, "Select best candidate")
+            index.add_cases(best_lawyer["lawyer_id"])
+        else:
+            _unassigned(decision)
+
+        decisions.append(decision)
+    return decisions
+
+
+# ============================================================
+# MIN-COST FLOW (all matters at once)
+# ============================================================
+
+class _FlowNetwork:
+    """Successive shortest paths with Dijkstra on reduced costs."""
+
+    def __init__(self, size):
+        self.graph = [[] for _ in range(size)]
+
+    def add_edge(self, u, v, cap, cost):
+        """Add an arc and its residual; returns the arc (to read its flow later)."""
+        forward = [v, cap, cost, None]
+        backward = [u, 0, -cost, forward]
+        forward[3] = backward
+        self.graph[u].append(forward)
+        self.graph[v].append(backward)
+        return forward
+
+    def min_cost_flow(self, source, sink, demand):
+        n = len(self.graph)
+        potential = [0] * n
+        flow = 0
+        while flow < demand:
+            dist = [None] * n
+            prev = [None] * n
+            dist[source] = 0
+            heap = [(0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                for edge in self.graph[u]:
+                    v, cap, cost, _ = edge
+                    if cap <= 0:
+                        continue
+                    nd = d + cost + potential[u] - potential[v]
+                    if dist[v] is None or nd < dist[v]:
+                        dist[v] = nd
+                        prev[v] = edge
+                        heapq.heappush(heap, (nd, v))
+            if dist[sink] is None:
+                break
+            for v in range(n):
+                if dist[v] is not None:
+                    potential[v] += dist[v]
+
+            # Bottleneck along the path, then push
+            push = demand - flow
+            v = sink
+            while v != source:
+                edge = prev[v]
+                push = min(push, edge[1])
+                v = edge[3][0]
+            v = sink
+            while v != source:
+                edge = prev[v]
+                edge[1] -= push
+                edge[3][1] += push
+                v = edge[3][0]
+            flow += push
+        return flow
+
+
+def flow_assign(matters, lawyers):
+    decisions = []
+    classes = {}
+    for matter in matters:
+        case_type = matter.get("case_type", "").lower()
+        priority = matter.get("priority", "medium")
+        areas = search_areas(case_type)
+        decisions.append(_decision(matter, case_type, priority, areas))
+        classes.setdefault((case_type, priority), []).append(len(decisions) - 1)
+
+    index = LawyerIndex(lawyers)
+    available = [l for l in index.lawyers if l["status"] == "active" and l["max_caseload"] > l["current_caseload"]]
+    lawyer_nodes = {l["lawyer_id"]: 1 + len(classes) + pos for pos, l in enumerate(available)}
+
+    # Nodes: source, one per (case_type, priority) class, one per lawyer, sink
+    class_keys = list(classes)
+    source = 0
+    sink = 1 + len(class_keys) + len(available)
+    network = _FlowNetwork(sink + 1)
+    class_arcs = []
+    for c, (case_type, priority) in enumerate(class_keys):
+        node = 1 + c
+        count = len(classes[(case_type, priority)])
+        areas = search_areas(case_type)
+        network.add_edge(source, node, count, 0)
+        network.add_edge(node, sink, count, UNASSIGNED_COST.get(priority, UNASSIGNED_COST["medium"]))
+        for lawyer in index.members(areas):
+            if lawyer["lawyer_id"] in lawyer_nodes:
+                area = index.matched_area(lawyer, areas)
+                arc = network.add_edge(node, lawyer_nodes[lawyer["lawyer_id"]], count, SECONDARY_AREA_COST * areas.index(area))
+                class_arcs.append((c, lawyer, area, arc))
+    for lawyer in available:
+        for load in range(lawyer["current_caseload"] + 1, lawyer["max_caseload"] + 1):
+            network.add_edge(lawyer_nodes[lawyer["lawyer_id"]], sink, 1, SLOT_COST_SCALE * load // lawyer["max_caseload"])
+
+    network.min_cost_flow(source, sink, len(matters))
+
+    # Hand each class's flow to its matters in input order
+    shares = {c: [] for c in range(len(class_keys))}
+    for c, lawyer, area, arc in class_arcs:
+        flow = arc[3][1]
+        if flow:
+            shares[c].append((lawyer, area, flow))
+    for c, key in enumerate(class_keys):
+        pending = iter(classes[key])
+        for lawyer, area, flow in shares[c]:
+            for _ in range(flow):
+                index.add_cases(lawyer["lawyer_id"])
+                selection_reason = (
+                    f"Global optimization over {len(matters)} matters → matched on '{area}', "
+                    f"workload after assignment {lawyer['current_caseload']}/{lawyer['max_caseload']}"
+                )
+                _assign(decisions[next(pending)], lawyer, selection_reason, "Solve all assignments together")
+        for pos in pending:
+            _unassigned(decisions[pos])
+
+    return decisions
@@ -0,0 +1,300 @@
+"""
+E-Billing System - Benchmark Harness
+
+Times the deterministic engines end to end on synthetic data:
+
+    onboard   engine.run_vendor_onboarding    (vendors/s)
+    verify    engine.run_invoice_verification (invoices/s, line items/s)
+    assign    engine.run_case_assignment      (matters/s)
+    tools     the agents' deterministic tool functions, per call
+              (check_vendors is one call over the whole sample)
+
+Each stage runs in a fresh process against a generated data directory
+(see synthetic_data.py), so its peak RSS is its own. Results are appended
+to benchmarks/results.jsonl with the git revision, and `compare` shows how
+the latest run moved against the previous one at the same scale.
+Asking for verify or tools also runs onboard, which they depend on.
+
+RUN: python3 benchmark.py run [--line-items 100k] [--backend sqlite] [--stages verify,assign] [--workers 4]
+     python3 benchmark.py compare [--line-items 100k]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+import synthetic_data
+
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+RESULTS_PATH = SCRIPT_DIR / "benchmarks" / "results.jsonl"
+
+STAGES = ("onboard", "verify", "assign", "tools")
+# Stages that need vendors onboarded first
+NEEDS_VENDORS = ("verify", "tools")
+TOOL_SAMPLE = 1000
+
+
+# ============================================================
+# STAGES (each runs in its own process)
+# ============================================================
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _time_calls(fn, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    elapsed = time.perf_counter() - start
+    calls = len(args_list)
+    return {"calls": calls, "seconds": elapsed, "per_call_us": elapsed / calls * 1e6 if calls else 0.0}
+
+
+def _bench_tools(data_dir, backend):
+    os.environ["EBILLING_STORAGE"] = backend
+    os.chdir(data_dir)
+    sys.path.insert(0, str(SCRIPT_DIR))
+    try:
+        import agent_1_vendor_onboarding as agent_1
+        import agent_2_invoice_verification as agent_2
+        import agent_3_case_assignment as agent_3
+    except Exception as e:
+        return {"skipped": f"agent modules not importable: {e}"}
+
+    from inbox_reader import iter_invoices
+    import csv
+
+    with open("law_firms.csv", 'r', encoding='utf-8') as f:
+        vendors = list(islice(csv.DictReader(f), TOOL_SAMPLE))
+    invoices = list(islice(iter_invoices(str(Path("inbox") / "invoices.json")), TOOL_SAMPLE))
+    with open("matters.csv", 'r', encoding='utf-8') as f:
+        matters = list(islice(csv.DictReader(f), TOOL_SAMPLE))
+
+    rates = [agent_2.find_vendor_rates(inv.get("firm_name", "")) for inv in invoices]
+    checked = [agent_2.check_invoice(inv, r) for inv, r in zip(invoices, rates)]
+    find_best_lawyer = getattr(agent_3.find_best_lawyer, "func", agent_3.find_best_lawyer)
+
+    return {
+        "check_vendor": _time_calls(agent_1.check_vendor, [(v,) for v in vendors]),
+        "check_vendors": _time_calls(agent_1.check_vendors, [(vendors,)]),
+        "find_vendor_rates": _time_calls(agent_2.find_vendor_rates, [(inv.get("firm_name", ""),) for inv in invoices]),
+        "check_invoice": _time_calls(agent_2.check_invoice, list(zip(invoices, rates))),
+        "notify_ap": _time_calls(agent_2.notify_ap, [(c,) for c in checked]),
+        "find_best_lawyer": _time_calls(find_best_lawyer, [(m["case_type"], m["priority"]) for m in matters]),
+    }
+
+
+def run_stage(stage, data_dir, backend, workers=1):
+    """Run one stage in this process and return its measurements."""
+    if stage == "tools":
+        tools = _bench_tools(data_dir, backend)
+        return {"tools": tools, "peak_rss_mb": _peak_rss_mb()}
+
+    import engine
+    from storage import get_storage
+
+    data_dir = Path(data_dir)
+    storage = get_storage(data_dir, backend)
+    run_engine = {
+        "onboard": lambda: engine.run_vendor_onboarding(storage, data_dir / "law_firms.csv"),
+        "verify": lambda: engine.run_invoice_verification(storage, data_dir / "inbox" / "invoices.json", workers),
+        "assign": lambda: engine.run_case_assignment(storage, data_dir / "matters.csv"),
+    }[stage]
+    baseline_rss = _peak_rss_mb()
+
+    start = time.perf_counter()
+    result = run_engine()
+    elapsed = time.perf_counter() - start
+    storage.close()
+
+    if "error" in result:
+        return {"error": result["error"]}
+    return {
+        "seconds": elapsed,
+        "peak_rss_mb": _peak_rss_mb(),
+        "baseline_rss_mb": baseline_rss,
+        "result": {k: len(v) for k, v in result.items() if isinstance(v, list)},
+    }
+
+
+def _run_isolated(stage, data_dir, backend, workers=1):
+    # A ProcessPoolExecutor worker (unlike a multiprocessing.Pool one) is not
+    # daemonic, so the verify stage can start its own worker processes
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(run_stage, stage, str(data_dir), backend, workers).result()
+
+
+# ============================================================
+# RUN / COMPARE
+# ============================================================
+
+THROUGHPUT_UNITS = {
+    "onboard": ("vendors",),
+    "verify": ("invoices", "line_items"),
+    "assign": ("matters",),
+}
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR, capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(line_items, seed=42, backend="json", stages=STAGES, data_dir=None, keep=False, results_path=RESULTS_PATH, workers=1):
+    """
+    Generate data, run the stages and append the record to results_path.
+
+    Returns:
+        The result record
+    """
+    temp_dir = None
+    if data_dir is None:
+        data_dir = temp_dir = tempfile.mkdtemp(prefix="ebilling-bench-")
+    try:
+        start = time.perf_counter()
+        counts = synthetic_data.generate(data_dir, line_items, seed)
+        record = {
+            "timestamp": datetime.now().isoformat(),
+            "git_revision": _git_revision(),
+            "backend": backend,
+            "workers": workers,
+            "seed": seed,
+            "counts": counts,
+            "data_dir": None if temp_dir and not keep else str(data_dir),
+            "stages": {"generate": {"seconds": time.perf_counter() - start}},
+        }
+
+        for stage in stages:
+            measured = _run_isolated(stage, data_dir, backend, workers)
+            for unit in THROUGHPUT_UNITS.get(stage, ()):
+                if measured.get("seconds"):
+                    measured[f"{unit}_per_sec"] = counts[unit] / measured["seconds"]
+            record["stages"][stage] = measured
+    finally:
+        if temp_dir and not keep:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    with open(results_path, 'a') as f:
+        f.write(json.dumps(record) + "\n")
+    return record
+
+
+def print_record(record):
+    counts = record["counts"]
+    print(f"Scale: {counts['line_items']:,} line items | {counts['invoices']:,} invoices | "
+          f"{counts['vendors']:,} vendors | {counts['matters']:,} matters | {counts['lawyers']:,} lawyers "
+          f"(backend: {record['backend']}, workers: {record.get('workers', 1)}, rev: {record['git_revision']})")
+    print("-" * 78)
+    for stage, m in record["stages"].items():
+        if stage == "tools":
+            if "skipped" in m["tools"]:
+                print(f"{'tools':<10} skipped - {m['tools']['skipped']}")
+                continue
+            for name, t in m["tools"].items():
+                print(f"{'tools':<10} {name:<20} {t['calls']:>6} calls  {t['per_call_us']:>10.1f} us/call")
+            continue
+        if "error" in m:
+            print(f"{stage:<10} failed - {m['error']}")
+            continue
+        line = f"{stage:<10} {m['seconds']:>9.3f}s"
+        for unit in THROUGHPUT_UNITS.get(stage, ()):
+            if f"{unit}_per_sec" in m:
+                line += f"  {m[f'{unit}_per_sec']:>12,.0f} {unit}/s"
+        if "peak_rss_mb" in m:
+            line += f"  peak RSS {m['peak_rss_mb']:,.0f} MB"
+        print(line)
+
+
+def load_results(results_path=RESULTS_PATH):
+    if not os.path.exists(results_path):
+        return []
+    with open(results_path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(line_items=None, backend=None, results_path=RESULTS_PATH):
+    """Print the latest run next to the previous one with the same scale and backend."""
+    records = load_results(results_path)
+    if line_items is not None:
+        records = [r for r in records if r["counts"]["line_items"] == line_items]
+    if backend is not None:
+        records = [r for r in records if r["backend"] == backend]
+    if not records:
+        print("No benchmark results yet - run: python3 benchmark.py run")
+        return
+    latest = records[-1]
+    previous = [r for r in records[:-1]
+                if r["counts"]["line_items"] == latest["counts"]["line_items"] and r["backend"] == latest["backend"]]
+    if not previous:
+        print("Only one run at this scale:")
+        print_record(latest)
+        return
+    previous = previous[-1]
+    print(f"{'stage':<10} {previous['git_revision'] or 'prev':>12} {latest['git_revision'] or 'latest':>12}   change")
+    for stage, m in latest["stages"].items():
+        before = previous["stages"].get(stage, {})
+        if "seconds" in m and "seconds" in before and before["seconds"]:
+            change = (m["seconds"] - before["seconds"]) / before["seconds"]
+            print(f"{stage:<10} {before['seconds']:>11.3f}s {m['seconds']:>11.3f}s   {change:+.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the e-billing engines on synthetic data.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="generate data and time every stage")
+    run_parser.add_argument("--line-items", default="1k", help=f"number of line items or one of {', '.join(synthetic_data.SCALES)}")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--backend", default="json", choices=("json", "sqlite"))
+    run_parser.add_argument("--stages", default=",".join(STAGES), help=f"comma-separated subset of {', '.join(STAGES)}")
+    run_parser.add_argument("--workers", type=int, default=1, help="worker processes for the verify stage")
+    run_parser.add_argument("--data-dir", help="generate into this directory instead of a temporary one")
+    run_parser.add_argument("--keep", action="store_true", help="keep the temporary data directory")
+    run_parser.add_argument("--results", default=str(RESULTS_PATH))
+
+    compare_parser = sub.add_parser("compare", help="latest run vs. the previous one at the same scale")
+    compare_parser.add_argument("--line-items")
+    compare_parser.add_argument("--backend", choices=("json", "sqlite"))
+    compare_parser.add_argument("--results", default=str(RESULTS_PATH))
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        stages = {s.strip() for s in args.stages.split(",") if s.strip()}
+        unknown = stages - set(STAGES)
+        if unknown:
+            parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+        if stages & set(NEEDS_VENDORS):
+            stages.add("onboard")
+        stages = [s for s in STAGES if s in stages]
+        record = run(synthetic_data.scale_to_line_items(args.line_items), args.seed, args.backend,
+                     stages, args.data_dir, args.keep, args.results, args.workers)
+        print_record(record)
+        if record["data_dir"]:
+            print(f"Data: {record['data_dir']}")
+    else:
+        line_items = synthetic_data.scale_to_line_items(args.line_items) if args.line_items else None
+        compare(line_items, args.backend, args.results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+E-Billing System - Concurrent Crew Orchestrator
+
+Runs the three agent crews from one process with asyncio instead of as
+three blocking scripts:
+
+    onboarding  ->  verification[0] .. verification[N-1]
+    assignment
+
+Matter assignment does not depend on vendors, so it runs alongside the
+onboarding -> verification chain. Invoice verification is partitioned into
+N sub-crews, one per vendor shard: the invoices that need verifying (see
+verification_state.py) are split by firm name into pending files, and each
+shard gets its own copy of the verification crew reading its own file.
+Matter assignment stays one crew - its plan balances caseloads across all
+practice areas at once, and lawyers span several areas.
+
+Each kickoff() blocks, so it runs on a worker thread; --max-crews bounds
+how many crews run at a time and the shared llm_limiter (llm_cache.py)
+bounds model calls in flight across all of them. The report compares the
+wall-clock time with the serial time (the sum of every crew's own time,
+i.e. what running them one after another would have taken).
+
+RUN: python3 crew_orchestrator.py [--shards 4] [--llm-concurrency 4] [--max-crews 8] [--full] [--json]
+     python3 crew_orchestrator.py --max-crews 1   (serial baseline)
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from inbox_reader import iter_invoices
+from llm_cache import llm_limiter
+from vendor_index import normalize_firm_name
+
+import agent_1_vendor_onboarding as onboarding
+import agent_2_invoice_verification as verification
+import agent_3_case_assignment as assignment
+
+
+DEFAULT_SHARDS = 4
+SHARD_PATH = "pending_invoices.shard-{}.jsonl"
+
+
+# ============================================================
+# VENDOR SHARDS
+# ============================================================
+
+def shard_of(firm_name, shards):
+    """Stable shard number for a firm (the same in every run and process)."""
+    return zlib.crc32(normalize_firm_name(firm_name).encode("utf-8")) % shards
+
+
+def write_shards(path, shards):
+    """
+    Split an invoice file into one pending file per vendor shard.
+
+    Returns:
+        [(shard_path, invoice_count), ...] for the non-empty shards
+    """
+    counts = [0] * shards
+    with ExitStack() as stack:
+        files = [stack.enter_context(open(SHARD_PATH.format(k), 'w')) for k in range(shards)]
+        for invoice in iter_invoices(path):
+            k = shard_of(invoice.get("firm_name", ""), shards)
+            files[k].write(json.dumps(invoice) + "\n")
+            counts[k] += 1
+    return [(SHARD_PATH.format(k), n) for k, n in enumerate(counts) if n]
+
+
+# ============================================================
+# ORCHESTRATION
+# ============================================================
+
+class Orchestrator:
+    """
+    Runs crews concurrently and times each one.
+
+    Args:
+        max_crews: Crews running at once (1 = one after another)
+    """
+
+    def __init__(self, max_crews):
+        self.max_crews = max_crews
+        self.jobs = []
+        self._slots = None
+        self._executor = None
+        self._start = None
+
+    async def run_crew(self, name, crew, inputs=None):
+        """Kick off a crew on a worker thread; returns its timing record (with "ok")."""
+        async with self._slots:
+            job = {"name": name, "started": time.perf_counter() - self._start}
+            self.jobs.append(job)
+            start = time.perf_counter()
+            try:
+                await asyncio.get_running_loop().run_in_executor(self._executor, lambda: crew.kickoff(inputs=inputs))
+                job["ok"] = True
+            except Exception as e:
+                job["ok"] = False
+                job["error"] = str(e)
+            job["seconds"] = time.perf_counter() - start
+            return job
+
+    async def onboard_then_verify(self, shards, full):
+        if onboarding.storage.vendor_count():
+            onboarding.storage.clear_vendors()
+        job = await self.run_crew("onboarding", onboarding.crew)
+        if not job["ok"] or not verification.storage.vendor_count():
+            return
+
+        run = verification.prepare_pending(full=full)
+        if not run.pending:
+            return
+        crews = [
+            self.run_crew(f"verification[{k}] ({n} invoices)", verification.crew.copy(), {"inbox_path": path})
+            for k, (path, n) in enumerate(write_shards(verification.PENDING_PATH, shards))
+        ]
+        await asyncio.gather(*crews)
+        verification.storage.save_verification_state(run.verified)
+
+    async def assign(self):
+        assignment.storage.clear_assignments()
+        assignment.storage.reset_caseloads()
+        await self.run_crew("assignment", assignment.crew)
+
+    async def run(self, shards=DEFAULT_SHARDS, full=False):
+        """Run every crew; returns the timing report."""
+        self._slots = asyncio.Semaphore(self.max_crews)
+        # One thread per crew that may run at once (the default executor
+        # is sized by CPU count, which would cap concurrency on small hosts)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_crews, thread_name_prefix="crew")
+        self._start = time.perf_counter()
+        try:
+            await asyncio.gather(self.onboard_then_verify(shards, full), self.assign())
+        finally:
+            self._executor.shutdown(wait=True)
+        return self.report(time.perf_counter() - self._start)
+
+    def report(self, wall_seconds):
+        serial_seconds = sum(job["seconds"] for job in self.jobs)
+        return {
+            "crews": self.jobs,
+            "max_crews": self.max_crews,
+            "wall_seconds": wall_seconds,
+            "serial_seconds": serial_seconds,
+            "speedup": serial_seconds / wall_seconds if wall_seconds else 0.0,
+            "llm": llm_limiter.stats()
+        }
+
+
+def print_report(report):
+    print("\n" + "="*60)
+    print("CREW TIMINGS:")
+    print("="*60)
+    for job in report["crews"]:
+        status = "✅" if job["ok"] else "❌"
+        print(f"{status} {job['name']:<36} start +{job['started']:7.2f}s  {job['seconds']:7.2f}s")
+        if not job["ok"]:
+            print(f"   Error: {job['error']}")
+    llm = report["llm"]
+    print("-"*60)
+    print(f"Wall clock:  {report['wall_seconds']:.2f}s  (at most {report['max_crews']} crews at once)")
+    print(f"Serial time: {report['serial_seconds']:.2f}s  (sum of crew times)")
+    print(f"Speedup:     {report['speedup']:.2f}x")
+    print(f"LLM calls:   {llm['calls']}  (limit {llm['limit']}, peak {llm['peak_in_flight']} in flight, {llm['wait_seconds']:.2f}s waiting for a slot)")
+
+
+# ============================================================
+# RUN
+# ============================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the agent crews concurrently.")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS, help="invoice verification sub-crews (by vendor)")
+    parser.add_argument("--llm-concurrency", type=int, help="model calls in flight (default EBILLING_LLM_CONCURRENCY or 4)")
+    parser.add_argument("--max-crews", type=int, help="crews running at once (default: shards + 2; 1 = serial)")
+    parser.add_argument("--full", action="store_true", help="re-verify every invoice")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.llm_concurrency:
+        llm_limiter.set_limit(args.llm_concurrency)
+    orchestrator = Orchestrator(max(1, args.max_crews or args.shards + 2))
+    report = asyncio.run(orchestrator.run(args.shards, args.full))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0 if all(job["ok"] for job in report["crews"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
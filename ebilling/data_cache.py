@@ -0,0 +1,87 @@
+"""
+E-Billing System - Data Cache
+
+In-process cache for the Streamlit app. Streamlit re-runs app.py on every
+click, and each run used to re-parse the vendor database, notifications,
+assignments and CSVs several times (sidebar, every tab, ROI dashboard).
+
+Each entry is stored with the version of the data it was loaded from
+(file mtime + size, or the storage layer's data_version). A lookup with
+the same version is a hit; a different version reloads and replaces the
+entry, so each file is parsed at most once per change.
+
+The cache lives in this module (not in app.py) so it survives reruns.
+Cached values are shared - callers must copy before mutating them.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+
+def content_hash(value):
+    """Stable hash of a JSON-serializable value (key order does not matter)."""
+    data = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def file_version(path):
+    """(mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class DataCache:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version, loader):
+        """
+        Return the cached value for key if it was loaded at this version.
+
+        Args:
+            key: Hashable cache key (e.g. ("csv", path))
+            version: Current version of the underlying data
+            loader: Called with no arguments on a miss
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = loader()
+        with self._lock:
+            self._entries[key] = (version, value)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one entry, or everything when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+
+shared_cache = DataCache()
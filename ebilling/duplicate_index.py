@@ -0,0 +1,393 @@
+"""
+E-Billing System - Duplicate Invoice Detection
+
+Catches invoices that would be paid twice: the same bill sent again under
+a new invoice number, or resent with small edits. Every verified invoice
+is indexed; each new one is checked against all of them:
+
+    exact  same firm, matter_id and line items (timekeeper, level, hours,
+           rate, description) as an earlier invoice - a 64-bit content
+           fingerprint, looked up in one sorted column
+    near   same firm and at least NEAR_DUPLICATE_SIMILARITY of the same
+           line-item features (description word pairs and timekeeper/hours,
+           per timekeeper) - MinHash signatures with LSH banding
+
+A MinHash signature keeps, for each of NUM_HASHES hash functions, the
+lowest hash of the invoice's features; two invoices agree on a position
+with probability equal to the Jaccard similarity of their feature sets.
+Only the low 16 bits of each minimum are kept (b-bit MinHash), so a
+signature is 64 bytes. Signatures are cut into BANDS bands of ROWS
+positions, and each band (with the firm) becomes one 64-bit bucket key:
+invoices that share any bucket are candidates, and only candidates have
+their signatures compared. Like the fingerprints, the bucket keys are one
+sorted column, so a batch of invoices is looked up with a few
+np.searchsorted calls whatever the size of the history.
+
+Invoices are indexed as records: an inbox record's key from the
+incremental verification state (verification_state.record_key), so a
+second record with the same invoice_id is a record of its own. A record
+is only ever a duplicate of records indexed before it was first seen, so
+re-verifying the original (e.g. after a rate change) does not turn it into
+a duplicate of its own copy, and indexes it again only if its content
+changed. An invoice checked without a record key is always a new record.
+The storage layer keeps the index (storage.load_invoice_index /
+append_invoice_index).
+"""
+
+import hashlib
+import re
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from rate_engine import BATCH_SIZE, iter_batches
+from vendor_index import normalize_firm_name
+
+
+NUM_HASHES = 32
+BANDS = 8
+ROWS = NUM_HASHES // BANDS
+
+# Candidates at least this similar are reported as near duplicates. With
+# 8 bands of 4 rows, pairs this similar share a bucket 98.5% of the time.
+NEAR_DUPLICATE_SIMILARITY = 0.8
+
+# Multiply-shift hashing of 32-bit feature hashes: the high 32 bits of
+# (a * x + b) mod 2**64, with a random odd a and random b per hash function
+_rng = np.random.default_rng(20250101)
+_A = _rng.integers(0, 1 << 63, NUM_HASHES, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _rng.integers(0, 1 << 63, NUM_HASHES, dtype=np.uint64) * np.uint64(2)
+
+# Mixes the firm and band number into a band's bucket key
+_FIRM_MIX = np.uint64(0x9E3779B97F4A7C15)
+_BAND_MIX = np.uint64(0xC2B2AE3D27D4EB4F)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def _words(text):
+    return " ".join(_WORD.findall(str(text or "").lower()))
+
+
+def _feature(text):
+    return zlib.crc32(text.encode("utf-8"))
+
+
+# Timekeepers and descriptions repeat across invoices, so each pair is
+# tokenized and hashed once
+@lru_cache(maxsize=1 << 16)
+def _item_text(timekeeper, description):
+    """(timekeeper, description) normalized, and the description's feature hashes."""
+    timekeeper, description = _words(timekeeper), _words(description)
+    words = description.split()
+    pairs = [f"{a} {b}" for a, b in zip(words, words[1:])] or words
+    return timekeeper, description, frozenset(_feature(f"{timekeeper}|{pair}") for pair in pairs)
+
+
+def _number(value):
+    try:
+        return f"{float(value):g}"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _firm(invoice):
+    return " ".join(normalize_firm_name(invoice.get("firm_name")).split())
+
+
+def _invoice_keys(invoice):
+    """(fingerprint, firm key, feature hashes) in one pass over the line items."""
+    items, features = [], set()
+    for item in invoice.get("line_items", []):
+        timekeeper, description, description_features = _item_text(str(item.get("timekeeper") or ""),
+                                                                   str(item.get("description") or ""))
+        hours = _number(item.get("hours", 0))
+        items.append("|".join([timekeeper, str(item.get("level", "")).lower(), hours, _number(item.get("rate", 0)), description]))
+        features.add(_feature(f"{timekeeper}|{hours}"))
+        features |= description_features
+    firm = _firm(invoice)
+    matter_id = str(invoice.get("matter_id") or "").strip().lower()
+    fingerprint = _hash64("\n".join([firm, matter_id] + sorted(items)))
+    return fingerprint, _hash64(firm), features or {_feature(f"invoice|{invoice.get('invoice_id')}")}
+
+
+def firm_key(invoice):
+    """64-bit key of an invoice's firm name (case and whitespace insensitive)."""
+    return _hash64(_firm(invoice))
+
+
+def invoice_fingerprint(invoice):
+    """64-bit fingerprint of firm + matter_id + line items (in any order)."""
+    return _invoice_keys(invoice)[0]
+
+
+def invoice_features(invoice):
+    """
+    The set near-duplicate similarity is measured on, as 32-bit hashes: per
+    timekeeper, its hours and every pair of adjacent description words (or
+    the word, for a one-word description). An invoice without line items
+    gets a feature of its own, so it is never near another.
+    """
+    return _invoice_keys(invoice)[2]
+
+
+# ============================================================
+# SIGNATURES (whole batches as NumPy columns)
+# ============================================================
+
+def signatures(feature_sets):
+    """(len(feature_sets) x NUM_HASHES) uint16 b-bit MinHash signatures of invoice_features() sets."""
+    hashes, starts = [], []
+    for features in feature_sets:
+        starts.append(len(hashes))
+        hashes.extend(features)
+    if not starts:
+        return np.zeros((0, NUM_HASHES), dtype=np.uint16)
+    x = np.asarray(hashes, dtype=np.uint64)
+    permuted = (x[:, None] * _A + _B) >> np.uint64(32)
+    # Every invoice has at least one feature, so no segment is empty
+    minimums = np.minimum.reduceat(permuted, np.asarray(starts, dtype=np.intp), axis=0)
+    return (minimums & np.uint64(0xFFFF)).astype(np.uint16)
+
+
+def band_keys(firms, signatures):
+    """(invoices x BANDS) int64 LSH bucket keys; same-firm invoices sharing one are candidates."""
+    firms = np.asarray(firms, dtype=np.int64).view(np.uint64)
+    rows = signatures.reshape(len(signatures), BANDS, ROWS)
+    # ROWS 16-bit values fill one 64-bit key
+    packed = np.zeros(rows.shape[:2], dtype=np.uint64)
+    for row in range(ROWS):
+        packed <<= np.uint64(16)
+        packed |= rows[:, :, row]
+    mix = firms[:, None] * _FIRM_MIX + np.arange(BANDS, dtype=np.uint64) * _BAND_MIX
+    return (packed ^ mix).view(np.int64)
+
+
+# ============================================================
+# INDEX
+# ============================================================
+
+class DuplicateIndex:
+    """
+    Exact and near-duplicate lookup over every indexed invoice.
+
+    Args:
+        columns: The stored index (storage.load_invoice_index()), or None:
+                 invoice_id, record (key), fingerprint, firm (int64) and
+                 signature (n x NUM_HASHES uint16), one row per indexed
+                 invoice
+    """
+
+    def __init__(self, columns=None):
+        if columns is None or not len(columns["invoice_id"]):
+            columns = {"invoice_id": [], "record": [], "fingerprint": np.zeros(0, np.int64),
+                       "firm": np.zeros(0, np.int64), "signature": np.zeros((0, NUM_HASHES), np.uint16)}
+        self._ids = list(columns["invoice_id"])
+        self._records = list(columns.get("record", self._ids))
+        self._signatures = np.asarray(columns["signature"], dtype=np.uint16).reshape(-1, NUM_HASHES)
+        fingerprints = np.asarray(columns["fingerprint"], dtype=np.int64)
+        # Stable sorts: among equal keys the earliest indexed row comes first
+        self._fp_rows = np.argsort(fingerprints, kind="stable")
+        self._fp_sorted = fingerprints[self._fp_rows]
+        # Only ever compared within this process, so the built-in hash will do
+        record_keys = np.array([hash(str(r)) for r in self._records], dtype=np.int64)
+        self._record_rows = np.argsort(record_keys, kind="stable")
+        self._record_sorted = record_keys[self._record_rows]
+        bands = band_keys(columns["firm"], self._signatures).ravel()
+        order = np.argsort(bands)
+        self._band_sorted = bands[order]
+        self._band_rows = (order // BANDS).astype(np.int32)
+        # Invoices indexed since loading (looked up through dicts)
+        self._new = {"invoice_id": [], "record": [], "fingerprint": [], "firm": [], "signature": []}
+        self._new_fp = {}
+        self._new_bands = {}
+        self._new_records = {}
+        self._new_record_fps = set()
+
+    def __len__(self):
+        return len(self._ids) + len(self._new["invoice_id"])
+
+    def _invoice_id(self, row):
+        stored = len(self._ids)
+        return self._ids[row] if row < stored else self._new["invoice_id"][row - stored]
+
+    def _signature_rows(self, rows):
+        stored = len(self._ids)
+        return np.array([self._signatures[r] if r < stored else self._new["signature"][r - stored] for r in rows],
+                        dtype=np.uint16)
+
+    @staticmethod
+    def _positions(sorted_keys, keys):
+        """First position of each key in a sorted column (-1 if absent), in one search."""
+        if not len(sorted_keys):
+            return np.full(len(keys), -1)
+        at = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+        return np.where(sorted_keys[at] == keys, at, -1)
+
+    def _stored_rows(self, sorted_keys, rows, keys):
+        """Earliest stored row of each key (-1 if none), for a batch of keys in one search."""
+        if not len(sorted_keys):
+            return [-1] * len(keys)
+        at = self._positions(sorted_keys, keys)
+        return np.where(at >= 0, rows[at], -1).tolist()
+
+    def _indexed(self, record, fingerprint, fp_rows):
+        """Whether a record is already indexed with this fingerprint (fp_rows: stored rows with it)."""
+        if (record, fingerprint) in self._new_record_fps:
+            return True
+        return any(self._records[r] == record for r in fp_rows)
+
+    def check(self, invoices, records=None):
+        """
+        Check a batch of invoices for duplicates, then index them (so later
+        invoices, in this batch or the next, are checked against them too).
+
+        Args:
+            invoices: Invoice dicts
+            records: Each invoice's record key (see the module docstring),
+                     or None to check every invoice as a new record
+
+        Returns:
+            One match per invoice, in order: None, or {"invoice_id" (the
+            earlier invoice), "match": "exact" or "near", "similarity"}
+        """
+        if not invoices:
+            return []
+        keys = [_invoice_keys(invoice) for invoice in invoices]
+        fingerprints = np.array([fingerprint for fingerprint, _, _ in keys], dtype=np.int64)
+        firms = np.array([firm for _, firm, _ in keys], dtype=np.int64)
+        sigs = signatures([features for _, _, features in keys])
+        bands = band_keys(firms, sigs)
+        invoice_ids = [invoice.get("invoice_id") for invoice in invoices]
+        records = list(records) if records is not None else [None] * len(invoices)
+
+        # Stored history: every fingerprint, record and bucket of the batch
+        # in one search each
+        fp_at = self._positions(self._fp_sorted, fingerprints).tolist()
+        if any(record is not None for record in records):
+            record_keys = np.array([hash(str(record)) for record in records], dtype=np.int64)
+            stored_first = self._stored_rows(self._record_sorted, self._record_rows, record_keys)
+        else:
+            stored_first = [-1] * len(invoices)
+        band_lo = np.searchsorted(self._band_sorted, bands.ravel(), side="left").reshape(bands.shape)
+        band_hi = np.searchsorted(self._band_sorted, bands.ravel(), side="right").reshape(bands.shape)
+        in_stored_band = (band_hi > band_lo).any(axis=1).tolist()
+        band_list = bands.tolist()
+
+        matches = []
+        for i, (invoice_id, record) in enumerate(zip(invoice_ids, records)):
+            row = len(self)
+            fingerprint = keys[i][0]
+            # Rows before the record was first indexed (all rows for a new one)
+            if record is None:
+                first = row
+            else:
+                first = stored_first[i] if stored_first[i] >= 0 else self._new_records.get(record, row)
+            match = None
+
+            # Stored rows with the fingerprint, earliest first (stable sort)
+            fp_rows = []
+            if fp_at[i] >= 0:
+                hi = np.searchsorted(self._fp_sorted, fingerprint, side="right")
+                fp_rows = self._fp_rows[fp_at[i]:hi].tolist()
+            earliest = fp_rows[0] if fp_rows else self._new_fp.get(fingerprint, row)
+            if earliest < first:
+                match = {"invoice_id": self._invoice_id(earliest), "match": "exact", "similarity": 1.0}
+            else:
+                candidates = set()
+                if in_stored_band[i]:
+                    for lo, hi in zip(band_lo[i].tolist(), band_hi[i].tolist()):
+                        candidates.update(self._band_rows[lo:hi].tolist())
+                for key in band_list[i]:
+                    candidates.update(self._new_bands.get(key, ()))
+                candidates = sorted(r for r in candidates if r < first)
+                if candidates:
+                    similarity = (self._signature_rows(candidates) == sigs[i]).mean(axis=1)
+                    best = int(np.argmax(similarity))
+                    if similarity[best] >= NEAR_DUPLICATE_SIMILARITY:
+                        match = {"invoice_id": self._invoice_id(candidates[best]), "match": "near",
+                                 "similarity": round(float(similarity[best]), 3)}
+            matches.append(match)
+
+            # A re-verified record is indexed again only if its content changed
+            if record is None:
+                record = invoice_id
+            elif first < row and self._indexed(record, fingerprint, fp_rows):
+                continue
+            for key in band_list[i]:
+                self._new_bands.setdefault(key, []).append(row)
+            self._new["invoice_id"].append(invoice_id)
+            self._new["record"].append(record)
+            self._new["fingerprint"].append(fingerprint)
+            self._new["firm"].append(keys[i][1])
+            self._new["signature"].append(sigs[i])
+            self._new_fp.setdefault(fingerprint, row)
+            self._new_records.setdefault(record, row)
+            self._new_record_fps.add((record, fingerprint))
+        return matches
+
+    def screen(self, invoices, matches, records=None, batch_size=BATCH_SIZE):
+        """
+        Check an invoice stream batch by batch, passing the invoices on.
+
+        The match for each invoice is appended to matches (e.g. a deque)
+        before the invoice is yielded, so a consumer that handles invoices
+        in order can popleft() its match. If records is given (a deque
+        filled by IncrementalRun.changed), each invoice's record key is
+        popped from it.
+        """
+        for batch in iter_batches(invoices, batch_size):
+            keys = [records.popleft() for _ in batch] if records is not None else None
+            matches.extend(self.check(batch, keys))
+            yield from batch
+
+    def new_columns(self):
+        """The invoices indexed since loading, as columns for storage.append_invoice_index()."""
+        return {
+            "invoice_id": list(self._new["invoice_id"]),
+            "record": list(self._new["record"]),
+            "fingerprint": np.array(self._new["fingerprint"], dtype=np.int64),
+            "firm": np.array(self._new["firm"], dtype=np.int64),
+            "signature": np.array(self._new["signature"], dtype=np.uint16).reshape(-1, NUM_HASHES),
+        }
+
+
+# ============================================================
+# DECISIONS
+# ============================================================
+
+def duplicate_reason(match):
+    """The reason a duplicate match gives for its decision."""
+    if match["match"] == "exact":
+        return f"Duplicate of {match['invoice_id']} (same firm, matter and line items)"
+    return f"Possible duplicate of {match['invoice_id']} ({match['similarity']:.0%} similar line items)"
+
+
+def mark_duplicate(match, bucket, entry, notification):
+    """
+    Apply a duplicate match to a rate_engine.decide() result.
+
+    An exact duplicate is rejected; a near duplicate of an otherwise
+    approved invoice is held for review. The match is recorded on both.
+
+    Returns:
+        The new bucket
+    """
+    reason = duplicate_reason(match)
+    notification["duplicate_of"] = match
+    entry["duplicate_of"] = match["invoice_id"]
+    if match["match"] == "exact" and bucket != "rejected":
+        bucket, status, action = "rejected", "REJECTED", "DO_NOT_PAY"
+    elif bucket == "approved":
+        bucket, status, action = "flagged", "FLAGGED", "HOLD_PAYMENT"
+    else:
+        status, action = notification["status"], notification["action"]
+        reason = f"{notification['reason']}; {reason}"
+    notification.update(status=status, action=action, reason=reason)
+    entry["reason"] = reason
+    return bucket
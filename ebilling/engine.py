@@ -0,0 +1,329 @@
+"""
+E-Billing System - Headless Batch Engines
+
+The fast, deterministic (no LLM) implementations of the three agents:
+
+    onboard   vendors CSV   -> vendor database (rebuilt, or updated with
+                               only the changes with --incremental)
+    rates     rate card CSV -> effective-dated vendor rates (rate_cards.py)
+    verify    invoice inbox -> AP notifications (only new or changed invoices,
+                               screened for duplicates of earlier ones)
+    assign    matters CSV   -> matter assignments and lawyer caseloads
+
+They write through the storage layer, so results land in the same files
+(or SQLite database) the agents and the web app use. The web app, the
+benchmark harness and the CLI below all call these functions.
+
+Nothing here imports Streamlit, pandas or CrewAI, so a batch job starts
+in milliseconds; NumPy is only loaded by onboard, rates and verify.
+
+RUN: python3 engine.py onboard --input law_firms.csv [--output DATA_DIR] [--backend sqlite] [--chunk-size 5000]
+     python3 engine.py onboard --input law_firms.csv --incremental [--dry-run] [--keep-missing] [--effective-from 2024-07-01]
+     python3 engine.py rates --input rate_cards.csv [--output DATA_DIR]
+     python3 engine.py verify --input inbox/invoices.json [--output DATA_DIR] [--workers 4] [--full]
+     python3 engine.py assign --input matters.csv [--output DATA_DIR] [--method greedy]
+     (./ebilling onboard|rates|verify|assign ... is the same command)
+
+--output is the data directory (default: the current one). assign reads
+the internal lawyers from internal_lawyers.json there.
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from collections import deque
+from datetime import date
+from itertools import count
+
+from assignment_solver import DEFAULT_METHOD, METHODS, assign_matters
+from inbox_reader import iter_invoices
+from metrics import timed
+from storage import BACKENDS, get_storage
+from vendor_ingest import CHUNK_SIZE, iter_vendor_csv, ingest_vendors
+
+
+# ============================================================
+# ENGINES
+# ============================================================
+
+@timed("engine.run_vendor_onboarding")
+def run_vendor_onboarding(storage, csv_path, chunk_size=CHUNK_SIZE, details=True):
+    """
+    Replace the vendor database with the valid vendors of a CSV.
+
+    The CSV is streamed and saved chunk_size rows at a time (see
+    vendor_ingest.py). With details=False only results["counts"] is filled
+    in, so memory stays flat however large the file is. Vendors are checked
+    against the same rules as Agent 1's tools (vendor_rules.py).
+    """
+    # NumPy comes in with the rule checks - only load it for this command
+    from vendor_rules import check_vendors
+
+    results = {"onboarded": [], "warnings": [], "rejected": []}
+
+    def collect(saved, rejected):
+        for vendor, warnings in saved:
+            results["onboarded"].append({"vendor_id": vendor["vendor_id"], "firm_name": vendor["firm_name"], "status": vendor["status"], "warnings": warnings})
+            results["warnings"].extend(warnings)
+        for vendor, errors in rejected:
+            results["rejected"].append({"firm_name": vendor.get("firm_name", "Unknown"), "errors": errors})
+
+    results["counts"] = ingest_vendors(storage, iter_vendor_csv(csv_path), check_vendors, chunk_size,
+                                       fresh=True, on_chunk=collect if details else None)
+    return results
+
+
+@timed("engine.run_vendor_sync")
+def run_vendor_sync(storage, csv_path, chunk_size=CHUNK_SIZE, deactivate_missing=True, dry_run=False, effective_from=None):
+    """
+    Update the vendor database with only what changed in a CSV (see
+    vendor_sync.py): new firms are inserted, changed ones updated under
+    their VND-<id>, and firms missing from the CSV deactivated. Changed
+    rates take effect on effective_from (default: today).
+
+    Returns:
+        The change set (inserted, updated, deactivated, rejected records
+        and the rate cards recorded) and results["counts"]
+    """
+    from vendor_rules import check_vendors
+    from vendor_sync import change_counts, change_report, sync_vendors
+
+    changes = sync_vendors(storage, iter_vendor_csv(csv_path), check_vendors, chunk_size, deactivate_missing, dry_run,
+                           effective_from)
+    results = change_report(changes)
+    results["counts"] = change_counts(changes)
+    return results
+
+
+@timed("engine.run_rate_card_import")
+def run_rate_card_import(storage, csv_path):
+    """
+    Add (or replace) rate card entries from a CSV with columns vendor_id or
+    firm_name (exact, case-insensitive), level, effective_from and rate.
+
+    Returns:
+        The saved entries, the rejected rows with their errors and
+        results["counts"]
+    """
+    from rate_cards import parse_card
+    from vendor_sync import vendor_key
+
+    vendors = storage.list_vendors()
+    if not vendors:
+        return {"error": "Run Agent 1 first"}
+    vendor_ids = {v["vendor_id"] for v in vendors}
+    by_key = {}
+    for v in vendors:
+        by_key.setdefault(vendor_key(v), v["vendor_id"])
+
+    results = {"saved": [], "rejected": []}
+    read = 0
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            read += 1
+            vendor_id = (row.get("vendor_id") or "").strip() or by_key.get(vendor_key(row))
+            if vendor_id not in vendor_ids:
+                results["rejected"].append({"row": row, "errors": ["Unknown vendor"]})
+                continue
+            try:
+                results["saved"].append(parse_card(dict(row, vendor_id=vendor_id)))
+            except ValueError as e:
+                results["rejected"].append({"row": row, "errors": [str(e)]})
+    storage.save_rate_cards(results["saved"])
+    results["counts"] = {"read": read, "saved": len(results["saved"]), "rejected": len(results["rejected"])}
+    return results
+
+
+@timed("engine.run_invoice_verification")
+def run_invoice_verification(storage, inbox_path, workers=1, incremental=True):
+    # NumPy comes in with the rate engine - only load it for this command
+    from duplicate_index import DuplicateIndex, mark_duplicate
+    from rate_engine import verify_invoices
+    from vendor_index import VendorIndex
+    from verification_state import IncrementalRun
+
+    vendor_db = storage.load_vendor_db()
+    if not vendor_db:
+        return {"error": "Run Agent 1 first"}
+    with storage.batch():
+        if not incremental:
+            storage.clear_notifications()
+        # Only new invoices, and invoices whose content or vendor rates
+        # (including rate cards) changed since the last run, are verified again
+        rate_cards = storage.load_rate_cards()
+        run = IncrementalRun(storage.load_verification_state(), VendorIndex(vendor_db["vendors"]).lookup,
+                             storage.rate_card_index())
+        results = {"approved": [], "flagged": [], "rejected": [], "unchanged": run.unchanged, "duplicates": []}
+        ap_numbers = count(storage.notification_count() + 1)
+        # Each invoice is checked against every invoice verified before it
+        # (see duplicate_index.py); its match is queued in inbox order
+        duplicates = DuplicateIndex(storage.load_invoice_index())
+        records, matches = deque(), deque()
+        invoices = duplicates.screen(run.changed(iter_invoices(inbox_path), records), matches, records)
+        # Line items are verified in batches as NumPy columns; with workers > 1
+        # the batches are sharded across processes. Decisions come back in
+        # inbox order, so AP-NNNN numbering is the same either way.
+        for bucket, entry, notification in verify_invoices(invoices, vendor_db["vendors"], workers, rate_cards=rate_cards):
+            match = matches.popleft()
+            if match:
+                bucket = mark_duplicate(match, bucket, entry, notification)
+                results["duplicates"].append({"invoice_id": notification["invoice_id"], "duplicate_of": match["invoice_id"],
+                                              "match": match["match"], "similarity": match["similarity"]})
+            invoice_id = notification["invoice_id"]
+            notification["notification_id"] = run.previous_notification_id(invoice_id) or f"AP-{next(ap_numbers):04d}"
+            results[bucket].append(entry)
+            storage.append_notification(notification)
+            run.record(invoice_id, notification["notification_id"])
+        storage.save_verification_state(run.verified)
+        storage.append_invoice_index(duplicates.new_columns())
+    return results
+
+
+@timed("engine.run_case_assignment")
+def run_case_assignment(storage, matters_path, method=DEFAULT_METHOD):
+    matters = []
+    with open(matters_path, 'r') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            matters.append(row)
+    lawyers_db = storage.load_lawyers()
+    if not lawyers_db:
+        return {"error": "No internal lawyers - internal_lawyers.json is missing from the data directory"}
+
+    for l in lawyers_db["lawyers"]:
+        l["current_caseload"] = 0
+
+    results = {"assigned": [], "unassigned": []}
+    assignments = {"assignments": []}
+
+    for decision in assign_matters(matters, lawyers_db["lawyers"], method):
+        matter = decision["matter"]
+        case_type = decision["case_type"]
+        best_lawyer = decision["lawyer"]
+        reasoning_steps = decision["reasoning"]
+
+        if best_lawyer:
+            assignment = {
+                "assignment_id": f"ASN-{len(assignments['assignments']) + 1:04d}",
+                "matter_id": matter["matter_id"],
+                "matter_name": matter["matter_name"],
+                "case_type": case_type,
+                "priority": decision["priority"],
+                "assigned_to": {
+                    "lawyer_id": best_lawyer["lawyer_id"],
+                    "name": best_lawyer["name"],
+                    "title": best_lawyer.get("title", "Counsel"),
+                    "email": best_lawyer["email"]
+                },
+                "outside_counsel": matter.get("outside_counsel", ""),
+                "reasoning": reasoning_steps,
+                "selection_reason": decision["selection_reason"]
+            }
+            assignments["assignments"].append(assignment)
+
+            results["assigned"].append({
+                "matter_id": matter["matter_id"],
+                "matter_name": matter["matter_name"],
+                "case_type": case_type,
+                "assigned_to": best_lawyer["name"],
+                "reasoning": reasoning_steps
+            })
+        else:
+            results["unassigned"].append({
+                "matter_id": matter["matter_id"],
+                "matter_name": matter["matter_name"],
+                "case_type": case_type,
+                "reason": "No available lawyer with matching expertise",
+                "reasoning": reasoning_steps
+            })
+
+    with storage.batch():
+        storage.replace_assignments(assignments["assignments"])
+        storage.save_lawyers(lawyers_db["lawyers"])
+    return results
+
+
+# ============================================================
+# CLI
+# ============================================================
+
+def _iso_date(value):
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a date (YYYY-MM-DD): {value}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="ebilling", description="Run the e-billing engines as batch jobs (no LLM, no UI).")
+    parser.add_argument("--output", default=".", help="data directory the results are written to (default: current directory)")
+    parser.add_argument("--backend", choices=BACKENDS, help="storage backend (default: EBILLING_STORAGE or json)")
+    parser.add_argument("--report", help="also write the full results as JSON to this file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    onboard_parser = sub.add_parser("onboard", help="onboard vendors from a CSV")
+    onboard_parser.add_argument("--input", required=True, help="vendors CSV (e.g. law_firms.csv)")
+    onboard_parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows validated and saved at a time")
+    onboard_parser.add_argument("--incremental", action="store_true", help="apply only the changes to the existing vendors (stable IDs)")
+    onboard_parser.add_argument("--dry-run", action="store_true", help="with --incremental: report the changes without writing them")
+    onboard_parser.add_argument("--keep-missing", action="store_true", help="with --incremental: do not deactivate vendors missing from the CSV")
+    onboard_parser.add_argument("--effective-from", type=_iso_date, help="with --incremental: date changed rates take effect (YYYY-MM-DD, default today)")
+
+    rates_parser = sub.add_parser("rates", help="add effective-dated rate cards from a CSV")
+    rates_parser.add_argument("--input", required=True, help="rate card CSV (vendor_id or firm_name, level, effective_from, rate)")
+
+    verify_parser = sub.add_parser("verify", help="verify an invoice inbox and write AP notifications")
+    verify_parser.add_argument("--input", required=True, help="invoice inbox (JSON array or JSON Lines)")
+    verify_parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    verify_parser.add_argument("--full", action="store_true", help="re-verify every invoice, not only new or changed ones")
+
+    assign_parser = sub.add_parser("assign", help="assign matters from a CSV to internal lawyers")
+    assign_parser.add_argument("--input", required=True, help="matters CSV (e.g. matters.csv)")
+    assign_parser.add_argument("--method", choices=METHODS, default=DEFAULT_METHOD)
+
+    # Shared options may also come after the command
+    for command_parser in (onboard_parser, rates_parser, verify_parser, assign_parser):
+        command_parser.add_argument("--output", default=argparse.SUPPRESS)
+        command_parser.add_argument("--backend", choices=BACKENDS, default=argparse.SUPPRESS)
+        command_parser.add_argument("--report", default=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.command == "onboard" and (args.dry_run or args.keep_missing or args.effective_from) and not args.incremental:
+        parser.error("--dry-run, --keep-missing and --effective-from need --incremental")
+
+    storage = get_storage(args.output, args.backend)
+    start = time.perf_counter()
+    try:
+        if args.command == "onboard" and args.incremental:
+            results = run_vendor_sync(storage, args.input, args.chunk_size, not args.keep_missing, args.dry_run,
+                                      args.effective_from)
+        elif args.command == "onboard":
+            # Per-vendor details are only kept when they are reported
+            results = run_vendor_onboarding(storage, args.input, args.chunk_size, details=bool(args.report))
+        elif args.command == "rates":
+            results = run_rate_card_import(storage, args.input)
+        elif args.command == "verify":
+            results = run_invoice_verification(storage, args.input, args.workers, incremental=not args.full)
+        else:
+            results = run_case_assignment(storage, args.input, args.method)
+    finally:
+        storage.close()
+    seconds = time.perf_counter() - start
+
+    if "error" in results:
+        print(f"ebilling {args.command}: {results['error']}", file=sys.stderr)
+        return 1
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(results, f, indent=2)
+    summary = {"command": args.command, "seconds": round(seconds, 3)}
+    summary.update(results.get("counts") or {k: len(v) for k, v in results.items() if isinstance(v, list)})
+    if getattr(args, "dry_run", False):
+        summary["dry_run"] = True
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
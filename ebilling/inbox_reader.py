@@ -0,0 +1,189 @@
+"""
+E-Billing System - Streaming Inbox Reader
+
+Yields invoices one at a time from the AP inbox so verification runs in
+bounded memory no matter how large the inbox file gets.
+
+Two formats are supported and detected from the file contents:
+- a top-level JSON array:  [ {...}, {...}, ... ]   (inbox/invoices.json)
+- JSON Lines: one invoice object per line          (inbox/invoices.jsonl)
+
+iter_invoices_from() also reports the byte position after each invoice,
+so a paged reader can seek back to it instead of re-reading the file from
+the start for every page.
+"""
+
+import codecs
+import io
+import json
+import os
+
+
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = " \t\r\n"
+# Characters that can continue a JSON number
+_NUMBER_CHARS = "0123456789.eE+-"
+_decoder = json.JSONDecoder()
+
+
+class InboxFormatError(ValueError):
+    """Raised when the inbox file is neither a JSON array nor JSON Lines."""
+
+
+def iter_invoices(path, chunk_size=CHUNK_SIZE):
+    """
+    Iterate over the invoices in an inbox file.
+
+    Args:
+        path: Path to a JSON array or JSON Lines inbox file
+        chunk_size: Bytes read per chunk when parsing a JSON array
+
+    Yields:
+        One invoice dict at a time
+    """
+    for invoice, _ in _iter_inbox(path, 0, chunk_size, positions=False):
+        yield invoice
+
+
+def iter_invoices_from(path, position=0, chunk_size=CHUNK_SIZE):
+    """
+    Iterate over the invoices in an inbox file from a byte position.
+
+    Args:
+        path: Path to a JSON array or JSON Lines inbox file
+        position: 0 for the start, or a position yielded by an earlier
+                  call (to resume after that invoice)
+
+    Yields:
+        (invoice, position) - position is just after the invoice
+    """
+    yield from _iter_inbox(path, position, chunk_size, positions=True)
+
+
+def _iter_inbox(path, position, chunk_size, positions):
+    with open(path, 'rb') as raw:
+        start = len(codecs.BOM_UTF8) if raw.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8 else 0
+        raw.seek(start)
+        first = _peek_first_char(raw)
+        if first == "":
+            return
+        if first not in "[{":
+            raise InboxFormatError(f"{path}: expected a JSON array or JSON Lines, found {first!r}")
+        resume = position > 0
+        raw.seek(position if resume else start)
+        if first == "{":
+            yield from _iter_json_lines(raw, position if resume else start)
+            return
+        # newline="" keeps "\r\n" as is, so the text encodes back to the bytes on disk
+        f = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        yield from _iter_json_array(f, chunk_size, position if resume else start, resume, positions)
+
+
+def count_invoices(path):
+    """Count invoices without holding them all in memory."""
+    if not os.path.exists(path):
+        return 0
+    return sum(1 for _ in iter_invoices(path))
+
+
+def _peek_first_char(raw):
+    while True:
+        ch = raw.read(1).decode("ascii", "replace")
+        if ch == "" or ch not in _WHITESPACE:
+            return ch
+
+
+def _iter_json_lines(raw, position):
+    for line_no, line in enumerate(raw, 1):
+        position += len(line)
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line), position
+        except json.JSONDecodeError as e:
+            raise InboxFormatError(f"line {line_no}: {e}") from e
+
+
+def _iter_json_array(f, chunk_size, position, resume=False, positions=True):
+    """
+    Yield (item, byte position after it) from a JSON array, from its start
+    or (resume) from a position just after an item.
+    """
+    buf = f.read(chunk_size)
+    pos = 0
+    eof = False
+    # Whitespace before the "[" may run over several chunks
+    opened = resume
+    expect_value = not resume
+    # Byte position of buf[mark] (positions are only counted if wanted)
+    mark = 0
+
+    while True:
+        # Skip whitespace and the separating comma
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            if positions:
+                position += len(buf[mark:pos].encode("utf-8"))
+                mark = 0
+            buf, pos, eof = _refill(f, buf, pos, chunk_size)
+
+        if pos >= len(buf):
+            raise InboxFormatError("unterminated JSON array" if opened else "not a JSON array")
+
+        ch = buf[pos]
+        if not opened:
+            if ch != "[":
+                raise InboxFormatError(f"not a JSON array (starts with {ch!r})")
+            opened = True
+            pos += 1
+            continue
+        if ch == "]":
+            return
+        if ch == ",":
+            if expect_value:
+                raise InboxFormatError("unexpected ',' in JSON array")
+            pos += 1
+            expect_value = True
+            continue
+        if not expect_value:
+            raise InboxFormatError(f"expected ',' or ']' in JSON array, found {ch!r}")
+
+        # Decode one element, pulling in more data until it is complete
+        while True:
+            try:
+                item, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                if positions:
+                    position += len(buf[mark:pos].encode("utf-8"))
+                    mark = 0
+                buf, pos, eof = _refill(f, buf, pos, chunk_size)
+                continue
+            # A bare number (or literal) at the end of the buffer may still be growing
+            if not eof and ch not in "{[\"" and (end == len(buf) or buf[end] in _NUMBER_CHARS):
+                if positions:
+                    position += len(buf[mark:pos].encode("utf-8"))
+                    mark = 0
+                buf, pos, eof = _refill(f, buf, pos, chunk_size)
+                continue
+            break
+
+        if positions:
+            position += len(buf[mark:end].encode("utf-8"))
+            mark = end
+        yield item, position if positions else None
+        pos = end
+        expect_value = False
+
+
+def _refill(f, buf, pos, chunk_size):
+    """Drop consumed text and append the next chunk (at least doubling for big items)."""
+    buf = buf[pos:]
+    chunk = f.read(max(chunk_size, len(buf)))
+    return buf + chunk, 0, chunk == ""
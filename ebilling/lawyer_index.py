@@ -0,0 +1,132 @@
+"""
+E-Billing System - Lawyer Index
+
+In-memory practice-area index over the internal lawyers, shared by the
+assignment solver (app) and Agent 3's tools through the storage layer.
+
+For every practice area the index keeps two priority queues of the
+active lawyers that still have capacity:
+
+- by available capacity (largest first) - used for high priority matters
+- by current caseload (smallest first)  - used for everything else
+
+Ties go to the lawyer listed first, exactly like the stable sort the
+greedy selection used. Caseload changes push a fresh entry and retire
+the old one lazily, so each best-candidate query is O(log L) instead of
+a walk over every lawyer.
+"""
+
+import heapq
+
+
+def practice_areas(lawyer):
+    return [pa.lower() for pa in lawyer["practice_areas"]]
+
+
+class LawyerIndex:
+    """
+    Practice-area index over a list of lawyer dicts.
+
+    The index holds the dicts themselves; add_cases() updates
+    current_caseload in place and re-ranks the lawyer.
+    """
+
+    def __init__(self, lawyers):
+        self.lawyers = list(lawyers)
+        self._by_id = {}
+        self._order = {}
+        self._areas = {}
+        self._members = {}
+        self._version = {}
+        self._by_capacity = {}
+        self._by_caseload = {}
+        for order, lawyer in enumerate(self.lawyers):
+            lawyer_id = lawyer["lawyer_id"]
+            self._by_id[lawyer_id] = lawyer
+            self._order[lawyer_id] = order
+            self._areas[lawyer_id] = list(dict.fromkeys(practice_areas(lawyer)))
+            self._version[lawyer_id] = 0
+            for area in self._areas[lawyer_id]:
+                self._members.setdefault(area, []).append(lawyer_id)
+            self._push(lawyer_id)
+
+    def __len__(self):
+        return len(self.lawyers)
+
+    def get(self, lawyer_id):
+        return self._by_id.get(lawyer_id)
+
+    def _push(self, lawyer_id):
+        lawyer = self._by_id[lawyer_id]
+        if lawyer["status"] != "active":
+            return
+        available = lawyer["max_caseload"] - lawyer["current_caseload"]
+        if available <= 0:
+            return
+        entry_version = self._version[lawyer_id]
+        order = self._order[lawyer_id]
+        for area in self._areas[lawyer_id]:
+            heapq.heappush(self._by_capacity.setdefault(area, []), (-available, order, entry_version, lawyer_id))
+            heapq.heappush(self._by_caseload.setdefault(area, []), (lawyer["current_caseload"], order, entry_version, lawyer_id))
+
+    def _live(self, entry):
+        return entry[2] == self._version[entry[3]]
+
+    def add_cases(self, lawyer_id, delta=1):
+        """Change a lawyer's caseload and re-rank them in every practice area."""
+        lawyer = self._by_id[lawyer_id]
+        lawyer["current_caseload"] += delta
+        self._version[lawyer_id] += 1
+        self._push(lawyer_id)
+        return lawyer
+
+    def members(self, areas):
+        """Every lawyer (any status) practicing one of the areas, in list order."""
+        ids = {lawyer_id for area in areas for lawyer_id in self._members.get(area, [])}
+        return [self._by_id[i] for i in sorted(ids, key=self._order.__getitem__)]
+
+    def matched_area(self, lawyer, areas):
+        """First of the areas the lawyer practices, or None."""
+        practiced = self._areas[lawyer["lawyer_id"]]
+        for area in areas:
+            if area in practiced:
+                return area
+        return None
+
+    def ranked(self, areas, priority, limit=1):
+        """
+        Best available lawyers for a matter, best first.
+
+        Args:
+            areas: Practice areas that can take the matter
+            priority: "high" ranks by available capacity, anything else by caseload
+            limit: Maximum number of lawyers to return
+        """
+        queues = self._by_capacity if priority == "high" else self._by_caseload
+        tops = []
+        for area in areas:
+            heap = queues.get(area)
+            if not heap:
+                continue
+            taken = []
+            while heap and len(taken) < limit:
+                entry = heapq.heappop(heap)
+                if self._live(entry):
+                    taken.append(entry)
+            for entry in taken:
+                heapq.heappush(heap, entry)
+            tops.extend(taken)
+
+        ranked, seen = [], set()
+        for entry in sorted(tops):
+            if entry[3] not in seen:
+                seen.add(entry[3])
+                ranked.append(self._by_id[entry[3]])
+                if len(ranked) == limit:
+                    break
+        return ranked
+
+    def best(self, areas, priority):
+        """The lawyer the greedy selection would pick, or None."""
+        ranked = self.ranked(areas, priority)
+        return ranked[0] if ranked else None
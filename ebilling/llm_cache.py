@@ -0,0 +1,380 @@
+"""
+E-Billing System - LLM and Tool Result Cache
+
+Rerunning an agent on the same data asks the model the same questions and
+calls the same deterministic tools with the same arguments. Both are
+cached in one persistent, content-addressed SQLite file (llm_cache.db):
+
+- LLM completions, keyed on the prompt and LangChain's llm_string (model
+  name, parameters and bound tool schemas), so a replay of the same batch
+  costs no model calls
+- results of pure tools (validate_vendor, verify_invoice), keyed on the
+  tool, its arguments, the tool output mode (EBILLING_TOOL_OUTPUT) and
+  hashes of the file that defines it and of the modules it names as
+  dependencies (e.g. vendor_rules.py), so editing the rules invalidates
+  them
+
+The file is size-bounded (EBILLING_CACHE_MAX_MB, default 256); the least
+recently used entries are evicted first. EBILLING_LLM_CACHE=off turns
+caching off.
+
+EBILLING_LLM=offline swaps the model for OfflineChatModel, a local
+stand-in that answers without network calls or an API key (for tests).
+
+At most EBILLING_LLM_CONCURRENCY (default 4) model calls are in flight
+per process, however many crews run at once (see crew_orchestrator.py);
+cache hits do not take a slot.
+
+RUN: python3 llm_cache.py stats|clear [cache_file]
+"""
+
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from langchain_core.caches import BaseCache
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult, Generation
+
+from data_cache import content_hash
+from metrics import span
+from tool_output import pretty
+
+
+MODEL = "claude-sonnet-4-20250514"
+CACHE_FILE = "llm_cache.db"
+DEFAULT_MAX_MB = 256
+DEFAULT_LLM_CONCURRENCY = 4
+# Evict down to this share of the limit, so eviction is not run per insert
+LOW_WATER = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key       TEXT PRIMARY KEY,
+    kind      TEXT NOT NULL,
+    value     TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries(last_used);
+"""
+
+
+class ResultCache:
+    """
+    Persistent key -> JSON text store with LRU eviction by total size.
+
+    Safe to share between threads; several processes may use the same file
+    (SQLite WAL), each evicting when it sees the file over its limit.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._bytes = self._total_bytes()
+
+    def close(self):
+        self.conn.close()
+
+    def _total_bytes(self):
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key):
+        """Cached JSON text for key, or None."""
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time_ns(), key))
+            return row[0]
+
+    def put(self, key, kind, value):
+        """Store JSON text under key; kind ("llm", "tool") is kept for stats and clear."""
+        size = len(key) + len(value)
+        with self._lock:
+            # A replaced entry's size no longer counts
+            replaced = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries(key, kind, value, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, value, size, time.time_ns()),
+            )
+            self._bytes += size - (replaced[0] if replaced else 0)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Other processes write to the file too - start from the real total
+        self._bytes = self._total_bytes()
+        target = int(self.max_bytes * LOW_WATER)
+        while self._bytes > target:
+            victims = []
+            for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY last_used LIMIT 256").fetchall():
+                if self._bytes <= target:
+                    break
+                victims.append((key,))
+                self._bytes -= size
+            if not victims:
+                break
+            self.conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def clear(self, kind=None):
+        """Drop every entry, or only entries of one kind."""
+        with self._lock:
+            if kind is None:
+                self.conn.execute("DELETE FROM entries")
+            else:
+                self.conn.execute("DELETE FROM entries WHERE kind = ?", (kind,))
+            self._bytes = self._total_bytes()
+
+    def stats(self):
+        with self._lock:
+            by_kind = {kind: {"entries": n, "bytes": size} for kind, n, size in self.conn.execute(
+                "SELECT kind, COUNT(*), SUM(size) FROM entries GROUP BY kind")}
+            total = self.hits + self.misses
+            return {
+                "path": self.path,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "kinds": by_kind,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_cache():
+    """The process-wide ResultCache, or None when EBILLING_LLM_CACHE=off."""
+    global _shared
+    if os.environ.get("EBILLING_LLM_CACHE", "on").lower() in ("off", "0", "false"):
+        return None
+    with _shared_lock:
+        if _shared is None:
+            max_mb = float(os.environ.get("EBILLING_CACHE_MAX_MB", DEFAULT_MAX_MB))
+            _shared = ResultCache(os.environ.get("EBILLING_CACHE_PATH", CACHE_FILE), int(max_mb * 1024 * 1024))
+        return _shared
+
+
+# ============================================================
+# TOOL RESULTS
+# ============================================================
+
+@functools.lru_cache(maxsize=None)
+def _source_hash(path):
+    with open(path, 'rb') as f:
+        return content_hash(f.read().decode("utf-8", "replace"))
+
+
+def cached_tool(fn=None, *, depends=()):
+    """
+    Cache a pure tool function's results by its arguments.
+
+    Only for tools whose result depends on nothing but their arguments -
+    not on the database, the clock or files. Put it under @tool.
+
+    Args:
+        depends: Modules the tool's logic lives in besides its own file
+                 (e.g. @cached_tool(depends=[vendor_rules])); editing any
+                 of them invalidates its cached results
+    """
+    if fn is None:
+        return lambda fn: cached_tool(fn, depends=depends)
+    name = f"{fn.__module__}.{fn.__qualname__}"
+    sources = [inspect.getsourcefile(fn)] + [inspect.getsourcefile(module) for module in depends]
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        cache = get_cache()
+        if cache is None:
+            return fn(*args, **kwargs)
+        # Results are dumped in the output mode in effect (see tool_output.py)
+        key = content_hash(["tool", name, [_source_hash(source) for source in sources], pretty(), args, kwargs])
+        cached = cache.get(key)
+        if cached is not None:
+            return json.loads(cached)
+        result = fn(*args, **kwargs)
+        cache.put(key, "tool", json.dumps(result))
+        return result
+    return wrapper
+
+
+# ============================================================
+# LLM COMPLETIONS (LangChain cache interface)
+# ============================================================
+
+def _dump_generation(generation):
+    if isinstance(generation, ChatGeneration):
+        return {"message": message_to_dict(generation.message), "generation_info": generation.generation_info}
+    return {"text": generation.text, "generation_info": generation.generation_info}
+
+
+def _load_generation(data):
+    if "message" in data:
+        return ChatGeneration(message=messages_from_dict([data["message"]])[0], generation_info=data["generation_info"])
+    return Generation(text=data["text"], generation_info=data["generation_info"])
+
+
+class LLMCache(BaseCache):
+    """LangChain cache backed by a ResultCache; pass as the model's cache=."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def lookup(self, prompt, llm_string):
+        cached = self.store.get(content_hash(["llm", prompt, llm_string]))
+        if cached is None:
+            return None
+        return [_load_generation(data) for data in json.loads(cached)]
+
+    def update(self, prompt, llm_string, return_val):
+        value = json.dumps([_dump_generation(generation) for generation in return_val], default=str)
+        self.store.put(content_hash(["llm", prompt, llm_string]), "llm", value)
+
+    def clear(self, **kwargs):
+        self.store.clear("llm")
+
+
+OFFLINE_ANSWER = "Thought: I now know the final answer\nFinal Answer: Offline stand-in model - no model call was made."
+
+
+class OfflineChatModel(BaseChatModel):
+    """Local stand-in for the chat model: a fixed answer, no network or API key."""
+
+    model: str = "offline"
+    answer: str = OFFLINE_ANSWER
+
+    @property
+    def _llm_type(self):
+        return "ebilling-offline"
+
+    @property
+    def _identifying_params(self):
+        return {"model": self.model, "answer": self.answer}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+
+# ============================================================
+# CONCURRENCY LIMIT (model calls in flight)
+# ============================================================
+
+class CallLimiter:
+    """Bounded number of concurrent calls across threads, with wait statistics."""
+
+    def __init__(self, limit):
+        self.set_limit(limit)
+
+    def set_limit(self, limit):
+        """Change the limit; only call while no calls are in flight."""
+        self.limit = max(1, int(limit))
+        self._slots = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = 0
+        self.wait_seconds = 0.0
+
+    def __enter__(self):
+        start = time.perf_counter()
+        self._slots.acquire()
+        with self._lock:
+            self.wait_seconds += time.perf_counter() - start
+            self.calls += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        return self
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self):
+        return {"limit": self.limit, "calls": self.calls, "peak_in_flight": self.peak, "wait_seconds": self.wait_seconds}
+
+
+llm_limiter = CallLimiter(os.environ.get("EBILLING_LLM_CONCURRENCY", DEFAULT_LLM_CONCURRENCY))
+
+
+class LimitedChatModel(BaseChatModel):
+    """
+    Wraps a chat model so its calls go through llm_limiter (and are timed
+    as the llm.generate span).
+
+    Cache lookups happen in this wrapper, before a slot is taken, under the
+    wrapped model's llm_string (so existing cache entries stay valid).
+    """
+
+    inner: BaseChatModel
+
+    @property
+    def _llm_type(self):
+        return self.inner._llm_type
+
+    @property
+    def _identifying_params(self):
+        return self.inner._identifying_params
+
+    def _get_llm_string(self, stop=None, **kwargs):
+        return self.inner._get_llm_string(stop=stop, **kwargs)
+
+    def bind_tools(self, tools, **kwargs):
+        # Bind the wrapped model's tool arguments to this model instead
+        return self.bind(**self.inner.bind_tools(tools, **kwargs).kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        with llm_limiter, span("llm.generate"):
+            return self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+def make_llm(model=MODEL):
+    """
+    The agents' chat model, with completions cached in the shared cache
+    and calls bounded by llm_limiter.
+
+    Wraps OfflineChatModel instead of ChatAnthropic when EBILLING_LLM=offline.
+    """
+    store = get_cache()
+    cache = LLMCache(store) if store is not None else None
+    if os.environ.get("EBILLING_LLM", "").lower() == "offline":
+        inner = OfflineChatModel()
+    else:
+        from langchain_anthropic import ChatAnthropic
+        inner = ChatAnthropic(model=model)
+    return LimitedChatModel(inner=inner, cache=cache)
+
+
+# ============================================================
+# CLI
+# ============================================================
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = ResultCache(sys.argv[2] if len(sys.argv) > 2 else CACHE_FILE)
+    if command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    elif command == "clear":
+        cache.clear()
+        print(f"Cleared {cache.path}")
+    else:
+        print("Usage: python3 llm_cache.py stats|clear [cache_file]")
+        sys.exit(1)
@@ -0,0 +1,251 @@
+"""
+E-Billing System - Timing Instrumentation
+
+Spans time named units of work so a run shows where its time goes:
+
+    tool.<name>          every agent tool call
+    engine.<name>        the run_* batch engines (engine.py)
+    llm.generate         model calls that reached the model (cache misses;
+                         time waiting for a concurrency slot is not included)
+    storage.read_json    whole-file JSON reads and writes of the JSON backend
+    storage.write_json
+
+Per span name the registry keeps the call count, errors, total seconds,
+p50/p95/p99 over the last WINDOW calls, and bytes read and written. Bytes
+are the process's I/O counters (/proc/self/io rchar/wchar) across the
+span, so they include nested spans and, when threads overlap, the other
+threads' I/O; where /proc is not available they stay 0.
+
+Metrics are per process and exported in the Prometheus text format:
+- EBILLING_METRICS_PORT=9464   served on http://127.0.0.1:9464/metrics
+- EBILLING_METRICS_FILE=path   written when the process exits (e.g. for
+                               node_exporter's textfile collector)
+- the web app's sidebar Performance panel (table and download)
+
+EBILLING_METRICS=off turns recording off.
+"""
+
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+WINDOW = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+PROC_IO = "/proc/self/io"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def enabled():
+    return os.environ.get("EBILLING_METRICS", "on").lower() not in ("off", "0", "false")
+
+
+def _io_counters():
+    """(rchar, wchar, bytes this read cost) of the process, or None without /proc."""
+    try:
+        with open(PROC_IO, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    fields = dict(line.split(b": ", 1) for line in data.splitlines() if b": " in line)
+    return int(fields[b"rchar"]), int(fields[b"wchar"]), len(data)
+
+
+def _quantile(ordered, q):
+    # Nearest rank
+    return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))]
+
+
+# ============================================================
+# REGISTRY
+# ============================================================
+
+class SpanStats:
+    __slots__ = ("count", "errors", "total", "recent", "bytes_read", "bytes_written")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=WINDOW)
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+
+class Registry:
+    """Aggregated span timings, safe to record into from any thread."""
+
+    def __init__(self):
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, bytes_read=0, bytes_written=0, error=False):
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = SpanStats()
+            stats.count += 1
+            stats.errors += error
+            stats.total += seconds
+            stats.recent.append(seconds)
+            stats.bytes_read += bytes_read
+            stats.bytes_written += bytes_written
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+
+    def snapshot(self):
+        """One dict per span name, slowest total first."""
+        with self._lock:
+            items = [(name, s.count, s.errors, s.total, sorted(s.recent), s.bytes_read, s.bytes_written)
+                     for name, s in self._spans.items()]
+        rows = []
+        for name, n, errors, total, ordered, bytes_read, bytes_written in items:
+            row = {"span": name, "count": n, "errors": errors, "total_seconds": total}
+            for q in QUANTILES:
+                row[f"p{int(q * 100)}_seconds"] = _quantile(ordered, q)
+            row["bytes_read"] = bytes_read
+            row["bytes_written"] = bytes_written
+            rows.append(row)
+        rows.sort(key=lambda row: row["total_seconds"], reverse=True)
+        return rows
+
+    def prometheus(self):
+        """The registry in the Prometheus text exposition format."""
+        rows = sorted(self.snapshot(), key=lambda row: row["span"])
+        lines = [
+            f"# HELP ebilling_span_seconds Time spent in instrumented spans (quantiles over the last {WINDOW} calls).",
+            "# TYPE ebilling_span_seconds summary",
+        ]
+        for row in rows:
+            label = _label(row["span"])
+            for q in QUANTILES:
+                lines.append(f'ebilling_span_seconds{{span="{label}",quantile="{q}"}} {row[f"p{int(q * 100)}_seconds"]!r}')
+            lines.append(f'ebilling_span_seconds_sum{{span="{label}"}} {row["total_seconds"]!r}')
+            lines.append(f'ebilling_span_seconds_count{{span="{label}"}} {row["count"]}')
+        for metric, field, help_text in (
+                ("ebilling_span_errors_total", "errors", "Instrumented calls that raised."),
+                ("ebilling_span_read_bytes_total", "bytes_read", "Bytes read by the process during the span."),
+                ("ebilling_span_written_bytes_total", "bytes_written", "Bytes written by the process during the span.")):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f'{metric}{{span="{_label(row["span"])}"}} {row[field]}' for row in rows)
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write prometheus() to path atomically (scrapers never see half a file)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+
+# ============================================================
+# SPANS
+# ============================================================
+
+@contextmanager
+def span(name):
+    """Time the enclosed block under name."""
+    if not enabled():
+        yield
+        return
+    before = _io_counters()
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        bytes_read = bytes_written = 0
+        if before is not None:
+            after = _io_counters()
+            # Less the read of /proc/self/io that took the first sample
+            bytes_read = max(0, after[0] - before[0] - before[2])
+            bytes_written = after[1] - before[1]
+        registry.record(name, seconds, bytes_read, bytes_written, error)
+
+
+def timed(name):
+    """Decorator: time every call of a function under name."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return wrap
+
+
+def timed_tool(fn):
+    """Time an agent tool as tool.<name>. Put it under @tool (above @cached_tool)."""
+    return timed(f"tool.{fn.__name__}")(fn)
+
+
+# ============================================================
+# EXPORT
+# ============================================================
+
+_server = None
+_exit_file = None
+_export_lock = threading.Lock()
+
+
+def start_server(port, host="127.0.0.1"):
+    """Serve /metrics from a background thread (once per process); returns the server."""
+    global _server
+    # Imported here: http.server is slow to import, and batch jobs rarely serve
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _export_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server
+
+
+def export_from_env():
+    """Start the exports asked for by EBILLING_METRICS_PORT / EBILLING_METRICS_FILE (idempotent)."""
+    global _exit_file
+    port = os.environ.get("EBILLING_METRICS_PORT")
+    if port:
+        try:
+            start_server(int(port))
+        except OSError as e:
+            print(f"metrics: cannot serve on port {port}: {e}", file=sys.stderr)
+    path = os.environ.get("EBILLING_METRICS_FILE")
+    with _export_lock:
+        if path and _exit_file is None:
+            _exit_file = path
+            atexit.register(registry.write, path)
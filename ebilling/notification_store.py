@@ -0,0 +1,346 @@
+"""
+E-Billing System - AP Notification Store
+
+Append-only storage for AP notifications, replacing the read-modify-write
+of ap_notifications.json (which rewrote the whole file per notification).
+
+Layout of the store directory:
+    segment-000001.jsonl   one notification per line, append-only
+    segment-000001.idx     sidecar index: "<notification_id>\\t<byte offset>"
+
+Appends are buffered and fsync'd every `sync_every` records (and on close).
+Re-appending an existing notification_id supersedes the earlier record
+(and is read back in its place); compact() rewrites the live records into
+a fresh segment.
+
+Opening the store for writing repairs what a crash left behind (a torn
+trailing record, records missing from the sidecar). Readers open it with
+read_only=True, which never modifies a file: a writer may be part-way
+through a flush, so a torn tail is ignored rather than cut off.
+
+RUN: python3 notification_store.py compact|export|stats [store_dir]
+"""
+
+import json
+import os
+import sys
+
+
+SEGMENT_PREFIX = "segment-"
+DEFAULT_SYNC_EVERY = 100
+DEFAULT_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class NotificationStore:
+    """
+    Append-only JSON Lines store of AP notifications.
+
+    Single writer: only one process should append to a store at a time.
+    Any number of read_only stores may read it meanwhile.
+    """
+
+    def __init__(self, root, sync_every=DEFAULT_SYNC_EVERY, segment_max_bytes=DEFAULT_SEGMENT_MAX_BYTES,
+                 read_only=False):
+        self.root = str(root)
+        self.sync_every = max(1, sync_every)
+        self.segment_max_bytes = segment_max_bytes
+        self.read_only = read_only
+        self._index = {}          # notification_id -> (segment number, offset)
+        self._data = None
+        self._idx = None
+        self._segment = 0
+        self._unsynced = 0
+        if not read_only:
+            os.makedirs(self.root, exist_ok=True)
+        self._load_index()
+
+    # ------------------------------------------------------------
+    # Context manager / lifecycle
+    # ------------------------------------------------------------
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, notification_id):
+        return notification_id in self._index
+
+    def next_notification_id(self):
+        """The next sequential AP-NNNN id."""
+        return f"AP-{len(self._index) + 1:04d}"
+
+    def close(self):
+        self.flush()
+        for f in (self._data, self._idx):
+            if f:
+                f.close()
+        self._data = self._idx = None
+
+    # ------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------
+
+    def append(self, notification):
+        """Append one notification (must carry a notification_id)."""
+        self._check_writable()
+        notification_id = notification["notification_id"]
+        line = (json.dumps(notification, separators=(",", ":")) + "\n").encode("utf-8")
+
+        if self._data is None:
+            self._open_segment(self._segment or 1)
+        elif self._data.tell() and self._data.tell() + len(line) > self.segment_max_bytes:
+            self._open_segment(self._segment + 1)
+
+        offset = self._data.tell()
+        self._data.write(line)
+        self._idx.write(f"{notification_id}\t{offset}\n".encode("utf-8"))
+        self._index[notification_id] = (self._segment, offset)
+
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every:
+            self.flush()
+        return notification_id
+
+    def extend(self, notifications):
+        for n in notifications:
+            self.append(n)
+
+    def flush(self):
+        """Flush buffered appends and fsync the active segment."""
+        if self._data is None or not self._unsynced:
+            return
+        self._data.flush()
+        self._idx.flush()
+        os.fsync(self._data.fileno())
+        os.fsync(self._idx.fileno())
+        self._unsynced = 0
+
+    def clear(self):
+        """Delete every notification in the store."""
+        self._check_writable()
+        self.close()
+        for name in self._segment_files():
+            for ext in (".jsonl", ".idx"):
+                path = self._path(name, ext)
+                if os.path.exists(path):
+                    os.remove(path)
+        self._index = {}
+        self._segment = 0
+
+    def compact(self):
+        """
+        Rewrite live records into a single new segment and drop the old ones.
+
+        Returns:
+            (records kept, segments removed)
+        """
+        self._check_writable()
+        self.flush()
+        old_segments = self._segment_files()
+        live = list(self.iter_notifications())
+        self.close()
+
+        new_segment = self._segment + 1
+        self._index = {}
+        self._open_segment(new_segment)
+        for n in live:
+            self.append(n)
+        self.flush()
+
+        for seg in old_segments:
+            for ext in (".jsonl", ".idx"):
+                path = self._path(seg, ext)
+                if os.path.exists(path):
+                    os.remove(path)
+        return len(live), len(old_segments)
+
+    # ------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------
+
+    def get(self, notification_id):
+        """Fetch one notification by id with a single seek, or None."""
+        loc = self._index.get(notification_id)
+        if loc is None:
+            return None
+        if self._data is not None and loc[0] == self._segment:
+            self._data.flush()
+        with open(self._path(loc[0], ".jsonl"), 'rb') as f:
+            f.seek(loc[1])
+            return json.loads(f.readline())
+
+    def iter_notifications(self):
+        """
+        Yield live notifications in the order they were first appended
+        (a superseded notification keeps its place).
+        """
+        if self._data is not None:
+            self._data.flush()
+        # The index is a dict keyed by notification_id, so it keeps first-append
+        # order; without superseded records the seeks below just walk each file
+        files = {}
+        try:
+            for seg, offset in list(self._index.values()):
+                f = files.get(seg)
+                if f is None:
+                    f = files[seg] = open(self._path(seg, ".jsonl"), 'rb')
+                f.seek(offset)
+                yield json.loads(f.readline())
+        finally:
+            for f in files.values():
+                f.close()
+
+    def read_all(self):
+        """All live notifications in the legacy {"notifications": [...]} shape."""
+        return {"notifications": list(self.iter_notifications())}
+
+    # ------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------
+
+    def _check_writable(self):
+        if self.read_only:
+            raise ValueError(f"Notification store {self.root} is open read-only")
+
+    def _path(self, segment, ext):
+        return os.path.join(self.root, f"{SEGMENT_PREFIX}{segment:06d}{ext}")
+
+    def _segment_files(self):
+        segments = []
+        if not os.path.isdir(self.root):
+            return segments
+        for name in os.listdir(self.root):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(".jsonl"):
+                segments.append(int(name[len(SEGMENT_PREFIX):-len(".jsonl")]))
+        return sorted(segments)
+
+    def _open_segment(self, segment):
+        for f in (self._data, self._idx):
+            if f:
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+        self._segment = segment
+        self._data = open(self._path(segment, ".jsonl"), 'ab')
+        self._idx = open(self._path(segment, ".idx"), 'ab')
+        self._unsynced = 0
+
+    def _load_index(self):
+        segments = self._segment_files()
+        for seg in segments:
+            last_offset = None
+            idx_path = self._path(seg, ".idx")
+            if os.path.exists(idx_path):
+                good_end = 0
+                with open(idx_path, 'rb' if self.read_only else 'r+b') as f:
+                    for line in f:
+                        notification_id, sep, offset = line.decode("utf-8").rstrip("\n").partition("\t")
+                        if not sep or not line.endswith(b"\n"):
+                            break
+                        self._index[notification_id] = (seg, int(offset))
+                        last_offset = int(offset) if last_offset is None else max(last_offset, int(offset))
+                        good_end += len(line)
+                    if not self.read_only:
+                        f.truncate(good_end)
+            self._recover_tail(seg, last_offset)
+        if segments:
+            self._segment = segments[-1]
+
+    def _recover_tail(self, seg, last_offset):
+        """
+        Re-index records written after the sidecar's last entry (e.g. after a crash).
+
+        Read-only, they are only indexed in memory and a torn trailing
+        record is left alone.
+        """
+        data_path = self._path(seg, ".jsonl")
+        with open(data_path, 'rb' if self.read_only else 'r+b') as f:
+            start = 0
+            if last_offset is not None:
+                f.seek(last_offset)
+                start = last_offset + len(f.readline())
+            f.seek(0, os.SEEK_END)
+            if f.tell() <= start:
+                return
+
+            f.seek(start)
+            offset = good_end = start
+            missing = []
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                missing.append((json.loads(line)["notification_id"], offset))
+                offset += len(line)
+                good_end = offset
+            # Drop a half-written trailing record
+            if not self.read_only:
+                f.truncate(good_end)
+
+        if self.read_only:
+            for notification_id, offset in missing:
+                self._index[notification_id] = (seg, offset)
+            return
+        with open(self._path(seg, ".idx"), 'ab') as idx:
+            for notification_id, offset in missing:
+                idx.write(f"{notification_id}\t{offset}\n".encode("utf-8"))
+                self._index[notification_id] = (seg, offset)
+
+
+def load_notifications(root):
+    """
+    Read the store at root for display.
+
+    Returns:
+        {"notifications": [...]} or None if nothing has been written yet,
+        matching what load_json returned for ap_notifications.json
+    """
+    if not os.path.isdir(root):
+        return None
+    store = NotificationStore(root, read_only=True)
+    try:
+        if not len(store):
+            return None
+        return store.read_all()
+    finally:
+        store.close()
+
+
+# ============================================================
+# COMMAND LINE: compaction and export
+# ============================================================
+
+def main(argv):
+    if not argv or argv[0] not in ("compact", "export", "stats"):
+        print("usage: python3 notification_store.py compact|stats [store_dir]")
+        print("       python3 notification_store.py export [store_dir] [output.json]")
+        return 2
+    command = argv[0]
+    root = argv[1] if len(argv) > 1 else "ap_notifications"
+    if not os.path.isdir(root):
+        print(f"❌ Notification store not found: {root}")
+        return 1
+
+    with NotificationStore(root, read_only=command != "compact") as store:
+        if command == "compact":
+            kept, removed = store.compact()
+            print(f"Compacted {removed} segment(s) into 1 - {kept} notifications kept")
+        elif command == "export":
+            out = argv[2] if len(argv) > 2 else "ap_notifications.json"
+            with open(out, 'w') as f:
+                json.dump(store.read_all(), f, indent=2)
+            print(f"Exported {len(store)} notifications to {out}")
+        else:
+            segments = store._segment_files()
+            size = sum(os.path.getsize(store._path(s, ".jsonl")) for s in segments)
+            print(f"Notifications: {len(store)}")
+            print(f"Segments: {len(segments)} ({size:,} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,195 @@
+"""
+E-Billing System - Effective-Dated Rate Cards
+
+A vendor's contracted rates change over time, and an invoice has to be
+verified against the rates in force on its invoice_date - not today's.
+A rate card entry is
+
+    (vendor_id, level, effective_from, rate)
+
+and is in force from effective_from until the vendor's next entry for the
+same timekeeper level. Where no entry is in force (a vendor without rate
+cards, or a date before its first one) the rate on the vendor record
+applies, so a database without rate cards verifies exactly as before.
+
+RateCardIndex is an interval index: every entry is one key in a single
+sorted column, (vendor, level, day), so each vendor/level pair is a run of
+consecutive intervals. The rate in force is the last key <= the query's.
+rates_on() resolves a whole batch (every invoice x every level) with one
+np.searchsorted over that column instead of one search per line item.
+
+Entries come from a rate card CSV (`./ebilling rates`) or from
+incremental re-onboarding, which records a vendor's old and new rates
+whenever a feed changes them (see rate_change_cards).
+"""
+
+import bisect
+from datetime import date
+
+import numpy as np
+
+
+LEVELS = ("partner", "associate", "paralegal")
+
+# Rates recorded for a vendor before it had any rate cards are taken to
+# have been in force from the start
+EARLIEST = date.min.isoformat()
+
+# Keys are slot * len(LEVELS) + level, then the day; days (date ordinals)
+# are below DAY_SPAN for every date up to 9999-12-31
+DAY_SPAN = 1 << 22
+
+
+def parse_day(value):
+    """Date ordinal of an ISO date (or datetime) string, or -1 if there is none."""
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except (TypeError, ValueError):
+        return -1
+
+
+def parse_card(row):
+    """
+    Normalize one rate card entry.
+
+    Raises:
+        ValueError: unknown level, bad effective_from date or bad rate
+    """
+    level = str(row.get("level") or "").strip().lower()
+    if level not in LEVELS:
+        raise ValueError(f"Level must be one of {list(LEVELS)}")
+    effective_from = str(row.get("effective_from") or "").strip()[:10]
+    if parse_day(effective_from) < 0:
+        raise ValueError("effective_from must be a date (YYYY-MM-DD)")
+    try:
+        rate = float(row.get("rate"))
+    except (TypeError, ValueError):
+        raise ValueError("Rate must be a number")
+    if not rate >= 0:
+        raise ValueError("Rate must be a number >= 0")
+    return {"vendor_id": row["vendor_id"], "level": level, "effective_from": effective_from, "rate": rate}
+
+
+# ============================================================
+# INTERVAL INDEX
+# ============================================================
+
+class RateCardIndex:
+    """
+    Point-in-time rate lookup over rate card entries.
+
+    Args:
+        cards: Rate card entries (dicts with vendor_id, level,
+               effective_from, rate), in any order
+    """
+
+    def __init__(self, cards=()):
+        self._slots = {}
+        rows = []
+        for card in cards:
+            slot = self._slots.setdefault(card["vendor_id"], len(self._slots))
+            group = slot * len(LEVELS) + LEVELS.index(card["level"])
+            rows.append((group * DAY_SPAN + parse_day(card["effective_from"]), card["rate"]))
+        rows.sort()
+        self._keys = np.array([key for key, _ in rows], dtype=np.int64)
+        self._rates = np.array([rate for _, rate in rows], dtype=np.float64)
+        self._key_list = self._keys.tolist()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def has_cards(self, vendor_id, level=None):
+        """Whether a vendor (or one of its levels) has any rate card entry."""
+        slot = self._slots.get(vendor_id)
+        if slot is None:
+            return False
+        if level is None:
+            return True
+        group = slot * len(LEVELS) + LEVELS.index(level)
+        i = bisect.bisect_left(self._key_list, group * DAY_SPAN)
+        return i < len(self._key_list) and self._key_list[i] // DAY_SPAN == group
+
+    def cards_for(self, vendor_id):
+        """A vendor's entries as (level, effective_from, rate), in key order."""
+        slot = self._slots.get(vendor_id)
+        if slot is None:
+            return []
+        lo = bisect.bisect_left(self._key_list, slot * len(LEVELS) * DAY_SPAN)
+        hi = bisect.bisect_left(self._key_list, (slot + 1) * len(LEVELS) * DAY_SPAN)
+        return [(LEVELS[key // DAY_SPAN % len(LEVELS)], date.fromordinal(key % DAY_SPAN).isoformat(), rate)
+                for key, rate in zip(self._key_list[lo:hi], self._rates[lo:hi].tolist())]
+
+    def rate_on(self, vendor_id, level, when):
+        """The rate in force for a vendor's level on a date, or None if no entry is."""
+        slot = self._slots.get(vendor_id)
+        day = parse_day(when)
+        if slot is None or day < 0 or level not in LEVELS:
+            return None
+        group = slot * len(LEVELS) + LEVELS.index(level)
+        i = bisect.bisect_right(self._key_list, group * DAY_SPAN + day) - 1
+        if i < 0 or self._key_list[i] // DAY_SPAN != group:
+            return None
+        return float(self._rates[i])
+
+    def rates_in_force(self, vendor_id, when, fallback):
+        """{level: rate} on a date; levels without an entry in force keep fallback's rate."""
+        rates = dict(fallback)
+        for level in LEVELS:
+            rate = self.rate_on(vendor_id, level, when)
+            if rate is not None:
+                rates[level] = rate
+        return rates
+
+    def rates_on(self, vendor_ids, days, fallback):
+        """
+        Rates in force for a whole batch at once.
+
+        Args:
+            vendor_ids: One vendor_id per query
+            days: Date ordinals (parse_day), -1 for no date
+            fallback: (queries x len(LEVELS)) array of rates to use where no
+                      entry is in force (e.g. the vendor records' rates)
+
+        Returns:
+            (queries x len(LEVELS)) float array
+        """
+        fallback = np.asarray(fallback, dtype=np.float64)
+        if not len(self) or not len(vendor_ids):
+            return fallback
+        slots = np.array([self._slots.get(vendor_id, -1) for vendor_id in vendor_ids], dtype=np.int64)
+        days = np.asarray(days, dtype=np.int64)
+        groups = slots[:, None] * len(LEVELS) + np.arange(len(LEVELS))
+        queries = groups * DAY_SPAN + days[:, None]
+        # Last entry at or before each query, all queries in one search
+        found_at = np.searchsorted(self._keys, queries.ravel(), side="right").reshape(queries.shape) - 1
+        at = np.maximum(found_at, 0)
+        in_force = (found_at >= 0) & (self._keys[at] // DAY_SPAN == groups) & (slots[:, None] >= 0) & (days[:, None] >= 0)
+        return np.where(in_force, self._rates[at], fallback)
+
+
+# ============================================================
+# RATE CHANGES FROM VENDOR UPDATES
+# ============================================================
+
+def rate_change_cards(before, after, effective_from, index):
+    """
+    Rate card entries that record a vendor update's rate changes.
+
+    The new rate is in force from effective_from. If the level had no
+    entries yet, the old rate is recorded too (from EARLIEST), so invoices
+    dated before the change keep being verified against it.
+    """
+    cards = []
+    vendor_id = after["vendor_id"]
+    for level in LEVELS:
+        field = f"{level}_rate"
+        try:
+            old, new = float(before.get(field, 0)), float(after.get(field, 0))
+        except (TypeError, ValueError):
+            continue
+        if old == new:
+            continue
+        if not index.has_cards(vendor_id, level):
+            cards.append({"vendor_id": vendor_id, "level": level, "effective_from": EARLIEST, "rate": old})
+        cards.append({"vendor_id": vendor_id, "level": level, "effective_from": effective_from, "rate": new})
+    return cards
@@ -0,0 +1,248 @@
+"""
+E-Billing System - Batch Rate Verification Engine
+
+Verifies the line items of many invoices at once. A batch of invoices is
+flattened into columns (invoice index, level code, hours, billed rate).
+Each invoice gets the contracted rates in force on its invoice_date - the
+vendor's rate cards where they apply (rate_cards.py, one lookup for the
+whole batch), else the rates on the vendor record - and line items join
+them with one fancy-index. Overcharges, flags and per-invoice totals come
+out of a handful of NumPy array operations instead of a Python loop per
+item.
+
+Results follow the same rules as the per-invoice loop it replaces:
+- unknown timekeeper levels have a contracted rate of 0
+- a line is an OVERCHARGE when billed rate > contracted rate
+- overcharge = (billed rate - contracted rate) x hours
+
+verify_invoices() drives a whole inbox through it, either in this process
+or sharded across a process pool with results kept in input order.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+
+from rate_cards import LEVELS, RateCardIndex, parse_day
+from vendor_index import VendorIndex
+
+
+LEVEL_CODES = {level: code for code, level in enumerate(LEVELS)}
+UNKNOWN_LEVEL = len(LEVELS)
+
+BATCH_SIZE = 10000
+
+
+def contracted_rates(vendor):
+    """A vendor record's contracted rates, keyed by timekeeper level."""
+    return {level: float(vendor.get(f"{level}_rate", 0)) for level in LEVELS}
+
+
+def iter_batches(invoices, size=BATCH_SIZE):
+    """Split an invoice stream into lists of at most size invoices."""
+    invoices = iter(invoices)
+    while True:
+        batch = list(islice(invoices, size))
+        if not batch:
+            return
+        yield batch
+
+
+def verify_batch(invoices, vendor_index, rate_cards=None):
+    """
+    Verify a batch of invoices against their vendors' contracted rates.
+
+    Args:
+        invoices: List of invoice dicts
+        vendor_index: VendorIndex used to resolve each invoice's firm_name
+        rate_cards: RateCardIndex of effective-dated rates, if any
+
+    Returns:
+        One result dict per invoice, in order:
+        - invoice: the invoice dict
+        - vendor: matched vendor record, or None
+        - contracted_rates (in force on the invoice date), line_items,
+          discrepancies, total_overcharge (only for invoices from an
+          active vendor)
+    """
+    results = []
+    rate_rows = {}
+    rate_table = []
+    checked_results, checked_vendor, checked_row, checked_day = [], [], [], []
+    item_invoice, item_checked, item_level, item_hours, item_rate = [], [], [], [], []
+    items = []
+
+    # Flatten every checkable line item into columns
+    for pos, invoice in enumerate(invoices):
+        vendor = vendor_index.lookup(invoice.get("firm_name", ""))
+        result = {"invoice": invoice, "vendor": vendor}
+        results.append(result)
+        if not vendor or vendor.get("status") == "inactive":
+            continue
+
+        row = rate_rows.get(vendor["vendor_id"])
+        if row is None:
+            row = rate_rows[vendor["vendor_id"]] = len(rate_table)
+            rates = contracted_rates(vendor)
+            rate_table.append([rates[level] for level in LEVELS] + [0.0])
+        checked = len(checked_results)
+        checked_results.append(result)
+        checked_vendor.append(vendor["vendor_id"])
+        checked_row.append(row)
+        checked_day.append(parse_day(invoice.get("invoice_date")))
+
+        for item in invoice.get("line_items", []):
+            level = item.get("level", "").lower()
+            items.append((item, level))
+            item_invoice.append(pos)
+            item_checked.append(checked)
+            item_level.append(LEVEL_CODES.get(level, UNKNOWN_LEVEL))
+            item_hours.append(item.get("hours", 0))
+            item_rate.append(float(item.get("rate", 0)))
+
+    # Rates in force on each checked invoice's date: the vendor record's
+    # rates, overridden by rate cards in one lookup for the whole batch
+    table = np.asarray(rate_table, dtype=np.float64).reshape(-1, UNKNOWN_LEVEL + 1)
+    invoice_rates = table[np.asarray(checked_row, dtype=np.intp)]
+    if rate_cards:
+        invoice_rates[:, :UNKNOWN_LEVEL] = rate_cards.rates_on(checked_vendor, checked_day, invoice_rates[:, :UNKNOWN_LEVEL])
+    for result, rates in zip(checked_results, invoice_rates.tolist()):
+        result["contracted_rates"] = dict(zip(LEVELS, rates))
+
+    # Join contracted rates and compute overcharges as whole columns
+    invoice_pos = np.asarray(item_invoice, dtype=np.intp)
+    hours = np.asarray(item_hours, dtype=np.float64)
+    billed = np.asarray(item_rate, dtype=np.float64)
+    contracted = invoice_rates[np.asarray(item_checked, dtype=np.intp), np.asarray(item_level, dtype=np.intp)]
+    over = billed > contracted
+    overcharge = np.where(over, (billed - contracted) * hours, 0.0)
+    totals = np.bincount(invoice_pos, weights=overcharge, minlength=len(results))
+
+    for result, total in zip(results, totals.tolist()):
+        if "contracted_rates" in result:
+            result["line_items"] = []
+            result["discrepancies"] = []
+            result["total_overcharge"] = total
+
+    # Back to per-item records (tolist() converts to Python floats in one go)
+    for (item, level), pos, billed_rate, contracted_rate, flagged, amount in zip(
+            items, item_invoice, billed.tolist(), contracted.tolist(), over.tolist(), overcharge.tolist()):
+        result = results[pos]
+        detail = {
+            "timekeeper": item.get("timekeeper"),
+            "level": level,
+            "description": item.get("description", ""),
+            "hours": item.get("hours", 0),
+            "billed_rate": billed_rate,
+            "contracted_rate": contracted_rate,
+            "billed_amount": item.get("amount", 0),
+            "status": "OK"
+        }
+        if flagged:
+            detail["status"] = "OVERCHARGE"
+            detail["overcharge"] = amount
+            result["discrepancies"].append({"timekeeper": item.get("timekeeper"), "level": level, "billed": billed_rate, "contracted": contracted_rate, "overcharge": amount})
+        result["line_items"].append(detail)
+
+    return results
+
+
+# ============================================================
+# DECISIONS (verification result -> AP notification)
+# ============================================================
+
+def decide(checked):
+    """
+    Turn one verify_batch result into the run's summary entry and AP notification.
+
+    The notification's notification_id is left as None for the caller to
+    number, so numbering stays sequential however the work was split.
+
+    Returns:
+        (bucket, entry, notification) - bucket is "approved", "flagged" or "rejected"
+    """
+    invoice, vendor = checked["invoice"], checked["vendor"]
+    firm_name = invoice.get("firm_name", "")
+    if not vendor:
+        entry = {"invoice_id": invoice["invoice_id"], "firm_name": firm_name, "reason": "Vendor not in database", "amount": invoice.get("total_amount", 0)}
+        notification = {"notification_id": None, "invoice_id": invoice["invoice_id"], "firm_name": firm_name, "amount": invoice.get("total_amount", 0), "timestamp": datetime.now().isoformat(), "status": "REJECTED", "action": "DO_NOT_PAY", "reason": "Vendor not in database"}
+        return "rejected", entry, notification
+    if vendor.get("status") == "inactive":
+        entry = {"invoice_id": invoice["invoice_id"], "firm_name": firm_name, "reason": "Vendor is INACTIVE", "amount": invoice.get("total_amount", 0)}
+        notification = {"notification_id": None, "invoice_id": invoice["invoice_id"], "firm_name": firm_name, "amount": invoice.get("total_amount", 0), "timestamp": datetime.now().isoformat(), "status": "REJECTED", "action": "DO_NOT_PAY", "reason": "Vendor is INACTIVE - cannot process invoices from inactive vendors"}
+        return "rejected", entry, notification
+
+    discrepancies = checked["discrepancies"]
+    total_overcharge = checked["total_overcharge"]
+    notification = {"notification_id": None, "invoice_id": invoice["invoice_id"], "firm_name": firm_name, "amount": invoice.get("total_amount"), "matter": invoice.get("matter"), "matter_id": invoice.get("matter_id"), "invoice_date": invoice.get("invoice_date"), "total_hours": invoice.get("total_hours"), "timestamp": datetime.now().isoformat(), "line_items": checked["line_items"], "contracted_rates": checked["contracted_rates"]}
+    if discrepancies:
+        notification["status"] = "FLAGGED"
+        notification["action"] = "HOLD_PAYMENT"
+        notification["overcharge"] = total_overcharge
+        notification["discrepancies"] = discrepancies
+        notification["reason"] = f"Rate discrepancies detected - ${total_overcharge:,.2f} overcharge"
+        entry = {"invoice_id": invoice["invoice_id"], "firm_name": firm_name, "amount": invoice.get("total_amount"), "overcharge": total_overcharge, "discrepancies": discrepancies}
+        return "flagged", entry, notification
+
+    notification["status"] = "APPROVED"
+    notification["action"] = "RELEASE_PAYMENT"
+    notification["reason"] = "All rates match contracted amounts"
+    entry = {"invoice_id": invoice["invoice_id"], "firm_name": firm_name, "amount": invoice.get("total_amount")}
+    return "approved", entry, notification
+
+
+def decide_batch(invoices, vendor_index, rate_cards=None):
+    return [decide(checked) for checked in verify_batch(invoices, vendor_index, rate_cards)]
+
+
+# ============================================================
+# DRIVERS (serial, or sharded across a process pool)
+# ============================================================
+
+def verify_invoices(invoices, vendors, workers=1, batch_size=BATCH_SIZE, rate_cards=()):
+    """
+    Verify an invoice stream and yield decide() results in input order.
+
+    Args:
+        invoices: Iterable of invoice dicts (e.g. iter_invoices(path))
+        vendors: Vendor records from the vendor database
+        workers: Processes to shard batches across (1 = in this process)
+        batch_size: Invoices per shard
+        rate_cards: Rate card entries (storage.load_rate_cards())
+    """
+    if workers <= 1:
+        vendor_index = VendorIndex(vendors)
+        card_index = RateCardIndex(rate_cards)
+        for batch in iter_batches(invoices, batch_size):
+            yield from decide_batch(batch, vendor_index, card_index)
+        return
+
+    # The vendor table and rate cards are shipped once per worker
+    # (initializer), not per shard. At most 2 x workers shards are in
+    # flight, so memory stays bounded, and results are taken in
+    # submission order.
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(vendors, rate_cards)) as pool:
+        pending = deque()
+        for batch in iter_batches(invoices, batch_size):
+            pending.append(pool.submit(_verify_shard, batch))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+_worker_index = None
+_worker_cards = None
+
+
+def _init_worker(vendors, rate_cards):
+    global _worker_index, _worker_cards
+    _worker_index = VendorIndex(vendors)
+    _worker_cards = RateCardIndex(rate_cards)
+
+
+def _verify_shard(invoices):
+    return decide_batch(invoices, _worker_index, _worker_cards)
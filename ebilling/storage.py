@@ -0,0 +1,893 @@
+"""
+E-Billing System - Storage Layer
+
+One interface over the system's state (vendors and their rate cards, AP
+notifications, matter assignments, internal lawyers, incremental
+verification state and the duplicate invoice index) with two
+interchangeable backends:
+
+- "json"   (default) the original files: vendor_database.json,
+           ap_notifications/, matter_assignments.json, internal_lawyers.json,
+           plus rate_cards.json, verification_state.json and invoice_index/
+           (NumPy .npz segments - the index holds one row per invoice
+           ever verified, too many for a JSON document)
+- "sqlite" a single ebilling.db in WAL mode with indexes on vendor
+           firm_name, invoice_id, matter_id and lawyer_id, so lookups are
+           point queries and writes are single-row inserts/updates
+
+Pick the backend with EBILLING_STORAGE=json|sqlite (or pass it explicitly).
+
+Document-style reads (load_vendor_db, load_assignments, ...) return the same
+{"vendors": [...]}-shaped dicts the JSON files always held, or None when
+empty, so callers written against load_json keep working unchanged.
+"""
+
+import functools
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from data_cache import file_version
+from lawyer_index import LawyerIndex
+from metrics import timed
+from notification_store import NotificationStore
+from vendor_db import FIRST_VENDOR_ID, apply_vendor_changes, save_vendor_chunks, save_vendors_batch
+from vendor_index import VendorIndex, load_vendor_index, normalize_firm_name
+
+
+VENDOR_DB_FILE = "vendor_database.json"
+AP_NOTIFICATIONS_DIR = "ap_notifications"
+ASSIGNMENTS_DB_FILE = "matter_assignments.json"
+LAWYERS_DB_FILE = "internal_lawyers.json"
+VERIFICATION_STATE_FILE = "verification_state.json"
+RATE_CARDS_FILE = "rate_cards.json"
+INVOICE_INDEX_DIR = "invoice_index"
+SQLITE_DB_FILE = "ebilling.db"
+
+BACKENDS = ("json", "sqlite")
+
+
+def open_storage(root=".", backend=None):
+    """
+    Open the storage backend rooted at the given directory.
+
+    Args:
+        root: Directory holding the data files
+        backend: "json" or "sqlite" (default: $EBILLING_STORAGE or "json")
+    """
+    backend = (backend or os.environ.get("EBILLING_STORAGE") or "json").lower()
+    if backend == "json":
+        return JsonStorage(root)
+    if backend == "sqlite":
+        return SqliteStorage(root)
+    raise ValueError(f"Unknown storage backend '{backend}' - expected one of {BACKENDS}")
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_storage(root=".", backend=None):
+    """Return a process-wide storage instance for (root, backend), opening it once."""
+    backend = (backend or os.environ.get("EBILLING_STORAGE") or "json").lower()
+    key = (os.path.abspath(root), backend)
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = open_storage(root, backend)
+        return _shared[key]
+
+
+@timed("storage.read_json")
+def _read_json(path):
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return None
+
+
+@timed("storage.write_json")
+def _write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+DATA_KINDS = ("vendors", "notifications", "assignments", "lawyers")
+
+
+def _card_key(card):
+    return (card["vendor_id"], card["level"], card["effective_from"])
+
+
+def _writes(kind):
+    """
+    Mark a storage method as changing one kind of data (bumps data_version).
+
+    Writes hold the storage's lock, so threads sharing a storage instance
+    (e.g. concurrent crews) do not interleave read-modify-write cycles.
+    """
+    def wrap(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self._lock:
+                try:
+                    return method(self, *args, **kwargs)
+                finally:
+                    self._writes[kind] = self._writes.get(kind, 0) + 1
+        return wrapper
+    return wrap
+
+
+class _StorageBase:
+    """
+    Shared by both backends.
+
+    data_version(kind) changes whenever that kind of data changes - through
+    this instance (a write counter) or on disk (_external_version) - so
+    callers such as the app's data cache know when to reload.
+
+    lawyer_index() is one LawyerIndex per storage instance, shared by every
+    caller. Caseload changes made through the storage update it
+    incrementally; anything else (or a change made by another process,
+    detected through _lawyers_version) makes the next call rebuild it.
+
+    rate_card_index() is likewise one RateCardIndex, rebuilt whenever the
+    vendors' data_version changes (rate cards are part of "vendors").
+    """
+
+    _lawyer_index = None
+    _lawyer_index_version = None
+    _rate_card_index = None
+    _rate_card_index_version = None
+
+    def data_version(self, kind):
+        if kind not in DATA_KINDS:
+            raise ValueError(f"Unknown data kind '{kind}' - expected one of {DATA_KINDS}")
+        return (self._writes.get(kind, 0), self._external_version(kind))
+
+    @contextmanager
+    def locked(self):
+        """Hold the write lock across several calls (e.g. next id + append)."""
+        with self._lock:
+            yield self
+
+    def lawyer_index(self):
+        version = self._lawyers_version()
+        if self._lawyer_index is None or version != self._lawyer_index_version:
+            self._lawyer_index = LawyerIndex(self.list_lawyers())
+            self._lawyer_index_version = version
+        return self._lawyer_index
+
+    def rate_card_index(self):
+        # NumPy comes in with the index - only load it when rates are looked up
+        from rate_cards import RateCardIndex
+
+        version = self.data_version("vendors")
+        if self._rate_card_index is None or version != self._rate_card_index_version:
+            self._rate_card_index = RateCardIndex(self.load_rate_cards())
+            self._rate_card_index_version = version
+        return self._rate_card_index
+
+    def _lawyers_changed(self, before, lawyer_id=None, delta=0):
+        index = self._lawyer_index
+        if index is not None and lawyer_id is not None and before == self._lawyer_index_version and index.get(lawyer_id):
+            index.add_cases(lawyer_id, delta)
+            self._lawyer_index_version = self._lawyers_version()
+        else:
+            self._lawyer_index = None
+
+
+# ============================================================
+# JSON BACKEND (compatible with the original files)
+# ============================================================
+
+class JsonStorage(_StorageBase):
+    name = "json"
+
+    def __init__(self, root="."):
+        self.root = Path(root)
+        self.vendor_db_path = self.root / VENDOR_DB_FILE
+        self.notifications_dir = self.root / AP_NOTIFICATIONS_DIR
+        self.assignments_path = self.root / ASSIGNMENTS_DB_FILE
+        self.lawyers_path = self.root / LAWYERS_DB_FILE
+        self.verification_state_path = self.root / VERIFICATION_STATE_FILE
+        self.rate_cards_path = self.root / RATE_CARDS_FILE
+        self.invoice_index_dir = self.root / INVOICE_INDEX_DIR
+        self._notifications = None
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._writes = {}
+
+    def close(self):
+        if self._notifications is not None:
+            self._notifications.close()
+            self._notifications = None
+
+    @contextmanager
+    def batch(self):
+        """Group many writes; notification appends are fsync'd once at the end."""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.close()
+
+    # ---------------- vendors ----------------
+
+    def load_vendor_db(self):
+        return _read_json(self.vendor_db_path)
+
+    def list_vendors(self):
+        db = self.load_vendor_db()
+        return db["vendors"] if db else []
+
+    def vendor_count(self):
+        index = load_vendor_index(str(self.vendor_db_path))
+        return len(index) if index else 0
+
+    def find_vendor(self, firm_name):
+        """First vendor whose firm_name contains firm_name (case-insensitive)."""
+        index = load_vendor_index(str(self.vendor_db_path))
+        return index.lookup(firm_name) if index else None
+
+    @_writes("vendors")
+    def save_vendors(self, vendors, fresh=False):
+        saved = save_vendors_batch(vendors, self.vendor_db_path, fresh=fresh)
+        # Only once the new database is in place, so a failed write keeps both
+        if fresh:
+            self.clear_rate_cards()
+        return saved
+
+    @_writes("vendors")
+    def save_vendor_chunks(self, chunks, fresh=False):
+        """Save vendors from an iterable of chunks, one chunk in memory at a time; returns the count."""
+        saved = save_vendor_chunks(chunks, self.vendor_db_path, fresh=fresh)
+        # Only once the new database is in place, so a failed write keeps both
+        if fresh:
+            self.clear_rate_cards()
+        return saved
+
+    @_writes("vendors")
+    def apply_vendor_changes(self, inserted, updated):
+        """Replace updated vendors under their vendor_id and add inserted ones, in one write."""
+        return apply_vendor_changes(self.vendor_db_path, inserted, updated)
+
+    @_writes("vendors")
+    def clear_vendors(self):
+        if self.vendor_db_path.exists():
+            os.remove(self.vendor_db_path)
+        self.clear_rate_cards()
+
+    # ---------------- rate cards ----------------
+
+    def load_rate_cards(self):
+        db = _read_json(self.rate_cards_path)
+        return db["rate_cards"] if db else []
+
+    @_writes("vendors")
+    def save_rate_cards(self, cards):
+        """Upsert rate card entries, keyed by (vendor_id, level, effective_from)."""
+        if not cards:
+            return
+        merged = {_card_key(card): card for card in self.load_rate_cards()}
+        merged.update((_card_key(card), card) for card in cards)
+        _write_json(self.rate_cards_path, {"rate_cards": [merged[key] for key in sorted(merged)]})
+
+    @_writes("vendors")
+    def clear_rate_cards(self):
+        # Rate cards belong to VND-<id>s, which a fresh vendor database reassigns
+        if self.rate_cards_path.exists():
+            os.remove(self.rate_cards_path)
+
+    # ---------------- AP notifications ----------------
+
+    def _notification_store(self):
+        # Opened for appending (which repairs a torn tail) only under the lock;
+        # reads use a read-only store
+        with self._lock:
+            if self._notifications is None:
+                self._notifications = NotificationStore(self.notifications_dir)
+            return self._notifications
+
+    def next_notification_id(self):
+        return self._notification_store().next_notification_id()
+
+    @_writes("notifications")
+    def append_notification(self, notification):
+        # fsync is batched by the store (every sync_every appends, and on close)
+        self._notification_store().append(notification)
+        return notification["notification_id"]
+
+    def iter_notifications(self):
+        if self._notifications is not None:
+            yield from self._notifications.iter_notifications()
+        elif self.notifications_dir.is_dir():
+            with NotificationStore(self.notifications_dir, read_only=True) as store:
+                yield from store.iter_notifications()
+
+    def load_notifications(self):
+        notifications = list(self.iter_notifications())
+        return {"notifications": notifications} if notifications else None
+
+    def notification_count(self):
+        if self._notifications is not None:
+            return len(self._notifications)
+        if not self.notifications_dir.is_dir():
+            return 0
+        with NotificationStore(self.notifications_dir, read_only=True) as store:
+            return len(store)
+
+    def find_notification(self, invoice_id):
+        """Latest notification for an invoice, or None."""
+        found = None
+        for n in self.iter_notifications():
+            if n.get("invoice_id") == invoice_id:
+                found = n
+        return found
+
+    @_writes("notifications")
+    def clear_notifications(self):
+        if self._notifications is not None or self.notifications_dir.is_dir():
+            self._notification_store().clear()
+        # The verification state describes these notifications; the duplicate
+        # index is invoice history and stays (see clear_invoice_index)
+        if self.verification_state_path.exists():
+            os.remove(self.verification_state_path)
+
+    # ---------------- incremental verification state ----------------
+
+    def load_verification_state(self):
+        db = _read_json(self.verification_state_path)
+        return db["invoices"] if db else {}
+
+    @_writes("notifications")
+    def save_verification_state(self, entries):
+        """Upsert {record key: {"invoice_hash", "rates_hash", "notification_id"}} (see verification_state.py)."""
+        if not entries:
+            return
+        state = self.load_verification_state()
+        state.update(entries)
+        _write_json(self.verification_state_path, {"invoices": state})
+
+    # ---------------- duplicate invoice index ----------------
+
+    def _invoice_index_segments(self):
+        if not self.invoice_index_dir.is_dir():
+            return []
+        return sorted(self.invoice_index_dir.glob("segment-*.npz"))
+
+    def load_invoice_index(self):
+        """The duplicate index's columns (see duplicate_index.py), or None if empty."""
+        import numpy as np
+
+        segments = []
+        for path in self._invoice_index_segments():
+            with np.load(path) as segment:
+                segments.append({name: segment[name] for name in segment.files})
+        if not segments:
+            return None
+        columns = {name: np.concatenate([segment[name] for segment in segments]) for name in segments[0]}
+        columns["invoice_id"] = columns["invoice_id"].tolist()
+        columns["record"] = columns["record"].tolist()
+        return columns
+
+    def append_invoice_index(self, columns):
+        """Add rows to the duplicate index as one new segment."""
+        import numpy as np
+
+        if not len(columns["invoice_id"]):
+            return
+        self.invoice_index_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            segments = self._invoice_index_segments()
+            number = int(segments[-1].stem.split("-")[1]) + 1 if segments else 1
+            path = self.invoice_index_dir / f"segment-{number:06d}.npz"
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                np.savez(f, invoice_id=np.array(columns["invoice_id"], dtype=str),
+                         record=np.array(columns["record"], dtype=str), fingerprint=columns["fingerprint"],
+                         firm=columns["firm"], signature=columns["signature"])
+            os.replace(tmp, path)
+
+    def clear_invoice_index(self):
+        """Forget every indexed invoice (a demo reset; a full re-verification keeps them)."""
+        with self._lock:
+            if self.invoice_index_dir.is_dir():
+                shutil.rmtree(self.invoice_index_dir)
+
+    # ---------------- matter assignments ----------------
+
+    def load_assignments(self):
+        return _read_json(self.assignments_path)
+
+    def list_assignments(self):
+        db = self.load_assignments()
+        return db["assignments"] if db else []
+
+    def assignment_count(self):
+        return len(self.list_assignments())
+
+    def next_assignment_id(self):
+        return f"ASN-{self.assignment_count() + 1:04d}"
+
+    @_writes("assignments")
+    def add_assignment(self, assignment):
+        db = self.load_assignments() or {"assignments": []}
+        db["assignments"].append(assignment)
+        _write_json(self.assignments_path, db)
+        return assignment["assignment_id"]
+
+    @_writes("assignments")
+    def replace_assignments(self, assignments):
+        _write_json(self.assignments_path, {"assignments": list(assignments)})
+
+    def find_assignment(self, matter_id):
+        for a in self.list_assignments():
+            if a["matter_id"] == matter_id:
+                return a
+        return None
+
+    @_writes("assignments")
+    def clear_assignments(self):
+        if self.assignments_path.exists():
+            os.remove(self.assignments_path)
+
+    # ---------------- internal lawyers ----------------
+
+    def load_lawyers(self):
+        return _read_json(self.lawyers_path)
+
+    def list_lawyers(self):
+        db = self.load_lawyers()
+        return db["lawyers"] if db else []
+
+    def get_lawyer(self, lawyer_id):
+        for lawyer in self.list_lawyers():
+            if lawyer["lawyer_id"] == lawyer_id:
+                return lawyer
+        return None
+
+    def _lawyers_version(self):
+        return file_version(self.lawyers_path)
+
+    def _external_version(self, kind):
+        if kind == "notifications":
+            if not self.notifications_dir.is_dir():
+                return None
+            return tuple(sorted((e.name, e.stat().st_mtime_ns, e.stat().st_size) for e in os.scandir(self.notifications_dir)))
+        if kind == "vendors":
+            return (file_version(self.vendor_db_path), file_version(self.rate_cards_path))
+        path = {"assignments": self.assignments_path, "lawyers": self.lawyers_path}[kind]
+        return file_version(path)
+
+    @_writes("lawyers")
+    def increment_caseload(self, lawyer_id, delta=1):
+        before = self._lawyers_version()
+        db = self.load_lawyers()
+        for lawyer in db["lawyers"]:
+            if lawyer["lawyer_id"] == lawyer_id:
+                lawyer["current_caseload"] += delta
+                _write_json(self.lawyers_path, db)
+                self._lawyers_changed(before, lawyer_id, delta)
+                return lawyer
+        return None
+
+    @_writes("lawyers")
+    def save_lawyers(self, lawyers):
+        db = self.load_lawyers() or {}
+        db["lawyers"] = list(lawyers)
+        _write_json(self.lawyers_path, db)
+        self._lawyers_changed(None)
+
+    @_writes("lawyers")
+    def reset_caseloads(self):
+        db = self.load_lawyers()
+        if db:
+            for lawyer in db["lawyers"]:
+                lawyer["current_caseload"] = 0
+            _write_json(self.lawyers_path, db)
+        self._lawyers_changed(None)
+
+
+# ============================================================
+# SQLITE BACKEND
+# ============================================================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS vendors (
+    seq            INTEGER PRIMARY KEY,
+    vendor_id      TEXT UNIQUE,
+    firm_name      TEXT,
+    firm_name_norm TEXT,
+    data           TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_vendors_firm_name ON vendors(firm_name_norm);
+
+CREATE TABLE IF NOT EXISTS rate_cards (
+    vendor_id      TEXT NOT NULL,
+    level          TEXT NOT NULL,
+    effective_from TEXT NOT NULL,
+    rate           REAL NOT NULL,
+    PRIMARY KEY (vendor_id, level, effective_from)
+);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    seq             INTEGER PRIMARY KEY,
+    notification_id TEXT UNIQUE,
+    invoice_id      TEXT,
+    data            TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_notifications_invoice_id ON notifications(invoice_id);
+
+CREATE TABLE IF NOT EXISTS verification_state (
+    invoice_id      TEXT PRIMARY KEY,
+    invoice_hash    TEXT NOT NULL,
+    rates_hash      TEXT NOT NULL,
+    notification_id TEXT
+);
+
+CREATE TABLE IF NOT EXISTS invoice_index (
+    seq         INTEGER PRIMARY KEY,
+    invoice_id  TEXT NOT NULL,
+    record      TEXT NOT NULL,
+    fingerprint INTEGER NOT NULL,
+    firm        INTEGER NOT NULL,
+    signature   BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS assignments (
+    seq           INTEGER PRIMARY KEY,
+    assignment_id TEXT UNIQUE,
+    matter_id     TEXT,
+    lawyer_id     TEXT,
+    data          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_assignments_matter_id ON assignments(matter_id);
+CREATE INDEX IF NOT EXISTS idx_assignments_lawyer_id ON assignments(lawyer_id);
+
+CREATE TABLE IF NOT EXISTS lawyers (
+    seq              INTEGER PRIMARY KEY,
+    lawyer_id        TEXT UNIQUE,
+    current_caseload INTEGER NOT NULL DEFAULT 0,
+    data             TEXT NOT NULL
+);
+"""
+
+
+class SqliteStorage(_StorageBase):
+    name = "sqlite"
+
+    _vendor_index = None
+    _vendor_index_version = None
+
+    def __init__(self, root=".", db_file=SQLITE_DB_FILE):
+        self.root = Path(root)
+        self.path = self.root / db_file
+        self.lawyers_seed_path = self.root / LAWYERS_DB_FILE
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._writes = {}
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._seed_lawyers()
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def batch(self):
+        """Run many writes in one transaction."""
+        with self._lock:
+            outer = self._batch_depth == 0
+            if outer:
+                self.conn.execute("BEGIN")
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if outer:
+                    self.conn.execute("ROLLBACK")
+                raise
+            self._batch_depth -= 1
+            if outer:
+                self.conn.execute("COMMIT")
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _meta(self, key, default=None):
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (key, str(value)))
+
+    # ---------------- vendors ----------------
+
+    def load_vendor_db(self):
+        vendors = self.list_vendors()
+        if not vendors:
+            return None
+        return {"vendors": vendors, "next_id": int(self._meta("next_vendor_id", FIRST_VENDOR_ID))}
+
+    def list_vendors(self):
+        return [json.loads(row[0]) for row in self._query("SELECT data FROM vendors ORDER BY seq")]
+
+    def vendor_count(self):
+        return self._query("SELECT COUNT(*) FROM vendors")[0][0]
+
+    def find_vendor(self, firm_name):
+        """First vendor whose firm_name contains firm_name (case-insensitive)."""
+        # A substring match cannot use the firm_name index, so lookups go
+        # through a VendorIndex rebuilt only when the vendors change
+        version = self.data_version("vendors")
+        if self._vendor_index is None or version != self._vendor_index_version:
+            self._vendor_index = VendorIndex(self.list_vendors())
+            self._vendor_index_version = version
+        return self._vendor_index.lookup(firm_name)
+
+    @_writes("vendors")
+    def save_vendors(self, vendors, fresh=False):
+        self.save_vendor_chunks([vendors], fresh=fresh)
+        return vendors
+
+    @_writes("vendors")
+    def save_vendor_chunks(self, chunks, fresh=False):
+        """Save vendors from an iterable of chunks in one transaction; returns the count."""
+        saved = 0
+        with self.batch():
+            if fresh:
+                self.clear_vendors()
+            next_id = int(self._meta("next_vendor_id", FIRST_VENDOR_ID))
+            for chunk in chunks:
+                for vendor in chunk:
+                    vendor["vendor_id"] = f"VND-{next_id}"
+                    next_id += 1
+                self.conn.executemany(
+                    "INSERT INTO vendors(vendor_id, firm_name, firm_name_norm, data) VALUES (?, ?, ?, ?)",
+                    [(v["vendor_id"], v.get("firm_name"), normalize_firm_name(v.get("firm_name")), json.dumps(v)) for v in chunk],
+                )
+                saved += len(chunk)
+            self._set_meta("next_vendor_id", next_id)
+        return saved
+
+    @_writes("vendors")
+    def apply_vendor_changes(self, inserted, updated):
+        """Replace updated vendors under their vendor_id and add inserted ones, in one transaction."""
+        with self.batch():
+            for vendor in updated:
+                cursor = self.conn.execute(
+                    "UPDATE vendors SET firm_name = ?, firm_name_norm = ?, data = ? WHERE vendor_id = ?",
+                    (vendor.get("firm_name"), normalize_firm_name(vendor.get("firm_name")), json.dumps(vendor), vendor["vendor_id"]),
+                )
+                if not cursor.rowcount:
+                    raise KeyError(f"Unknown vendor_id: {vendor['vendor_id']}")
+            self.save_vendor_chunks([inserted])
+        return inserted
+
+    @_writes("vendors")
+    def clear_vendors(self):
+        with self.batch():
+            self.conn.execute("DELETE FROM vendors")
+            self.conn.execute("DELETE FROM meta WHERE key = 'next_vendor_id'")
+            self.clear_rate_cards()
+
+    # ---------------- rate cards ----------------
+
+    def load_rate_cards(self):
+        rows = self._query("SELECT vendor_id, level, effective_from, rate FROM rate_cards ORDER BY vendor_id, level, effective_from")
+        return [{"vendor_id": row[0], "level": row[1], "effective_from": row[2], "rate": row[3]} for row in rows]
+
+    @_writes("vendors")
+    def save_rate_cards(self, cards):
+        """Upsert rate card entries, keyed by (vendor_id, level, effective_from)."""
+        if not cards:
+            return
+        with self.batch():
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO rate_cards(vendor_id, level, effective_from, rate) VALUES (?, ?, ?, ?)",
+                [(c["vendor_id"], c["level"], c["effective_from"], c["rate"]) for c in cards],
+            )
+
+    @_writes("vendors")
+    def clear_rate_cards(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM rate_cards")
+
+    # ---------------- AP notifications ----------------
+
+    def next_notification_id(self):
+        return f"AP-{self.notification_count() + 1:04d}"
+
+    @_writes("notifications")
+    def append_notification(self, notification):
+        # A re-verified invoice's notification is updated in place, keeping its seq
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO notifications(notification_id, invoice_id, data) VALUES (?, ?, ?) "
+                "ON CONFLICT(notification_id) DO UPDATE SET invoice_id = excluded.invoice_id, data = excluded.data",
+                (notification["notification_id"], notification.get("invoice_id"), json.dumps(notification)),
+            )
+        return notification["notification_id"]
+
+    def iter_notifications(self):
+        for row in self._query("SELECT data FROM notifications ORDER BY seq"):
+            yield json.loads(row[0])
+
+    def load_notifications(self):
+        notifications = list(self.iter_notifications())
+        return {"notifications": notifications} if notifications else None
+
+    def notification_count(self):
+        return self._query("SELECT COUNT(*) FROM notifications")[0][0]
+
+    def find_notification(self, invoice_id):
+        rows = self._query("SELECT data FROM notifications WHERE invoice_id = ? ORDER BY seq DESC LIMIT 1", (invoice_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    @_writes("notifications")
+    def clear_notifications(self):
+        with self.batch():
+            self.conn.execute("DELETE FROM notifications")
+            # The duplicate index is invoice history and stays (see clear_invoice_index)
+            self.conn.execute("DELETE FROM verification_state")
+
+    # ---------------- incremental verification state ----------------
+
+    def load_verification_state(self):
+        rows = self._query("SELECT invoice_id, invoice_hash, rates_hash, notification_id FROM verification_state")
+        return {row[0]: {"invoice_hash": row[1], "rates_hash": row[2], "notification_id": row[3]} for row in rows}
+
+    @_writes("notifications")
+    def save_verification_state(self, entries):
+        """Upsert {record key: {"invoice_hash", "rates_hash", "notification_id"}} (see verification_state.py)."""
+        with self.batch():
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO verification_state(invoice_id, invoice_hash, rates_hash, notification_id) VALUES (?, ?, ?, ?)",
+                [(invoice_id, e["invoice_hash"], e["rates_hash"], e["notification_id"]) for invoice_id, e in entries.items()],
+            )
+
+    # ---------------- duplicate invoice index ----------------
+
+    def load_invoice_index(self):
+        """The duplicate index's columns (see duplicate_index.py), or None if empty."""
+        import numpy as np
+
+        rows = self._query("SELECT invoice_id, record, fingerprint, firm, signature FROM invoice_index ORDER BY seq")
+        if not rows:
+            return None
+        ids, records, fingerprints, firms, signatures = zip(*rows)
+        return {
+            "invoice_id": list(ids),
+            "record": list(records),
+            "fingerprint": np.array(fingerprints, dtype=np.int64),
+            "firm": np.array(firms, dtype=np.int64),
+            "signature": np.frombuffer(b"".join(signatures), dtype=np.uint16).reshape(len(rows), -1),
+        }
+
+    def append_invoice_index(self, columns):
+        """Add rows to the duplicate index."""
+        with self.batch():
+            self.conn.executemany(
+                "INSERT INTO invoice_index(invoice_id, record, fingerprint, firm, signature) VALUES (?, ?, ?, ?, ?)",
+                zip(columns["invoice_id"], columns["record"], columns["fingerprint"].tolist(), columns["firm"].tolist(),
+                    (signature.tobytes() for signature in columns["signature"])),
+            )
+
+    def clear_invoice_index(self):
+        """Forget every indexed invoice (a demo reset; a full re-verification keeps them)."""
+        with self._lock:
+            self.conn.execute("DELETE FROM invoice_index")
+
+    # ---------------- matter assignments ----------------
+
+    def load_assignments(self):
+        assignments = self.list_assignments()
+        return {"assignments": assignments} if assignments else None
+
+    def list_assignments(self):
+        return [json.loads(row[0]) for row in self._query("SELECT data FROM assignments ORDER BY seq")]
+
+    def assignment_count(self):
+        return self._query("SELECT COUNT(*) FROM assignments")[0][0]
+
+    def next_assignment_id(self):
+        return f"ASN-{self.assignment_count() + 1:04d}"
+
+    @_writes("assignments")
+    def add_assignment(self, assignment):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO assignments(assignment_id, matter_id, lawyer_id, data) VALUES (?, ?, ?, ?)",
+                (assignment["assignment_id"], assignment.get("matter_id"), assignment["assigned_to"]["lawyer_id"], json.dumps(assignment)),
+            )
+        return assignment["assignment_id"]
+
+    @_writes("assignments")
+    def replace_assignments(self, assignments):
+        with self.batch():
+            self.conn.execute("DELETE FROM assignments")
+            for a in assignments:
+                self.add_assignment(a)
+
+    def find_assignment(self, matter_id):
+        rows = self._query("SELECT data FROM assignments WHERE matter_id = ? ORDER BY seq LIMIT 1", (matter_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    @_writes("assignments")
+    def clear_assignments(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM assignments")
+
+    # ---------------- internal lawyers ----------------
+
+    def _seed_lawyers(self):
+        """Load internal_lawyers.json into an empty lawyers table."""
+        if self._query("SELECT COUNT(*) FROM lawyers")[0][0]:
+            return
+        seed = _read_json(self.lawyers_seed_path)
+        if seed:
+            self.save_lawyers(seed["lawyers"])
+
+    @staticmethod
+    def _lawyer(row):
+        lawyer = json.loads(row[0])
+        lawyer["current_caseload"] = row[1]
+        return lawyer
+
+    def load_lawyers(self):
+        lawyers = self.list_lawyers()
+        return {"lawyers": lawyers} if lawyers else None
+
+    def list_lawyers(self):
+        return [self._lawyer(r) for r in self._query("SELECT data, current_caseload FROM lawyers ORDER BY seq")]
+
+    def get_lawyer(self, lawyer_id):
+        rows = self._query("SELECT data, current_caseload FROM lawyers WHERE lawyer_id = ?", (lawyer_id,))
+        return self._lawyer(rows[0]) if rows else None
+
+    def _lawyers_version(self):
+        # Bumped by commits from other connections (our own writes keep the index in step)
+        return self._query("PRAGMA data_version")[0][0]
+
+    def _external_version(self, kind):
+        return self._query("PRAGMA data_version")[0][0]
+
+    @_writes("lawyers")
+    def increment_caseload(self, lawyer_id, delta=1):
+        with self._lock:
+            before = self._lawyers_version()
+            self.conn.execute("UPDATE lawyers SET current_caseload = current_caseload + ? WHERE lawyer_id = ?", (delta, lawyer_id))
+            self._lawyers_changed(before, lawyer_id, delta)
+        return self.get_lawyer(lawyer_id)
+
+    @_writes("lawyers")
+    def save_lawyers(self, lawyers):
+        with self.batch():
+            self.conn.execute("DELETE FROM lawyers")
+            for lawyer in lawyers:
+                self.conn.execute(
+                    "INSERT INTO lawyers(lawyer_id, current_caseload, data) VALUES (?, ?, ?)",
+                    (lawyer["lawyer_id"], lawyer.get("current_caseload", 0), json.dumps(lawyer)),
+                )
+        self._lawyers_changed(None)
+
+    @_writes("lawyers")
+    def reset_caseloads(self):
+        with self._lock:
+            self.conn.execute("UPDATE lawyers SET current_caseload = 0")
+        self._lawyers_changed(None)
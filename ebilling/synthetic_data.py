@@ -0,0 +1,251 @@
+"""
+E-Billing System - Synthetic Data Generator
+
+Writes a realistic, seeded data set for load testing all three agents:
+
+    law_firms.csv          vendor panel (Agent 1 input)
+    inbox/invoices.json    invoice inbox as a JSON array (Agent 2 input)
+    matters.csv            pending matters (Agent 3 input)
+    internal_lawyers.json  in-house lawyers with practice areas and caseloads
+
+The size is set by the number of invoice line items (1k to 10M); vendor,
+matter and lawyer counts scale with it. Invoices are written one at a
+time, so generating even the largest inbox runs in flat memory. The same
+seed always produces the same files.
+
+Most invoices bill exactly the contracted rates; a share overbills a
+timekeeper, comes from an inactive vendor, or names a firm that is not on
+the panel, so every verification path is exercised.
+
+RUN: python3 synthetic_data.py OUT_DIR [--line-items N] [--seed S]
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+from datetime import date, timedelta
+
+
+SCALES = {
+    "1k": 1_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+AVG_ITEMS_PER_INVOICE = 4
+
+SURNAMES = [
+    "Baker", "Sterling", "Chen", "Goldman", "Hart", "Fitzgerald", "Moore", "Lambert", "Price", "Nakamura",
+    "Okafor", "Reyes", "Schultz", "Whitman", "Delgado", "Ashford", "Brennan", "Castillo", "Dunmore", "Ellison",
+    "Fairbanks", "Gallagher", "Hargrove", "Iverson", "Jennings", "Kowalski", "Lindqvist", "Morrow", "Novak", "Oyelaran",
+    "Pemberton", "Quinlan", "Rutherford", "Sandoval", "Thornton", "Underwood", "Vasquez", "Winslow", "Yamamoto", "Zimmerman",
+    "Abernathy", "Blackwood", "Crane", "Davenport", "Eastwood", "Forsythe", "Grayson", "Holloway", "Ingram", "Jarvis",
+    "Kensington", "Langford", "Merriweather", "Northcott", "Osborne", "Prescott", "Radcliffe", "Sinclair", "Talbot", "Vance",
+    "Wexler", "Yardley", "Albright", "Bancroft", "Chamberlain", "Draper", "Everett", "Fulton", "Garrison", "Hawthorne",
+    "Kaplan", "Levine", "Mendoza", "Nguyen", "Patel", "Rosen", "Singh", "Tanaka", "Walsh", "Young",
+]
+FIRST_NAMES = [
+    "Sarah", "James", "Maria", "David", "Emily", "Michael", "Priya", "Daniel", "Aisha", "Wei",
+    "Rachel", "Tomas", "Olivia", "Noah", "Grace", "Lucas", "Hannah", "Omar", "Sofia", "Ethan",
+]
+FIRM_SUFFIXES = ["LLP", "& Partners", "Associates", "Law Group", "PC"]
+FIRM_PRACTICE_AREAS = ["litigation", "corporate", "ip", "employment", "regulatory", "real_estate"]
+PAYMENT_TERMS = ["net_30", "net_45", "net_60"]
+
+LEVELS = ("partner", "associate", "paralegal")
+LEVEL_WEIGHTS = (0.25, 0.45, 0.30)
+DESCRIPTIONS = {
+    "partner": ["Strategy call with client", "Review and revise brief", "Negotiate key terms", "Court appearance"],
+    "associate": ["Legal research; draft memo", "Draft discovery responses", "Prepare deposition outline", "Due diligence review"],
+    "paralegal": ["Document review and indexing", "Prepare exhibits", "Cite-check brief", "Organize production set"],
+}
+
+CASE_TYPES = ["litigation", "m&a", "patent_infringement", "employment", "regulatory", "contract_review", "real_estate", "ip_trademark"]
+PRIORITIES = (("high", 0.2), ("medium", 0.5), ("low", 0.3))
+
+START_DATE = date(2025, 1, 1)
+
+
+def scale_to_line_items(scale):
+    """Accept a preset name ("100k") or a plain number of line items."""
+    if str(scale).lower() in SCALES:
+        return SCALES[str(scale).lower()]
+    return int(scale)
+
+
+def plan(line_items):
+    """How many invoices, vendors, matters and lawyers go with a number of line items."""
+    invoices = max(1, line_items // AVG_ITEMS_PER_INVOICE)
+    vendors = min(100_000, max(10, invoices // 50))
+    matters = max(15, invoices // 100)
+    lawyers = max(8, matters // 25)
+    return {"line_items": line_items, "invoices": invoices, "vendors": vendors, "matters": matters, "lawyers": lawyers}
+
+
+def _firm_names(rng, count):
+    seen = set()
+    while len(seen) < count:
+        a, b = rng.sample(SURNAMES, 2)
+        name = f"{a} & {b} {rng.choice(FIRM_SUFFIXES)}"
+        if name in seen:
+            name = f"{a}, {b} & {rng.choice(SURNAMES)} {rng.choice(FIRM_SUFFIXES)}"
+        if name not in seen:
+            seen.add(name)
+            yield name
+
+
+def generate_vendors(rng, count):
+    vendors = []
+    for name in _firm_names(rng, count):
+        partner = rng.randrange(450, 951, 25)
+        vendors.append({
+            "firm_name": name,
+            "partner_rate": partner,
+            "associate_rate": rng.randrange(250, min(partner, 575), 25),
+            "paralegal_rate": rng.randrange(100, 251, 25),
+            "status": "inactive" if rng.random() < 0.05 else "active",
+            "payment_terms": rng.choice(PAYMENT_TERMS),
+            "practice_area": rng.choice(FIRM_PRACTICE_AREAS),
+            "contact_email": f"billing@{name.split()[0].lower().strip(',')}{len(vendors)}.com",
+        })
+    return vendors
+
+
+def generate_invoice(rng, number, vendors, matters, items):
+    vendor = rng.choice(vendors)
+    firm_name = vendor["firm_name"]
+    if rng.random() < 0.02:
+        firm_name = f"{rng.choice(SURNAMES)} Unlisted {rng.choice(FIRM_SUFFIXES)}"
+    overbill = rng.random() < 0.10
+
+    line_items = []
+    for i in range(items):
+        level = rng.choices(LEVELS, LEVEL_WEIGHTS)[0]
+        rate = vendor[f"{level}_rate"]
+        if overbill and i == 0:
+            rate += rng.choice((25, 50, 75, 100))
+        hours = round(rng.uniform(0.5, 12.0) * 2) / 2
+        line_items.append({
+            "timekeeper": f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}",
+            "level": level,
+            "description": rng.choice(DESCRIPTIONS[level]),
+            "hours": hours,
+            "rate": rate,
+            "amount": round(hours * rate, 2),
+        })
+
+    matter = matters[rng.randrange(len(matters))]
+    return {
+        "invoice_id": f"INV-2025-{number:07d}",
+        "firm_name": firm_name,
+        "invoice_date": (START_DATE + timedelta(days=rng.randrange(365))).isoformat(),
+        "matter": f"{matter['client']} - {matter['matter_name']}",
+        "matter_id": matter["matter_id"],
+        "line_items": line_items,
+        "total_hours": sum(item["hours"] for item in line_items),
+        "total_amount": round(sum(item["amount"] for item in line_items), 2),
+    }
+
+
+def generate_matters(rng, count, vendors):
+    priorities, weights = zip(*PRIORITIES)
+    matters = []
+    for n in range(1, count + 1):
+        case_type = rng.choice(CASE_TYPES)
+        matters.append({
+            "matter_id": f"MTR-2025-{n:06d}",
+            "matter_name": f"{rng.choice(SURNAMES)} {case_type.replace('_', ' ').title()} Matter",
+            "case_type": case_type,
+            "client": "Acme Corp",
+            "opposing_party": f"{rng.choice(SURNAMES)} Inc" if case_type in ("litigation", "patent_infringement", "employment") else "",
+            "date_opened": (START_DATE + timedelta(days=rng.randrange(365))).isoformat(),
+            "priority": rng.choices(priorities, weights)[0],
+            "estimated_value": rng.randrange(0, 25_000_001, 50_000),
+            "outside_counsel": rng.choice(vendors)["firm_name"] if rng.random() < 0.8 else "",
+        })
+    return matters
+
+
+def generate_lawyers(rng, count):
+    lawyers = []
+    for n in range(1, count + 1):
+        areas = rng.sample(CASE_TYPES, rng.choice((1, 2, 2, 3)))
+        max_caseload = rng.randint(5, 10)
+        lawyers.append({
+            "lawyer_id": f"LAW-{n:05d}",
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}",
+            "title": f"{areas[0].replace('_', ' ').title()} Counsel",
+            "practice_areas": areas,
+            "current_caseload": rng.randint(0, max_caseload // 2),
+            "max_caseload": max_caseload,
+            "email": f"lawyer{n}@acmecorp.com",
+            "status": "on_leave" if rng.random() < 0.05 else "active",
+        })
+    return lawyers
+
+
+def _write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def generate(out_dir, line_items=SCALES["1k"], seed=42):
+    """
+    Write a full synthetic data set to out_dir.
+
+    Args:
+        out_dir: Directory to write into (created if missing)
+        line_items: Approximate number of invoice line items
+        seed: Random seed
+
+    Returns:
+        Dict with the generated counts
+    """
+    rng = random.Random(seed)
+    counts = plan(line_items)
+    os.makedirs(os.path.join(out_dir, "inbox"), exist_ok=True)
+
+    vendors = generate_vendors(rng, counts["vendors"])
+    _write_csv(os.path.join(out_dir, "law_firms.csv"), vendors)
+
+    matters = generate_matters(rng, counts["matters"], vendors)
+    _write_csv(os.path.join(out_dir, "matters.csv"), matters)
+
+    with open(os.path.join(out_dir, "internal_lawyers.json"), 'w') as f:
+        json.dump({"lawyers": generate_lawyers(rng, counts["lawyers"])}, f, indent=2)
+
+    # Stream the inbox: one invoice in memory at a time
+    written = items_written = 0
+    with open(os.path.join(out_dir, "inbox", "invoices.json"), 'w') as f:
+        f.write("[\n")
+        while items_written < line_items:
+            items = min(rng.randint(1, 2 * AVG_ITEMS_PER_INVOICE - 1), line_items - items_written)
+            invoice = generate_invoice(rng, written + 1, vendors, matters, items)
+            f.write((",\n" if written else "") + json.dumps(invoice))
+            written += 1
+            items_written += items
+        f.write("\n]\n")
+
+    counts["invoices"] = written
+    counts["line_items"] = items_written
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic e-billing data.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--line-items", default="1k", help=f"number of line items or one of {', '.join(SCALES)}")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    counts = generate(args.out_dir, scale_to_line_items(args.line_items), args.seed)
+    print(json.dumps(counts, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import random
+from copy import deepcopy
+
+import pytest
+
+from assignment_solver import AREA_MAPPING, assign_matters, search_areas
+
+CASE_TYPES = list(AREA_MAPPING) + ["tax"]
+PRIORITIES = ["high", "medium", "low"]
+
+
+def scenario(seed, n_matters, n_lawyers):
+    rng = random.Random(seed)
+    lawyers = [{"lawyer_id": f"LAW-{n}", "name": f"Lawyer {n}", "status": rng.choice(["active"] * 4 + ["on_leave"]),
+                "practice_areas": rng.sample(CASE_TYPES, rng.randint(1, 3)),
+                "current_caseload": 0, "max_caseload": rng.randint(0, 4)} for n in range(n_lawyers)]
+    for lawyer in lawyers:
+        lawyer["current_caseload"] = rng.randint(0, lawyer["max_caseload"])
+    matters = [{"matter_id": f"MTR-{n}", "case_type": rng.choice(CASE_TYPES), "priority": rng.choice(PRIORITIES)}
+               for n in range(n_matters)]
+    return matters, lawyers
+
+
+def check_feasible(matters, before, after, decisions):
+    assert [d["matter"] for d in decisions] == matters
+    added = {}
+    for decision in decisions:
+        lawyer = decision["lawyer"]
+        if lawyer is None:
+            continue
+        assert lawyer["status"] == "active"
+        assert set(search_areas(decision["case_type"])) & {area.lower() for area in lawyer["practice_areas"]}
+        added[lawyer["lawyer_id"]] = added.get(lawyer["lawyer_id"], 0) + 1
+    for old, new in zip(before, after):
+        assert new["current_caseload"] == old["current_caseload"] + added.get(old["lawyer_id"], 0)
+        assert new["current_caseload"] <= new["max_caseload"]
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_flow_is_feasible_and_assigns_at_least_as_many_as_greedy(seed):
+    matters, lawyers = scenario(seed, n_matters=random.Random(seed).randint(1, 40), n_lawyers=8)
+    counts = {}
+    for method in ("flow", "greedy"):
+        staff = deepcopy(lawyers)
+        decisions = assign_matters(matters, staff, method)
+        check_feasible(matters, lawyers, staff, decisions)
+        counts[method] = sum(d["lawyer"] is not None for d in decisions)
+    assert counts["flow"] >= counts["greedy"]
+
+
+def test_flow_keeps_capacity_for_high_priority():
+    lawyers = [{"lawyer_id": "LAW-1", "name": "A", "status": "active", "practice_areas": ["litigation"],
+                "current_caseload": 0, "max_caseload": 1}]
+    matters = [{"matter_id": "MTR-1", "case_type": "litigation", "priority": "low"},
+               {"matter_id": "MTR-2", "case_type": "litigation", "priority": "high"}]
+    flow = assign_matters(matters, deepcopy(lawyers), "flow")
+    assert [d["lawyer"] and d["lawyer"]["lawyer_id"] for d in flow] == [None, "LAW-1"]
+    greedy = assign_matters(matters, deepcopy(lawyers), "greedy")
+    assert [d["lawyer"] and d["lawyer"]["lawyer_id"] for d in greedy] == ["LAW-1", None]
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        assign_matters([], [], "random")
@@ -0,0 +1,89 @@
+import json
+from copy import deepcopy
+
+import pytest
+
+from duplicate_index import DuplicateIndex
+from engine import run_invoice_verification
+from storage import BACKENDS, open_storage
+
+TASKS = ["Draft motion to dismiss", "Review discovery production", "Prepare deposition outline",
+         "Research statute of limitations", "Call with client regarding settlement", "Revise merger agreement",
+         "Attend case management conference", "Analyze expert report", "Draft interrogatory responses",
+         "Summarize deposition transcript"]
+
+
+def invoice(invoice_id, hours=1.5):
+    items = [{"timekeeper": f"Lawyer {n % 3}", "level": "associate", "hours": hours + n, "rate": 400,
+              "description": task} for n, task in enumerate(TASKS)]
+    return {"invoice_id": invoice_id, "firm_name": "Baker & Sterling LLP", "matter_id": "M-1", "line_items": items}
+
+
+def near_copy(original, invoice_id):
+    copy = deepcopy(original)
+    copy["invoice_id"] = invoice_id
+    copy["line_items"][0]["hours"] += 0.5
+    return copy
+
+
+def test_resubmission_with_same_id_is_exact_duplicate():
+    a = invoice("INV-1")
+    renumbered = dict(deepcopy(a), invoice_id="INV-9")
+    matches = DuplicateIndex().check([a, deepcopy(a), renumbered])
+    assert matches[0] is None
+    assert matches[1] == {"invoice_id": "INV-1", "match": "exact", "similarity": 1.0}
+    assert matches[2] == {"invoice_id": "INV-1", "match": "exact", "similarity": 1.0}
+
+
+def test_second_record_with_same_id_in_later_run():
+    a = invoice("INV-1")
+    first = DuplicateIndex()
+    assert first.check([a], ["INV-1"]) == [None]
+
+    later = DuplicateIndex(first.new_columns())
+    matches = later.check([deepcopy(a), deepcopy(a)], ["INV-1", "INV-1#2"])
+    assert matches == [None, {"invoice_id": "INV-1", "match": "exact", "similarity": 1.0}]
+    # The re-verified original is not indexed again
+    assert later.new_columns()["record"] == ["INV-1#2"]
+
+
+def test_reverified_original_is_not_duplicate_of_its_copy():
+    a = invoice("INV-1")
+    first = DuplicateIndex()
+    first.check([a, near_copy(a, "INV-2")], ["INV-1", "INV-2"])
+
+    later = DuplicateIndex(first.new_columns())
+    assert later.check([a], ["INV-1"]) == [None]
+    match = later.check([near_copy(a, "INV-2")], ["INV-2"])[0]
+    assert match["invoice_id"] == "INV-1" and match["match"] == "near"
+    assert len(later.new_columns()["record"]) == 0
+
+    # An edited original is indexed again under its record
+    edited = dict(deepcopy(a), matter_id="M-2")
+    assert later.check([edited], ["INV-1"]) == [None]
+    assert later.new_columns()["record"] == ["INV-1"]
+
+
+def test_different_invoices_do_not_match():
+    a = invoice("INV-1")
+    other = dict(invoice("INV-2", hours=7.0), firm_name="Goldman Hart LLP")
+    assert DuplicateIndex().check([a, other, invoice("INV-3", hours=9.0)])[1:] == [None, None]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_duplicate_still_caught_after_full_reverify(tmp_path, backend):
+    storage = open_storage(tmp_path, backend)
+    storage.save_vendors([{"firm_name": "Baker & Sterling LLP", "partner_rate": 650, "associate_rate": 400,
+                           "paralegal_rate": 175, "status": "active"}], fresh=True)
+    inbox = tmp_path / "inbox.json"
+    a = invoice("INV-1")
+    inbox.write_text(json.dumps([a]))
+    assert run_invoice_verification(storage, inbox)["duplicates"] == []
+    assert run_invoice_verification(storage, inbox, incremental=False)["duplicates"] == []
+
+    # The same bill resent under a new number after the full re-verify
+    inbox.write_text(json.dumps([dict(deepcopy(a), invoice_id="INV-9")]))
+    results = run_invoice_verification(storage, inbox, incremental=False)
+    assert [d["duplicate_of"] for d in results["duplicates"]] == ["INV-1"]
+    assert [r["invoice_id"] for r in results["rejected"]] == ["INV-9"]
+    storage.close()
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from inbox_reader import InboxFormatError, count_invoices, iter_invoices, iter_invoices_from
+
+INVOICES = [{"invoice_id": f"INV-{n}", "firm_name": "Chen Associates – Zürich", "total_amount": n * 12.5,
+             "line_items": [{"description": "Review [draft] {v2}, \"final\"", "hours": n}]} for n in range(1, 8)]
+
+
+@pytest.fixture(params=["array", "indented", "lines"])
+def inbox(request, tmp_path):
+    path = tmp_path / "inbox.json"
+    if request.param == "array":
+        text = json.dumps(INVOICES, ensure_ascii=False)
+    elif request.param == "indented":
+        text = json.dumps(INVOICES, indent=2)
+    else:
+        text = "\n".join(json.dumps(inv, ensure_ascii=False) for inv in INVOICES) + "\n"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+def test_streamed_invoices_match_json_load(inbox, chunk_size):
+    assert list(iter_invoices(inbox, chunk_size)) == INVOICES
+    assert count_invoices(inbox) == len(INVOICES)
+
+
+def test_bom_crlf_and_blank_lines(tmp_path):
+    path = tmp_path / "inbox.jsonl"
+    path.write_bytes("﻿".encode("utf-8") + b"\r\n".join(json.dumps(inv).encode() for inv in INVOICES) + b"\r\n\r\n")
+    assert list(iter_invoices(path)) == INVOICES
+
+
+def test_empty_inbox(tmp_path):
+    path = tmp_path / "inbox.json"
+    path.write_text("  \n")
+    assert list(iter_invoices(path)) == []
+    path.write_text("[]")
+    assert list(iter_invoices(path)) == []
+
+
+def test_not_an_inbox(tmp_path):
+    path = tmp_path / "inbox.json"
+    path.write_text('"invoices"')
+    with pytest.raises(InboxFormatError):
+        list(iter_invoices(path))
+
+
+@pytest.mark.parametrize("chunk_size", [5, 1 << 16])
+def test_resume_at_each_position_equals_fresh_read(inbox, chunk_size):
+    read = list(iter_invoices_from(inbox, 0, chunk_size))
+    assert [invoice for invoice, _ in read] == INVOICES
+    for n, (_, position) in enumerate(read):
+        assert [invoice for invoice, _ in iter_invoices_from(inbox, position, chunk_size)] == INVOICES[n + 1:]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 8])
+def test_leading_whitespace_longer_than_a_chunk(tmp_path, chunk_size):
+    path = tmp_path / "inbox.json"
+    path.write_text("﻿" + " \r\n" * 20 + json.dumps(INVOICES[:2]), encoding="utf-8")
+    assert list(iter_invoices(path, chunk_size)) == INVOICES[:2]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 1 << 16])
+def test_array_of_scalars_resumes(tmp_path, chunk_size):
+    items = [1, 22.5, -0.000125, 1e21, "x", True, None, 333]
+    path = tmp_path / "inbox.json"
+    path.write_text(json.dumps(items))
+    read = list(iter_invoices_from(path, 0, chunk_size))
+    assert [item for item, _ in read] == items
+    for n, (_, position) in enumerate(read):
+        assert [item for item, _ in iter_invoices_from(path, position, chunk_size)] == items[n + 1:]
+
+
+@pytest.mark.parametrize("text", ["[1, 2", "[1 2]", "[1,,2]"])
+def test_malformed_array(tmp_path, text):
+    path = tmp_path / "inbox.json"
+    path.write_text(text)
+    with pytest.raises(InboxFormatError):
+        list(iter_invoices(path, 2))
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from notification_store import NotificationStore, load_notifications
+
+
+def notification(n, status="APPROVED"):
+    return {"notification_id": f"AP-{n:04d}", "invoice_id": f"INV-{n}", "status": status}
+
+
+def ids(store):
+    return [(n["notification_id"], n["status"]) for n in store.iter_notifications()]
+
+
+def test_survives_reopen_with_rollover_and_supersede(tmp_path):
+    with NotificationStore(tmp_path, sync_every=3, segment_max_bytes=200) as store:
+        store.extend(notification(n) for n in range(1, 11))
+        store.append(notification(2, "REJECTED"))
+        expected = ids(store)
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".jsonl")]) > 1
+    assert expected[1] == ("AP-0002", "REJECTED")
+    assert len(expected) == 10
+
+    with NotificationStore(tmp_path) as store:
+        assert ids(store) == expected
+        assert store.get("AP-0002")["status"] == "REJECTED"
+        assert store.next_notification_id() == "AP-0011"
+    assert load_notifications(tmp_path)["notifications"][1]["status"] == "REJECTED"
+
+
+def test_compaction_keeps_live_records_in_order(tmp_path):
+    with NotificationStore(tmp_path, segment_max_bytes=200) as store:
+        store.extend(notification(n) for n in range(1, 11))
+        store.append(notification(5, "FLAGGED"))
+        before = ids(store)
+        segments = len([name for name in os.listdir(tmp_path) if name.endswith(".jsonl")])
+        assert store.compact() == (10, segments)
+        assert ids(store) == before
+        store.append(notification(11))
+    with NotificationStore(tmp_path) as store:
+        assert ids(store) == before + [("AP-0011", "APPROVED")]
+
+
+def test_torn_tail(tmp_path):
+    with NotificationStore(tmp_path) as store:
+        store.extend(notification(n) for n in range(1, 4))
+    segment = tmp_path / "segment-000001.jsonl"
+    with open(segment, "ab") as f:
+        f.write(b'{"notification_id": "AP-0004", "inv')
+    size = segment.stat().st_size
+
+    # Readers ignore the torn record and change nothing
+    with NotificationStore(tmp_path, read_only=True) as store:
+        assert len(store) == 3
+        with pytest.raises(ValueError):
+            store.append(notification(4))
+    assert segment.stat().st_size == size
+
+    # A writer cuts it off and appends after the last whole record
+    with NotificationStore(tmp_path) as store:
+        store.append(notification(4))
+    with NotificationStore(tmp_path, read_only=True) as store:
+        assert [n for n, _ in ids(store)] == ["AP-0001", "AP-0002", "AP-0003", "AP-0004"]
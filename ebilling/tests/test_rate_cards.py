@@ -0,0 +1,68 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from rate_cards import EARLIEST, LEVELS, RateCardIndex, parse_card, parse_day, rate_change_cards
+
+VENDORS = ["VND-1001", "VND-1002", "VND-1003"]
+START = date(2024, 1, 1)
+
+
+def random_cards(rng):
+    cards = {}
+    for _ in range(rng.randint(0, 40)):
+        vendor_id, level = rng.choice(VENDORS[:2]), rng.choice(LEVELS)
+        day = (START + timedelta(days=rng.randint(0, 700))).isoformat()
+        cards[(vendor_id, level, day)] = {"vendor_id": vendor_id, "level": level, "effective_from": day,
+                                          "rate": float(rng.randint(100, 900))}
+    return list(cards.values())
+
+
+def scan(cards, vendor_id, level, day, fallback):
+    """The rate in force by a linear scan of the entries."""
+    in_force = [c for c in cards if c["vendor_id"] == vendor_id and c["level"] == level
+                and 0 <= parse_day(c["effective_from"]) <= day]
+    return max(in_force, key=lambda c: c["effective_from"])["rate"] if in_force and day >= 0 else fallback
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_rates_on_matches_linear_scan(seed):
+    rng = random.Random(seed)
+    cards = random_cards(rng)
+    index = RateCardIndex(rng.sample(cards, len(cards)))
+    vendor_ids = [rng.choice(VENDORS) for _ in range(50)]
+    days = [rng.choice([-1, (START + timedelta(days=rng.randint(-30, 760))).toordinal()]) for _ in vendor_ids]
+    fallback = np.array([[1.0, 2.0, 3.0]] * len(vendor_ids))
+
+    rates = index.rates_on(vendor_ids, days, fallback)
+    for q, (vendor_id, day) in enumerate(zip(vendor_ids, days)):
+        for l, level in enumerate(LEVELS):
+            expected = scan(cards, vendor_id, level, day, fallback[q, l])
+            assert rates[q, l] == expected
+            when = date.fromordinal(day).isoformat() if day >= 0 else ""
+            single = index.rate_on(vendor_id, level, when)
+            assert (fallback[q, l] if single is None else single) == expected
+
+
+def test_rate_change_cards_keep_the_old_rate_for_earlier_invoices():
+    before = {"vendor_id": "VND-1001", "partner_rate": 600, "associate_rate": 400, "paralegal_rate": 150}
+    after = dict(before, partner_rate=650)
+    cards = rate_change_cards(before, after, "2025-03-01", RateCardIndex())
+    assert cards == [{"vendor_id": "VND-1001", "level": "partner", "effective_from": EARLIEST, "rate": 600.0},
+                     {"vendor_id": "VND-1001", "level": "partner", "effective_from": "2025-03-01", "rate": 650.0}]
+    index = RateCardIndex(cards)
+    assert index.rate_on("VND-1001", "partner", "2025-02-28") == 600.0
+    assert index.rate_on("VND-1001", "partner", "2025-03-01") == 650.0
+    assert index.rate_on("VND-1001", "associate", "2025-03-01") is None
+    # Once the level has entries, only the new rate is added
+    assert len(rate_change_cards(after, dict(after, partner_rate=700), "2025-06-01", index)) == 1
+
+
+@pytest.mark.parametrize("row", [{"level": "intern", "effective_from": "2025-01-01", "rate": 1},
+                                 {"level": "partner", "effective_from": "01/01/2025", "rate": 1},
+                                 {"level": "partner", "effective_from": "2025-01-01", "rate": -5}])
+def test_parse_card_rejects_bad_rows(row):
+    with pytest.raises(ValueError):
+        parse_card(dict(row, vendor_id="VND-1001"))
@@ -0,0 +1,99 @@
+import pytest
+
+from storage import BACKENDS, open_storage
+
+FIRMS = ["Baker & Sterling LLP", "Chen Associates", "Sterling Partners", "Baker & Sterling"]
+
+
+def vendor(firm_name, status="active"):
+    return {"firm_name": firm_name, "partner_rate": 600, "associate_rate": 400, "paralegal_rate": 150, "status": status}
+
+
+@pytest.fixture(params=BACKENDS)
+def storage(request, tmp_path):
+    storage = open_storage(tmp_path, request.param)
+    yield storage
+    storage.close()
+
+
+@pytest.mark.parametrize("query", ["baker & sterling llp", "Sterling", "CHEN", "Baker & Sterling", "Nobody", ""])
+def test_find_vendor_is_first_substring_match(storage, query):
+    storage.save_vendors([vendor(name) for name in FIRMS], fresh=True)
+    expected = next((name for name in FIRMS if query.lower() in name.lower()), None)
+    found = storage.find_vendor(query)
+    assert (found and found["firm_name"]) == expected
+
+
+def test_find_vendor_sees_later_writes(storage, tmp_path):
+    storage.save_vendors([vendor("Chen Associates")], fresh=True)
+    assert storage.find_vendor("Goldman") is None
+    storage.save_vendors([vendor("Goldman Hart LLP")])
+    assert storage.find_vendor("Goldman")["vendor_id"] == "VND-1002"
+
+    # ... including writes through another connection (or process)
+    other = open_storage(tmp_path, storage.name)
+    other.apply_vendor_changes([], [dict(storage.find_vendor("Goldman"), status="inactive")])
+    other.close()
+    assert storage.find_vendor("Goldman")["status"] == "inactive"
+
+
+def exercise(storage):
+    """The same calls against a backend; returns everything it reads back."""
+    storage.save_vendors([vendor(name) for name in FIRMS], fresh=True)
+    goldman = vendor("Goldman Hart LLP")
+    storage.apply_vendor_changes([goldman], [dict(storage.find_vendor("Chen"), status="inactive")])
+    storage.save_rate_cards([{"vendor_id": "VND-1002", "level": "partner", "effective_from": "2025-01-01", "rate": 560.0},
+                             {"vendor_id": "VND-1001", "level": "partner", "effective_from": "2025-01-01", "rate": 660.0}])
+    storage.save_rate_cards([{"vendor_id": "VND-1002", "level": "partner", "effective_from": "2025-01-01", "rate": 575.0}])
+
+    for n in range(1, 4):
+        storage.append_notification({"notification_id": storage.next_notification_id(), "invoice_id": f"INV-{n}",
+                                     "status": "APPROVED"})
+    storage.append_notification({"notification_id": "AP-0001", "invoice_id": "INV-1", "status": "FLAGGED"})
+    storage.save_verification_state({"INV-1": {"invoice_hash": "a", "rates_hash": "b", "notification_id": "AP-0001"}})
+    storage.save_verification_state({"INV-1#2": {"invoice_hash": "c", "rates_hash": "b", "notification_id": "AP-0004"}})
+
+    storage.save_lawyers([{"lawyer_id": "LAW-1", "name": "A", "current_caseload": 0, "max_caseload": 3},
+                          {"lawyer_id": "LAW-2", "name": "B", "current_caseload": 1, "max_caseload": 3}])
+    storage.increment_caseload("LAW-2", 2)
+    storage.add_assignment({"assignment_id": storage.next_assignment_id(), "matter_id": "MTR-1",
+                            "assigned_to": {"lawyer_id": "LAW-2", "name": "B"}})
+
+    return {
+        "vendors": storage.list_vendors(),
+        "vendor_count": storage.vendor_count(),
+        "rate_cards": storage.load_rate_cards(),
+        "notifications": list(storage.iter_notifications()),
+        "notification_count": storage.notification_count(),
+        "latest": storage.find_notification("INV-1"),
+        "state": storage.load_verification_state(),
+        "lawyers": storage.list_lawyers(),
+        "assignment": storage.find_assignment("MTR-1"),
+        "assignments": storage.list_assignments(),
+    }
+
+
+def test_backends_agree(tmp_path):
+    results = {}
+    for backend in BACKENDS:
+        (tmp_path / backend).mkdir()
+        storage = open_storage(tmp_path / backend, backend)
+        results[backend] = exercise(storage)
+        storage.close()
+    json_result, sqlite_result = results["json"], results["sqlite"]
+    assert json_result == sqlite_result
+    assert [n["status"] for n in json_result["notifications"]] == ["FLAGGED", "APPROVED", "APPROVED"]
+    assert json_result["rate_cards"][0]["rate"] == 660.0 and json_result["rate_cards"][1]["rate"] == 575.0
+
+
+def test_clear_keeps_duplicate_index(storage):
+    np = pytest.importorskip("numpy")
+    storage.append_notification({"notification_id": "AP-0001", "invoice_id": "INV-1", "status": "APPROVED"})
+    storage.save_verification_state({"INV-1": {"invoice_hash": "a", "rates_hash": "b", "notification_id": "AP-0001"}})
+    storage.append_invoice_index({"invoice_id": ["INV-1"], "record": ["INV-1"], "fingerprint": np.array([7], np.int64),
+                                  "firm": np.array([3], np.int64), "signature": np.ones((1, 32), np.uint16)})
+    storage.clear_notifications()
+    assert storage.notification_count() == 0 and storage.load_verification_state() == {}
+    assert storage.load_invoice_index()["record"] == ["INV-1"]
+    storage.clear_invoice_index()
+    assert storage.load_invoice_index() is None
@@ -0,0 +1,50 @@
+import csv
+import os
+
+import pytest
+
+from tool_output import decode_cursor, decode_file_cursor, encode_cursor, iter_csv_from, page_info
+
+ROWS = [{"firm_name": "Baker & Sterling LLP", "notes": "billing\nsecond line"},
+        {"firm_name": "Chen Associates", "notes": "Zürich, \"quoted\""},
+        {"firm_name": "Donovan Legal Group", "notes": ""}]
+
+
+@pytest.mark.parametrize("bom,newline", [("", "\n"), ("﻿", "\r\n")])
+def test_csv_resume_at_each_position_equals_fresh_read(tmp_path, bom, newline):
+    path = tmp_path / "vendors.csv"
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(bom)
+        writer = csv.DictWriter(f, ["firm_name", "notes"], lineterminator=newline)
+        writer.writeheader()
+        writer.writerows(ROWS)
+    read = list(iter_csv_from(path))
+    assert [row for row, _ in read] == ROWS
+    for n, (_, position) in enumerate(read):
+        assert [row for row, _ in iter_csv_from(path, position)] == ROWS[n + 1:]
+
+
+def test_file_cursor_round_trip_and_staleness(tmp_path):
+    path = tmp_path / "inbox.json"
+    path.write_text("[]")
+    info = page_info("read_invoices_from_inbox", 0, 25, True, str(path), 1234)
+    assert decode_file_cursor(info["next_cursor"], "read_invoices_from_inbox", str(path)) == (25, 1234)
+    assert decode_file_cursor("", "read_invoices_from_inbox", str(path)) == (0, 0)
+    assert page_info("read_invoices_from_inbox", 0, 3, False, str(path), 99)["next_cursor"] is None
+
+    with pytest.raises(ValueError, match="issued for"):
+        decode_file_cursor(info["next_cursor"], "read_vendor_csv", str(path))
+    # A cursor without a byte position cannot resume a file read
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_file_cursor(encode_cursor("read_invoices_from_inbox", 25, str(path)), "read_invoices_from_inbox", str(path))
+
+    path.write_text("[{}]")
+    os.utime(path, ns=(1, 1))
+    with pytest.raises(ValueError, match="changed"):
+        decode_file_cursor(info["next_cursor"], "read_invoices_from_inbox", str(path))
+
+
+def test_plain_cursor():
+    assert decode_cursor(encode_cursor("get_internal_lawyers", 50), "get_internal_lawyers") == 50
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor", "get_internal_lawyers")
@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+import vendor_index
+from vendor_index import VendorIndex
+
+WORDS = ["baker", "sterling", "chen", "associates", "llp", "group", "&", "legal", "hart", "pc"]
+
+
+def scan(vendors, firm_name):
+    """The original linear scan: first vendor whose name contains the query."""
+    query = (firm_name or "").lower()
+    return next((v for v in vendors if query in (v.get("firm_name") or "").lower()), None)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_lookup_matches_linear_scan(seed):
+    rng = random.Random(seed)
+    vendors = [{"vendor_id": f"VND-{n}", "firm_name": " ".join(rng.sample(WORDS, rng.randint(1, 3))).title()}
+               for n in range(60)]
+    index = VendorIndex(vendors)
+    queries = [v["firm_name"] for v in vendors] + ["", "ba", "LLP", "nobody at all"]
+    queries += [" ".join(rng.sample(WORDS, rng.randint(1, 2))) for _ in range(50)]
+    for query in queries * 2:
+        assert index.lookup(query) is scan(vendors, query)
+
+
+def test_memo_is_bounded(monkeypatch):
+    monkeypatch.setattr(vendor_index, "MEMO_SIZE", 8)
+    vendors = [{"vendor_id": "VND-1", "firm_name": "Baker & Sterling LLP"}]
+    index = VendorIndex(vendors)
+    for n in range(100):
+        index.lookup(f"Firm {n}")
+    assert index.lookup("sterling") is vendors[0]
+    assert index._memo.cache_info().currsize == 8
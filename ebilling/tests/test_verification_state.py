@@ -0,0 +1,95 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from data_cache import content_hash
+from verification_state import IncrementalRun
+
+VENDOR = {"vendor_id": "VND-001", "firm_name": "Baker & Sterling LLP", "status": "active",
+          "partner_rate": 650, "associate_rate": 400, "paralegal_rate": 150}
+
+
+def invoice(invoice_id, hours=1.0):
+    return {"invoice_id": invoice_id, "firm_name": VENDOR["firm_name"],
+            "line_items": [{"timekeeper": "A. Baker", "level": "partner", "hours": hours, "rate": 650}]}
+
+
+def notify(run, invoices, numbers):
+    for inv in run.changed(invoices):
+        run.record(inv["invoice_id"], run.previous_notification_id(inv["invoice_id"]) or next(numbers))
+
+
+def test_duplicate_invoice_ids_are_separate_records():
+    inbox = [invoice("INV-1"), invoice("INV-1", hours=2.0), invoice("INV-2")]
+    run = IncrementalRun({}, lambda firm: VENDOR)
+    keys = deque()
+    assert list(run.changed(inbox, keys)) == inbox
+    assert list(keys) == ["INV-1", "INV-1#2", "INV-2"]
+    assert run.pending == 3
+
+    for number, inv in zip(["AP-0001", "AP-0002", "AP-0003"], inbox):
+        assert run.previous_notification_id(inv["invoice_id"]) is None
+        run.record(inv["invoice_id"], number)
+    assert run.pending == 0
+    assert run.verified["INV-1"]["invoice_hash"] == content_hash(inbox[0])
+    assert run.verified["INV-1"]["notification_id"] == "AP-0001"
+    assert run.verified["INV-1#2"]["invoice_hash"] == content_hash(inbox[1])
+    assert run.verified["INV-1#2"]["notification_id"] == "AP-0002"
+
+    # Unchanged: nothing to verify
+    again = IncrementalRun(run.verified, lambda firm: VENDOR)
+    assert list(again.changed(inbox)) == []
+    assert again.unchanged == ["INV-1", "INV-1", "INV-2"]
+
+    # Only the edited second record is re-verified, under its own notification
+    edited = inbox[:1] + [invoice("INV-1", hours=3.0)] + inbox[2:]
+    again = IncrementalRun(run.verified, lambda firm: VENDOR)
+    assert list(again.changed(edited)) == [edited[1]]
+    assert again.previous_notification_id("INV-1") == "AP-0002"
+    again.record("INV-1", "AP-0002")
+    assert list(again.verified) == ["INV-1#2"]
+
+
+def test_new_copy_of_notified_invoice_gets_new_notification():
+    state = {}
+    numbers = iter(f"AP-{n:04d}" for n in range(1, 10))
+    run = IncrementalRun(state, lambda firm: VENDOR)
+    notify(run, [invoice("INV-1")], numbers)
+    state.update(run.verified)
+
+    run = IncrementalRun(state, lambda firm: VENDOR)
+    notify(run, [invoice("INV-1"), invoice("INV-1")], numbers)
+    assert run.unchanged == ["INV-1"]
+    assert run.verified == {"INV-1#2": dict(state["INV-1"], notification_id="AP-0002")}
+
+
+def test_concurrent_notifications_keep_records_apart(tmp_path, monkeypatch):
+    # Shard crews notify on threads that share one run (see crew_orchestrator.py)
+    pytest.importorskip("crewai")
+    # Importing the agent opens its storage and LLM cache in the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("EBILLING_LLM_CACHE", "off")
+    import agent_2_invoice_verification as agent_2
+    from storage import open_storage
+
+    storage = open_storage(tmp_path)
+    monkeypatch.setattr(agent_2, "storage", storage)
+    numbers = iter(f"AP-{n:04d}" for n in range(1, 100))
+    first = IncrementalRun({}, lambda firm: VENDOR)
+    inbox = [invoice("INV-1", hours=h) for h in range(1, 41)]
+    notify(first, inbox, numbers)
+
+    # Every record changed, so each must get back its own previous notification
+    changed = [invoice("INV-1", hours=h + 0.5) for h in range(1, 41)]
+    run = IncrementalRun(first.verified, lambda firm: VENDOR)
+    monkeypatch.setattr(agent_2, "incremental_run", run)
+    results = [{"invoice_id": inv["invoice_id"], "status": "APPROVED", "invoice_amount": 1.0}
+               for inv in run.changed(changed)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        sent = list(pool.map(agent_2.notify_ap, results))
+
+    assert sorted(s["notification_id"] for s in sent) == sorted(e["notification_id"] for e in first.verified.values())
+    assert run.pending == 0
+    assert {e["notification_id"] for e in run.verified.values()} == {s["notification_id"] for s in sent}
+    storage.close()
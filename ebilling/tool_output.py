@@ -0,0 +1,188 @@
+"""
+E-Billing System - Compact Tool Output
+
+Everything a tool returns goes into the agent's context, so its size is
+paid for in tokens and latency on every turn. This module encodes tool
+output compactly:
+
+- minified JSON (no indentation or spaces after separators)
+- lists of records that share the same keys become a table,
+  {"columns": [...], "rows": [[...], ...]}, so keys are sent once per list
+  instead of once per record (nested lists such as line_items too)
+- large reads are paged: a tool returns one page plus an opaque
+  next_cursor, and the agent passes it back for the next page. A cursor
+  remembers the version of the file it was issued for, so paging through
+  a file that changed underneath fails loudly instead of skipping rows,
+  and the byte position the page ended at, so the next page seeks there
+  instead of re-reading the file from the start.
+
+Tools that take records as input accept either form (records() expands
+tables back into lists of dicts), so a page can be handed straight from
+a read tool to a batch tool.
+
+EBILLING_TOOL_OUTPUT=pretty restores the old indented, record-per-object
+output (handy when reading tool traces by eye).
+"""
+
+import base64
+import csv
+import json
+import os
+
+from data_cache import file_version
+
+
+def pretty():
+    return os.environ.get("EBILLING_TOOL_OUTPUT", "compact").lower() == "pretty"
+
+
+def dump(value):
+    """Serialize a tool result: minified and tabular, or indented in pretty mode."""
+    if pretty():
+        return json.dumps(value, indent=2)
+    return json.dumps(tabular(value), separators=(",", ":"))
+
+
+# ============================================================
+# TABLES (lists of homogeneous records)
+# ============================================================
+
+def tabular(value):
+    """Recursively turn lists of same-keyed dicts into column/row tables."""
+    if isinstance(value, dict):
+        return {k: tabular(v) for k, v in value.items()}
+    if isinstance(value, list):
+        items = [tabular(v) for v in value]
+        if len(items) > 1 and all(isinstance(v, dict) for v in items):
+            columns = list(items[0])
+            if all(list(v) == columns for v in items[1:]):
+                return {"columns": columns, "rows": [[v[c] for c in columns] for v in items]}
+        return items
+    return value
+
+
+def _is_table(value):
+    return isinstance(value, dict) and set(value) == {"columns", "rows"}
+
+
+def records(value):
+    """Inverse of tabular(): expand every table back into a list of dicts."""
+    if _is_table(value):
+        return [dict(zip(value["columns"], map(records, row))) for row in value["rows"]]
+    if isinstance(value, dict):
+        return {k: records(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [records(v) for v in value]
+    return value
+
+
+# ============================================================
+# CURSORS
+# ============================================================
+
+def _version(path):
+    # A list, so it compares equal after a JSON round trip
+    return list(file_version(path) or ())
+
+
+def encode_cursor(source, offset, path=None, position=None):
+    """
+    Opaque token for the page starting at offset of source (and path's
+    current version, and the byte position in it the page starts at).
+    """
+    data = {"s": source, "o": offset}
+    if path is not None:
+        data["v"] = _version(path)
+    if position is not None:
+        data["p"] = position
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode(cursor, source, path, field):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        value = int(data[field])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor - start again without one")
+    if data.get("s") != source:
+        raise ValueError(f"Cursor was issued for {data.get('s')}, not {source}")
+    if path is not None and data.get("v") != _version(path):
+        raise ValueError("The data changed since this cursor was issued - start again without one")
+    return int(data["o"]), value
+
+
+def decode_cursor(cursor, source, path=None):
+    """
+    Offset a cursor points at (0 for an empty cursor).
+
+    Raises:
+        ValueError: malformed cursor, a cursor for another source, or the
+                    file changed since the cursor was issued
+    """
+    if not cursor:
+        return 0
+    return _decode(cursor, source, path, "o")[0]
+
+
+def decode_file_cursor(cursor, source, path):
+    """
+    (offset, byte position) a cursor for a page of a file points at
+    ((0, 0) for an empty cursor).
+
+    Raises:
+        ValueError: as decode_cursor, or a cursor without a position
+    """
+    if not cursor:
+        return 0, 0
+    return _decode(cursor, source, path, "p")
+
+
+def page_info(source, offset, count, has_more, path=None, position=None):
+    """
+    The paging fields every paged read tool returns.
+
+    position: byte position in path the next page starts at, for file reads
+    """
+    return {
+        "count": count,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(source, offset + count, path, position) if has_more else None
+    }
+
+
+# ============================================================
+# PAGED FILE READS
+# ============================================================
+
+def iter_csv_from(path, position=0):
+    """
+    Iterate over a CSV file's rows (as csv.DictReader does) from a byte position.
+
+    Args:
+        position: 0 for the first row, or a position yielded by an earlier
+                  call (to resume after that row)
+
+    Yields:
+        (row dict, position) - position is just after the row
+    """
+    with open(path, 'rb') as f:
+        read = [0]
+
+        def lines():
+            # csv reads a line at a time and only as far as the row it returns
+            for line in f:
+                read[0] += len(line)
+                yield line.decode("utf-8")
+
+        header = next(csv.reader(lines()), None)
+        if header is None:
+            return
+        if header:
+            header[0] = header[0].lstrip("\ufeff")
+        if position:
+            f.seek(position)
+            read[0] = position
+        for row in csv.DictReader(lines(), fieldnames=header):
+            yield row, read[0]
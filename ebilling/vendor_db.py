@@ -0,0 +1,140 @@
+"""
+E-Billing System - Vendor Database
+
+Shared read/write helpers for vendor_database.json.
+
+Vendors are persisted in batches: the database is read once, every vendor
+in the batch gets the next VND-<id>, and the result is written back with a
+single atomic replace. Saving N vendors costs one write instead of N.
+
+save_vendor_chunks() streams: new vendors arrive as an iterable of chunks
+and each chunk is written out as soon as it has its IDs, so only one chunk
+(plus any vendors already in the database) is held in memory.
+"""
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+FIRST_VENDOR_ID = 1001
+
+
+def empty_vendor_db():
+    return {"vendors": [], "next_id": FIRST_VENDOR_ID}
+
+
+def load_vendor_db(db_path):
+    """Load the vendor database, or an empty one if it doesn't exist yet."""
+    if not os.path.exists(db_path):
+        return empty_vendor_db()
+    with open(db_path, 'r') as f:
+        return json.load(f)
+
+
+@contextmanager
+def _atomic_write(db_path):
+    # Temp file + rename, so a crash never leaves the database half-written
+    directory = os.path.dirname(os.path.abspath(db_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".vendor_db-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            yield f
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_vendor_db(db_path, db):
+    """Write the database atomically so a crash never leaves it half-written."""
+    with _atomic_write(db_path) as f:
+        json.dump(db, f, indent=2)
+
+
+def assign_vendor_ids(db, vendors):
+    """Give each vendor the next VND-<id> from db, in order, and add it to db."""
+    for vendor in vendors:
+        vendor["vendor_id"] = f"VND-{db['next_id']}"
+        db["next_id"] += 1
+        db["vendors"].append(vendor)
+    return vendors
+
+
+def save_vendors_batch(vendors, db_path, fresh=False):
+    """
+    Persist a list of already-validated vendors in one write.
+
+    Args:
+        vendors: Vendor dicts to save (vendor_id is assigned in place)
+        db_path: Path to vendor_database.json
+        fresh: Start from an empty database instead of appending
+
+    Returns:
+        The saved vendors, each with its vendor_id
+    """
+    save_vendor_chunks([vendors], db_path, fresh=fresh)
+    return vendors
+
+
+def apply_vendor_changes(db_path, inserted, updated):
+    """
+    Apply a change set in one write: replace updated vendors in place (by
+    vendor_id) and append inserted ones with the next VND-<id>s.
+
+    Returns:
+        The inserted vendors, each with its vendor_id
+    """
+    db = load_vendor_db(db_path)
+    replacements = {vendor["vendor_id"]: vendor for vendor in updated}
+    db["vendors"] = [replacements.pop(vendor.get("vendor_id"), vendor) for vendor in db["vendors"]]
+    if replacements:
+        raise KeyError(f"Unknown vendor_id(s): {sorted(replacements)}")
+    assign_vendor_ids(db, inserted)
+    write_vendor_db(db_path, db)
+    return inserted
+
+
+def save_vendor_chunks(chunks, db_path, fresh=False):
+    """
+    Persist already-validated vendors chunk by chunk in one atomic write.
+
+    Each chunk gets its VND-<id>s (in place) and is written to the new file
+    before the next chunk is requested, so chunks can come from a generator
+    that reads the source lazily. The output is the same as write_vendor_db's.
+
+    Args:
+        chunks: Iterable of lists of vendor dicts
+        db_path: Path to vendor_database.json
+        fresh: Start from an empty database instead of appending
+
+    Returns:
+        Number of vendors saved
+    """
+    db = empty_vendor_db() if fresh else load_vendor_db(db_path)
+    next_id = db["next_id"]
+    saved = 0
+    with _atomic_write(db_path) as f:
+        f.write('{\n  "vendors": [')
+        written = _write_vendors(f, db["vendors"], 0)
+        del db["vendors"]
+        for chunk in chunks:
+            for vendor in chunk:
+                vendor["vendor_id"] = f"VND-{next_id}"
+                next_id += 1
+            written = _write_vendors(f, chunk, written)
+            saved += len(chunk)
+        f.write("\n  ]" if written else "]")
+        f.write(f',\n  "next_id": {next_id}\n}}')
+    return saved
+
+
+def _write_vendors(f, vendors, written):
+    # Laid out exactly as json.dump(db, indent=2) lays out list items; JSON
+    # strings escape newlines, so indenting every line is safe
+    if vendors:
+        items = ("    " + json.dumps(vendor, indent=2).replace("\n", "\n    ") for vendor in vendors)
+        f.write(("," if written else "") + "\n" + ",\n".join(items))
+    return written + len(vendors)
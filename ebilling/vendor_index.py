@@ -0,0 +1,122 @@
+"""
+E-Billing System - Vendor Index
+
+Indexed firm-name lookup shared by Agent 2 and the Streamlit app.
+
+Invoice verification matches an invoice's firm_name against the vendor
+database with a case-insensitive partial match and takes the FIRST vendor
+that contains the name. Scanning every vendor for every invoice costs
+O(invoices x vendors); this index answers the same question with a hash
+lookup plus a trigram candidate search, and memoizes repeat firm names.
+"""
+
+import json
+import os
+from functools import lru_cache
+
+
+# ============================================================
+# INDEX
+# ============================================================
+
+NGRAM_SIZE = 3
+
+# Distinct firm names remembered per index; a long-running process may see
+# any number of them, so the least recently used are dropped
+MEMO_SIZE = 4096
+
+
+def normalize_firm_name(name):
+    """Normalize a firm name the same way the original scan did."""
+    return (name or "").lower()
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class VendorIndex:
+    """
+    Firm-name index over a list of vendor records.
+
+    lookup() returns exactly what the old linear scan returned:
+    the first vendor (in database order) whose lower-cased firm_name
+    contains the lower-cased query, or None.
+    """
+
+    def __init__(self, vendors):
+        self.vendors = list(vendors)
+        self._names = [normalize_firm_name(v.get("firm_name")) for v in self.vendors]
+        self._exact = {}
+        self._grams = {}
+        for pos, name in enumerate(self._names):
+            self._exact.setdefault(name, pos)
+            for gram in _ngrams(name):
+                self._grams.setdefault(gram, []).append(pos)
+        self._memo = lru_cache(maxsize=MEMO_SIZE)(self._vendor)
+
+    def __len__(self):
+        return len(self.vendors)
+
+    def lookup(self, firm_name):
+        """Return the first vendor whose name contains firm_name, or None."""
+        return self._memo(normalize_firm_name(firm_name))
+
+    def _vendor(self, query):
+        pos = self._find(query)
+        return None if pos is None else self.vendors[pos]
+
+    def _find(self, query):
+        # An exact hit bounds the search: only earlier vendors can win.
+        limit = self._exact.get(query, len(self._names))
+
+        if len(query) < NGRAM_SIZE:
+            candidates = range(limit)
+        else:
+            postings = [self._grams.get(g) for g in _ngrams(query)]
+            if not all(postings):
+                return None if limit == len(self._names) else limit
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for plist in postings[1:]:
+                candidates.intersection_update(plist)
+            candidates = sorted(p for p in candidates if p < limit)
+
+        for pos in candidates:
+            if query in self._names[pos]:
+                return pos
+        return None if limit == len(self._names) else limit
+
+
+# ============================================================
+# SHARED LOADER
+# ============================================================
+# Agent tools are called once per invoice, so the index is built
+# once per database version and reused until the file changes.
+
+_cache = {}
+
+
+def load_vendor_index(db_path):
+    """
+    Return a VendorIndex for the vendor database at db_path.
+
+    The index is rebuilt only when the file's mtime or size changes.
+    Returns None if the database does not exist.
+    """
+    try:
+        stat = os.stat(db_path)
+    except FileNotFoundError:
+        return None
+
+    key = os.path.abspath(db_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _cache.get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with open(db_path, 'r') as f:
+        db = json.load(f)
+    index = VendorIndex(db.get("vendors", []))
+    _cache[key] = (version, index)
+    return index
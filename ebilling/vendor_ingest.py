@@ -0,0 +1,79 @@
+"""
+E-Billing System - Streaming Vendor Ingestion
+
+Onboards a vendor CSV of any size with flat memory. Rows are read lazily
+with csv.DictReader, then validated and saved CHUNK_SIZE at a time; each
+chunk gets its VND-<id>s as it is written. No stage holds the whole file:
+not the reader, the validation or the storage write (the JSON backend
+streams into the new vendor_database.json, SQLite inserts chunk by chunk
+in one transaction - see storage.save_vendor_chunks).
+
+The caller supplies the rules as a batch check, check(rows) -> one
+(errors, warnings) pair per row (vendor_rules.check_vendors checks a whole
+chunk as NumPy columns), and can collect per-vendor results as each chunk
+is saved.
+"""
+
+import csv
+from itertools import islice
+
+
+CHUNK_SIZE = 5000
+
+
+def iter_vendor_csv(path):
+    """Yield the rows of a vendor CSV one at a time."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def iter_chunks(rows, size=CHUNK_SIZE):
+    """Split a row stream into lists of at most size rows."""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ingest_vendors(storage, rows, check, chunk_size=CHUNK_SIZE, fresh=False, on_chunk=None):
+    """
+    Validate and save vendor rows chunk by chunk.
+
+    Args:
+        storage: Storage backend to save to
+        rows: Iterable of vendor dicts (e.g. iter_vendor_csv(path))
+        check: list of rows -> [(errors, warnings)] in the same order;
+               rows with errors are not saved
+        chunk_size: Rows validated and saved together
+        fresh: Replace the vendor database instead of appending to it
+        on_chunk: Called after each chunk is saved as on_chunk(saved, rejected):
+                  saved is [(vendor, warnings)] (vendor_id assigned),
+                  rejected is [(row, errors)]
+
+    Returns:
+        Counts: read, onboarded, rejected, warnings (messages), chunks
+    """
+    counts = {"read": 0, "onboarded": 0, "rejected": 0, "warnings": 0, "chunks": 0}
+
+    def valid_chunks():
+        for chunk in iter_chunks(rows, chunk_size):
+            saved, rejected = [], []
+            for row, (errors, warnings) in zip(chunk, check(chunk)):
+                if errors:
+                    rejected.append((row, errors))
+                else:
+                    saved.append((row, warnings))
+                    counts["warnings"] += len(warnings)
+            counts["read"] += len(chunk)
+            counts["onboarded"] += len(saved)
+            counts["rejected"] += len(rejected)
+            counts["chunks"] += 1
+            yield [row for row, _ in saved]
+            # Resumed once the storage has written this chunk
+            if on_chunk:
+                on_chunk(saved, rejected)
+
+    storage.save_vendor_chunks(valid_chunks(), fresh=fresh)
+    return counts
@@ -0,0 +1,206 @@
+"""
+E-Billing System - Vendor Validation Rules
+
+The e-billing vendor rules, declared once in VENDOR_RULES and used by
+Agent 1's tools, the onboarding engine (web app and CLI) and streaming
+ingestion alike:
+
+- required fields must be present and non-empty
+- rates must be numbers; below a floor is an error, above a cap a warning
+- status and payment_terms must be one of the allowed values
+
+compile_rules() turns the declaration into checks. check_vendors() lays a
+list of vendors out as a frame of NumPy columns (one per field the rules
+read), runs every check as a whole-column operation, and only builds
+messages for the rows that fail. Each rule also compiles to a per-vendor
+check, used by check_vendor() and for lists too short to be worth
+vectorizing; both give the same messages in the same order.
+"""
+
+import numpy as np
+
+
+VENDOR_RULES = {
+    "required": ["firm_name", "partner_rate", "associate_rate", "status", "payment_terms"],
+    "rates": [
+        {"field": "partner_rate", "label": "Partner rate", "floor": 200, "cap": 800},
+        {"field": "associate_rate", "label": "Associate rate", "cap": 500},
+    ],
+    "allowed": [
+        {"field": "status", "values": ["active", "inactive"],
+         "message": "Status must be 'active' or 'inactive'"},
+        {"field": "payment_terms", "values": ["net_30", "net_45", "net_60"],
+         "message": "Payment terms must be one of: {values}"},
+    ],
+}
+
+
+# ============================================================
+# FRAME
+# ============================================================
+
+def vendor_frame(vendors, fields):
+    """Columns of the given fields as NumPy object arrays (None where a vendor lacks one)."""
+    return {field: np.array([vendor.get(field) for vendor in vendors], dtype=object) for field in fields}
+
+
+def _to_float(column, default):
+    """
+    Parse a column as floats the way float() does.
+
+    Returns:
+        (values, ok) - values is NaN where ok is False (not a number)
+    """
+    filled = np.where(np.equal(column, None), default, column)
+    try:
+        return filled.astype(np.float64), np.ones(len(column), dtype=bool)
+    except (TypeError, ValueError):
+        pass
+    # Some value is not a number: parse one by one to find which
+    values = np.full(len(column), np.nan)
+    ok = np.zeros(len(column), dtype=bool)
+    for i, value in enumerate(filled.tolist()):
+        try:
+            values[i] = float(value)
+            ok[i] = True
+        except (TypeError, ValueError):
+            pass
+    return values, ok
+
+
+# ============================================================
+# COMPILED CHECKS
+# ============================================================
+# Each rule compiles to a pair of checks with the same results:
+# - columns(frame) -> [(kind, mask, message)]: kind is "errors" or
+#   "warnings", mask marks the failing rows, and message is the text,
+#   or message(i) builds it for failing row i
+# - row(vendor, errors, warnings) appends one vendor's messages
+#   (NumPy's per-call overhead outweighs its speed on a few rows)
+
+def _required_check(field):
+    message = f"Missing required field: {field}"
+
+    def columns(frame):
+        # Object columns cast to bool by truthiness, like `not vendor[field]`
+        return [("errors", ~frame[field].astype(bool), message)]
+
+    def row(vendor, errors, warnings):
+        if not vendor.get(field):
+            errors.append(message)
+    return columns, row
+
+
+def _rate_check(rule):
+    field, label = rule["field"], rule["label"]
+    floor, cap = rule.get("floor"), rule.get("cap")
+    not_a_number = f"{label} must be a number"
+
+    def over_cap(rate):
+        return f"{label} ${rate}/hr exceeds preferred cap of ${cap}/hr"
+
+    def under_floor(rate):
+        return f"{label} ${rate}/hr seems too low - please verify"
+
+    def columns(frame):
+        # A missing rate counts as 0, as with vendor.get(field, 0)
+        rates, ok = _to_float(frame[field], 0)
+        results = []
+        with np.errstate(invalid="ignore"):
+            if cap is not None:
+                results.append(("warnings", ok & (rates > cap), lambda i: over_cap(float(rates[i]))))
+            if floor is not None:
+                results.append(("errors", ok & (rates < floor), lambda i: under_floor(float(rates[i]))))
+        results.append(("errors", ~ok, not_a_number))
+        return results
+
+    def row(vendor, errors, warnings):
+        value = vendor.get(field)
+        try:
+            rate = float(0 if value is None else value)
+        except (TypeError, ValueError):
+            errors.append(not_a_number)
+            return
+        if cap is not None and rate > cap:
+            warnings.append(over_cap(rate))
+        if floor is not None and rate < floor:
+            errors.append(under_floor(rate))
+    return columns, row
+
+
+def _allowed_check(rule):
+    field, values = rule["field"], rule["values"]
+    message = rule["message"].format(values=values)
+
+    def columns(frame):
+        # Element-wise ==, so None or numbers never match and nothing is sorted
+        return [("errors", ~np.isin(frame[field], values), message)]
+
+    def row(vendor, errors, warnings):
+        if vendor.get(field) not in values:
+            errors.append(message)
+    return columns, row
+
+
+def compile_rules(rules=VENDOR_RULES):
+    """
+    Compile a rule declaration into checks.
+
+    Returns:
+        (fields, checks) - the vendor fields the checks read, and one
+        (columns, row) pair per rule in the order messages are reported
+    """
+    checks = [_required_check(field) for field in rules["required"]]
+    checks += [_rate_check(rule) for rule in rules["rates"]]
+    checks += [_allowed_check(rule) for rule in rules["allowed"]]
+    fields = list(dict.fromkeys(
+        list(rules["required"]) + [r["field"] for r in rules["rates"]] + [r["field"] for r in rules["allowed"]]))
+    return fields, checks
+
+
+_FIELDS, _CHECKS = compile_rules()
+
+# Below this many vendors the row checks are faster than the column checks
+MIN_COLUMN_ROWS = 128
+
+
+# ============================================================
+# CHECKING VENDORS
+# ============================================================
+
+def check_vendors(vendors):
+    """
+    Apply the vendor rules to a list of vendor records.
+
+    Returns:
+        One (errors, warnings) pair of message lists per vendor, in order;
+        a vendor is valid if its errors list is empty
+    """
+    if len(vendors) < MIN_COLUMN_ROWS:
+        return [check_vendor(vendor) for vendor in vendors]
+    messages = {"errors": [[] for _ in vendors], "warnings": [[] for _ in vendors]}
+    frame = vendor_frame(vendors, _FIELDS)
+    for columns, _ in _CHECKS:
+        for kind, mask, message in columns(frame):
+            rows = messages[kind]
+            if callable(message):
+                for i in np.flatnonzero(mask).tolist():
+                    rows[i].append(message(i))
+            else:
+                for i in np.flatnonzero(mask).tolist():
+                    rows[i].append(message)
+    return list(zip(messages["errors"], messages["warnings"]))
+
+
+def check_vendor(vendor):
+    """
+    Apply the vendor rules to one vendor record.
+
+    Returns:
+        (errors, warnings) - lists of messages; valid if errors is empty
+    """
+    errors = []
+    warnings = []
+    for _, row in _CHECKS:
+        row(vendor, errors, warnings)
+    return errors, warnings
@@ -0,0 +1,155 @@
+"""
+E-Billing System - Incremental Vendor Re-onboarding
+
+Applies a vendor-master feed (e.g. a daily law_firms.csv export) to the
+existing vendor database as a diff instead of rebuilding it. Incoming rows
+are validated with the usual rules (vendor_rules.py) and matched to stored
+vendors by firm name (case and whitespace insensitive):
+
+    inserted     firm not in the database - saved with the next VND-<id>
+    updated      firm known, some field changed - saved under its VND-<id>
+    deactivated  firm in the database but no longer in the feed - kept,
+                 with status "inactive" (its invoices still resolve)
+    unchanged    firm known and every field the same, or missing from
+                 the feed but already inactive - not written
+    rejected     row fails validation, or repeats a firm earlier in the
+                 feed - its stored vendor (if any) is left as it was
+
+VND-<id>s never change and are never reused. When nothing changed the
+database is not written at all, so caches keyed on its version (and the
+rates hashes of incremental invoice verification) stay valid.
+
+An update that changes a vendor's rates also records them as rate cards
+(rate_cards.py): the new rates are in force from effective_from, and
+invoices dated before it keep being verified against the old ones.
+"""
+
+from datetime import date
+
+from rate_cards import parse_day, rate_change_cards
+from vendor_index import normalize_firm_name
+from vendor_ingest import CHUNK_SIZE, iter_chunks
+
+
+def vendor_key(vendor):
+    """The identity a vendor is matched on across feeds: its normalized firm name."""
+    return " ".join(normalize_firm_name(vendor.get("firm_name")).split())
+
+
+def _fields(vendor):
+    return {k: v for k, v in vendor.items() if k != "vendor_id"}
+
+
+def changed_fields(before, after):
+    """{field: [old, new]} for every field (other than vendor_id) that differs."""
+    old, new = _fields(before), _fields(after)
+    return {field: [old.get(field), new.get(field)] for field in sorted(old.keys() | new.keys())
+            if old.get(field) != new.get(field)}
+
+
+def diff_vendors(stored, rows, check, chunk_size=CHUNK_SIZE, deactivate_missing=True):
+    """
+    Compare a feed with the stored vendors.
+
+    Args:
+        stored: Stored vendor records (e.g. storage.list_vendors())
+        rows: Iterable of incoming vendor dicts (e.g. iter_vendor_csv(path))
+        check: list of rows -> [(errors, warnings)] (vendor_rules.check_vendors)
+        chunk_size: Rows validated together
+        deactivate_missing: Deactivate stored vendors missing from the feed
+
+    Returns:
+        Change set: inserted [(vendor, warnings)], updated
+        [(before, after, warnings)], deactivated [(before, after)],
+        rejected [(row, errors)], plus read and unchanged counts
+    """
+    by_key = {}
+    for vendor in stored:
+        by_key.setdefault(vendor_key(vendor), vendor)
+
+    changes = {"read": 0, "inserted": [], "updated": [], "deactivated": [], "unchanged": 0, "rejected": []}
+    seen = set()
+    accepted = set()
+    for chunk in iter_chunks(rows, chunk_size):
+        changes["read"] += len(chunk)
+        for row, (errors, warnings) in zip(chunk, check(chunk)):
+            key = vendor_key(row)
+            if not errors and key in accepted:
+                errors = [f"Duplicate firm in feed: {row.get('firm_name')}"]
+            seen.add(key)
+            if errors:
+                changes["rejected"].append((row, errors))
+                continue
+            accepted.add(key)
+            before = by_key.get(key)
+            if before is None:
+                changes["inserted"].append((row, warnings))
+            elif changed_fields(before, row):
+                changes["updated"].append((before, dict(row, vendor_id=before["vendor_id"]), warnings))
+            else:
+                changes["unchanged"] += 1
+
+    if deactivate_missing:
+        for key, before in by_key.items():
+            if key in seen:
+                continue
+            if before.get("status") == "inactive":
+                changes["unchanged"] += 1
+            else:
+                changes["deactivated"].append((before, dict(before, status="inactive")))
+    return changes
+
+
+def sync_vendors(storage, rows, check, chunk_size=CHUNK_SIZE, deactivate_missing=True, dry_run=False,
+                 effective_from=None):
+    """
+    Diff a feed against the vendor database and write only the changes.
+
+    Args:
+        effective_from: Date (YYYY-MM-DD) changed rates take effect
+                        (default: today)
+
+    Returns:
+        The change set from diff_vendors(), plus the rate cards recorded
+        for changed rates; inserted vendors carry their new vendor_id
+        (unless dry_run)
+
+    Raises:
+        ValueError: effective_from is not a date
+    """
+    effective_from = str(effective_from or date.today().isoformat())[:10]
+    if parse_day(effective_from) < 0:
+        raise ValueError("effective_from must be a date (YYYY-MM-DD)")
+    # Nothing else may write vendors between the read and the write
+    with storage.locked():
+        changes = diff_vendors(storage.list_vendors(), rows, check, chunk_size, deactivate_missing)
+        index = storage.rate_card_index()
+        changes["rate_cards"] = [card for before, after, _ in changes["updated"]
+                                 for card in rate_change_cards(before, after, effective_from, index)]
+        inserted = [vendor for vendor, _ in changes["inserted"]]
+        updated = [after for _, after, _ in changes["updated"]] + [after for _, after in changes["deactivated"]]
+        if not dry_run and (inserted or updated):
+            with storage.batch():
+                storage.apply_vendor_changes(inserted, updated)
+                storage.save_rate_cards(changes["rate_cards"])
+    return changes
+
+
+def change_report(changes):
+    """The change set as JSON-ready records, one per changed or rejected vendor."""
+    def entry(vendor, **extra):
+        return {"vendor_id": vendor.get("vendor_id"), "firm_name": vendor.get("firm_name", "Unknown"), **extra}
+
+    return {
+        "inserted": [entry(vendor, warnings=warnings) for vendor, warnings in changes["inserted"]],
+        "updated": [entry(after, changes=changed_fields(before, after), warnings=warnings)
+                    for before, after, warnings in changes["updated"]],
+        "deactivated": [entry(after) for _, after in changes["deactivated"]],
+        "rejected": [{"firm_name": row.get("firm_name", "Unknown"), "errors": errors} for row, errors in changes["rejected"]],
+        "rate_cards": changes.get("rate_cards", []),
+    }
+
+
+def change_counts(changes):
+    """read / inserted / updated / deactivated / unchanged / rejected (/ rate_cards) counts."""
+    return {k: v if isinstance(v, int) else len(v) for k, v in changes.items()}
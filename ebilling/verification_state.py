@@ -0,0 +1,126 @@
+"""
+E-Billing System - Incremental Verification State
+
+Remembers what each invoice was last verified against, so a run only
+re-verifies invoices whose inputs changed. Per invoice record the storage
+layer keeps:
+
+    invoice_hash     content hash of the invoice as read from the inbox
+    rates_hash       content hash of its vendor's contracted rates, rate
+                     cards and status (or of "no vendor" when the firm was
+                     not found)
+    notification_id  the AP notification the last verification produced
+
+An invoice is skipped when both hashes match. A new invoice gets a new
+notification; a changed one (edited, or its vendor's rates or status
+changed, or its vendor was onboarded since) is re-verified and its
+notification is replaced under the same notification_id.
+
+An inbox may hold more than one record with the same invoice_id (e.g. a
+bill sent twice). Each is its own record: the nth (n > 1) is kept under
+"<invoice_id>#<n>" (see record_key) and gets its own notification.
+"""
+
+from collections import deque
+
+from data_cache import content_hash
+from rate_engine import contracted_rates
+
+
+def record_key(invoice_id, occurrence):
+    """Key of the occurrence-th (from 1) inbox record with an invoice_id."""
+    return invoice_id if occurrence == 1 else f"{invoice_id}#{occurrence}"
+
+
+def rates_hash(vendor, cards=None):
+    """Hash of what a verification uses from a vendor record (and its rate cards, if any)."""
+    if not vendor:
+        return content_hash(None)
+    used = {"rates": contracted_rates(vendor), "status": vendor.get("status")}
+    # Only hashed when present, so hashes recorded before rate cards stay valid
+    if cards:
+        used["rate_cards"] = cards
+    return content_hash(used)
+
+
+class IncrementalRun:
+    """
+    One incremental verification run.
+
+    Args:
+        state: {record key: {"invoice_hash", "rates_hash", "notification_id"}}
+               from storage.load_verification_state()
+        lookup: firm_name -> vendor record or None (e.g. VendorIndex.lookup)
+        rate_cards: RateCardIndex of the vendors' rate cards, if any
+
+    Not thread-safe: threads sharing a run must hold one lock from
+    previous_notification_id() through record() (agent 2 uses
+    storage.locked()).
+    """
+
+    def __init__(self, state, lookup, rate_cards=None):
+        self.state = state
+        self.lookup = lookup
+        self.rate_cards = rate_cards
+        self.unchanged = []
+        self.verified = {}
+        # invoice_id -> (record key, entry) of each pending record, in inbox order
+        self._pending = {}
+        self._pending_count = 0
+        self._occurrences = {}
+        self._rates = {}
+
+    def changed(self, invoices, keys=None):
+        """
+        Yield only the invoices that are new or whose inputs changed.
+
+        If keys is given (e.g. a deque), each invoice's record key is
+        appended to it before the invoice is yielded.
+        """
+        for invoice in invoices:
+            invoice_id = invoice["invoice_id"]
+            occurrence = self._occurrences[invoice_id] = self._occurrences.get(invoice_id, 0) + 1
+            key = record_key(invoice_id, occurrence)
+            vendor = self.lookup(invoice.get("firm_name", ""))
+            vendor_id = vendor["vendor_id"] if vendor else None
+            if vendor_id not in self._rates:
+                cards = self.rate_cards.cards_for(vendor_id) if self.rate_cards is not None and vendor else None
+                self._rates[vendor_id] = rates_hash(vendor, cards)
+            entry = {"invoice_hash": content_hash(invoice), "rates_hash": self._rates[vendor_id]}
+
+            previous = self.state.get(key)
+            if previous and previous["invoice_hash"] == entry["invoice_hash"] and previous["rates_hash"] == entry["rates_hash"]:
+                self.unchanged.append(invoice_id)
+                continue
+            entry["notification_id"] = previous["notification_id"] if previous else None
+            self._pending.setdefault(invoice_id, deque()).append((key, entry))
+            self._pending_count += 1
+            if keys is not None:
+                keys.append(key)
+            yield invoice
+
+    @property
+    def pending(self):
+        """Invoices yielded by changed() that have no new notification yet."""
+        return self._pending_count
+
+    def previous_notification_id(self, invoice_id):
+        """
+        notification_id to reuse for a re-verified invoice, or None if it is new.
+
+        Records sharing an invoice_id are notified in inbox order, so this
+        is for the earliest of them without a new notification yet.
+        """
+        pending = self._pending.get(invoice_id)
+        return pending[0][1]["notification_id"] if pending else None
+
+    def record(self, invoice_id, notification_id):
+        """Note that an invoice yielded by changed() now has this notification."""
+        pending = self._pending.get(invoice_id)
+        if not pending:
+            return
+        key, entry = pending.popleft()
+        if not pending:
+            del self._pending[invoice_id]
+        self._pending_count -= 1
+        self.verified[key] = dict(entry, notification_id=notification_id)